@@ -1,5 +1,6 @@
 import argparse
 
+from arrowgen.arrow_converter import ConversionOptions
 from arrowgen.generator import generate_for_file
 
 
@@ -8,9 +9,24 @@ def main():
         description="Generate code to convert Google Protocol Buffers to Arrow Table"
     )
     parser.add_argument("proto_file", type=str, help="Input .proto file")
+    parser.add_argument(
+        "--dictionary-enums",
+        action="store_true",
+        help="Store enums as dictionary<int32, utf8> of their value names",
+    )
+    parser.add_argument(
+        "--large-types",
+        action="store_true",
+        help="Use large_list, large_utf8 and large_binary (64 bit offsets)",
+    )
     args = parser.parse_args()
-    header, source = generate_for_file(args.proto_file)
-    print(header, source)
+    file_names = generate_for_file(
+        args.proto_file,
+        ConversionOptions(
+            dictionary_enums=args.dictionary_enums, large_types=args.large_types
+        ),
+    )
+    print(*file_names)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,21 @@
+import collections
+import concurrent.futures
+import functools
+import itertools
+import threading
 import typing
 
 import google.protobuf.timestamp_pb2
+import numpy
 import pandas
 import pyarrow
-from google.protobuf.descriptor import Descriptor, FieldDescriptor
+import pyarrow.compute
+from google.protobuf.descriptor import Descriptor, EnumDescriptor, FieldDescriptor
+from google.protobuf.field_mask_pb2 import FieldMask
 from google.protobuf.message import Message
 
+from arrowgen import options_pb2
+
 ARROW_TYPES = {
     FieldDescriptor.TYPE_DOUBLE: pyarrow.float64(),
     FieldDescriptor.TYPE_FLOAT: pyarrow.float32(),
@@ -33,30 +43,243 @@ def is_timestamp(field_descriptor: FieldDescriptor) -> bool:
     )
 
 
-def get_arrow_type(field_descriptor: FieldDescriptor) -> pyarrow.DataType:
+class ConversionOptions(typing.NamedTuple):
+    """
+    How messages map to arrow, for all the fields of a conversion.
+    `timestamp_unit` is any of s, ms, us and ns (sub unit precision is truncated),
+    `timestamp_tz` is stored in the arrow type, values are UTC either way.
+    `dictionary_enums` stores enums as the names of their values, dictionary
+    encoded, rather than as their int32 number.
+    `large_types` uses 64 bit offsets (large_list, large_utf8 and large_binary),
+    for batches holding more than 2GB in a list or string column.
+    """
+
+    timestamp_unit: str = "ns"
+    timestamp_tz: typing.Optional[str] = None
+    dictionary_enums: bool = False
+    large_types: bool = False
+
+
+DEFAULT_OPTIONS = ConversionOptions()
+
+NANOS_PER_UNIT = {"s": 1_000_000_000, "ms": 1_000_000, "us": 1_000, "ns": 1}
+
+DICTIONARY_TYPES = {
+    FieldDescriptor.TYPE_STRING: pyarrow.dictionary(pyarrow.int32(), pyarrow.utf8()),
+    FieldDescriptor.TYPE_BYTES: pyarrow.dictionary(pyarrow.int32(), pyarrow.binary()),
+    FieldDescriptor.TYPE_ENUM: pyarrow.dictionary(pyarrow.int32(), pyarrow.utf8()),
+}
+
+LARGE_TYPES = {
+    FieldDescriptor.TYPE_STRING: pyarrow.large_utf8(),
+    FieldDescriptor.TYPE_BYTES: pyarrow.large_binary(),
+}
+
+
+class FieldEncoding(typing.NamedTuple):
+    """
+    Layout of a field: the conversion options, overridden by the `arrowgen`
+    options of its message and then by its own (see options.proto)
+    """
+
+    dictionary: bool = False
+    large: bool = False
+    timestamp_unit: str = "ns"
+    float32: bool = False
+    skip: bool = False
+
+
+def _override(
+    encoding: FieldEncoding,
+    options: options_pb2.ArrowOptions,
+    names: typing.Iterable[str],
+) -> FieldEncoding:
+    return encoding._replace(
+        **{name: getattr(options, name) for name in names if options.HasField(name)}
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def get_field_encoding(
+    field_descriptor: FieldDescriptor, options: ConversionOptions = DEFAULT_OPTIONS
+) -> FieldEncoding:
+    field_type = field_descriptor.type
+    encoding = FieldEncoding(
+        dictionary=options.dictionary_enums and field_type == FieldDescriptor.TYPE_ENUM,
+        large=options.large_types,
+        timestamp_unit=options.timestamp_unit,
+    )
+    message_options = field_descriptor.containing_type.GetOptions()
+    if message_options.HasExtension(options_pb2.message_options):
+        encoding = _override(
+            encoding,
+            message_options.Extensions[options_pb2.message_options],
+            ["dictionary", "large", "timestamp_unit", "float32"],
+        )
+    field_options = field_descriptor.GetOptions()
+    if field_options.HasExtension(options_pb2.field_options):
+        encoding = _override(
+            encoding,
+            field_options.Extensions[options_pb2.field_options],
+            FieldEncoding._fields,
+        )
+    if encoding.timestamp_unit not in NANOS_PER_UNIT:
+        raise ValueError(
+            f"Invalid timestamp unit {encoding.timestamp_unit!r} "
+            f"for {field_descriptor.full_name}"
+        )
+    # Message wide options only apply to the fields they make sense for
+    return encoding._replace(
+        dictionary=encoding.dictionary and field_type in DICTIONARY_TYPES,
+        large=encoding.large
+        and (
+            field_type in LARGE_TYPES
+            or field_descriptor.label == FieldDescriptor.LABEL_REPEATED
+        ),
+        float32=encoding.float32 and field_type == FieldDescriptor.TYPE_DOUBLE,
+    )
+
+
+def get_timestamp_type(options: ConversionOptions) -> pyarrow.TimestampType:
+    return pyarrow.timestamp(options.timestamp_unit, options.timestamp_tz)
+
+
+def get_arrow_type(
+    field_descriptor: FieldDescriptor, options: ConversionOptions = DEFAULT_OPTIONS
+) -> pyarrow.DataType:
+    encoding = get_field_encoding(field_descriptor, options)
     if is_timestamp(field_descriptor):
-        result = pyarrow.timestamp("ns")
+        result = pyarrow.timestamp(encoding.timestamp_unit, options.timestamp_tz)
     elif field_descriptor.type == FieldDescriptor.TYPE_MESSAGE:
-        result = pyarrow.struct(get_arrow_fields(field_descriptor.message_type))
+        result = pyarrow.struct(
+            get_arrow_fields(field_descriptor.message_type, options)
+        )
+    elif encoding.dictionary:
+        result = DICTIONARY_TYPES[field_descriptor.type]
+    elif encoding.float32:
+        result = pyarrow.float32()
+    elif encoding.large and field_descriptor.type in LARGE_TYPES:
+        result = LARGE_TYPES[field_descriptor.type]
     else:
         result = ARROW_TYPES[field_descriptor.type]
-    if field_descriptor.label == FieldDescriptor.LABEL_REPEATED:
-        return pyarrow.list_(result)
-    else:
+    if field_descriptor.label != FieldDescriptor.LABEL_REPEATED:
         return result
+    elif encoding.large:
+        return pyarrow.large_list(result)
+    else:
+        return pyarrow.list_(result)
 
 
-def get_arrow_field(field_descriptor: FieldDescriptor) -> pyarrow.Field:
-    arrow_type = get_arrow_type(field_descriptor)
+def get_arrow_field(
+    field_descriptor: FieldDescriptor, options: ConversionOptions = DEFAULT_OPTIONS
+) -> pyarrow.Field:
+    arrow_type = get_arrow_type(field_descriptor, options)
     return pyarrow.field(field_descriptor.name, arrow_type)
 
 
-def get_arrow_fields(message_descriptor: Descriptor) -> typing.List[pyarrow.Field]:
-    return [get_arrow_field(field) for field in message_descriptor.fields]
+def get_arrow_fields(
+    message_descriptor: Descriptor, options: ConversionOptions = DEFAULT_OPTIONS
+) -> typing.List[pyarrow.Field]:
+    return [
+        get_arrow_field(field, options)
+        for field in message_descriptor.fields
+        if not get_field_encoding(field, options).skip
+    ]
+
+
+# Selected fields, as sorted (name, sub projection) pairs. None selects everything
+Projection = typing.Optional[typing.Tuple[typing.Tuple[str, "Projection"], ...]]
+# Dotted field paths (eg "data_row.request.query") or a FieldMask
+Fields = typing.Union[None, str, typing.Iterable[str], FieldMask]
+# Number of processes, or an executor (see arrowgen.parallel)
+Workers = typing.Union[None, int, concurrent.futures.Executor]
+# Boolean mask (nulls drop the row) or expression, like `pc.field("a", "b") > 0`
+Predicate = typing.Union[
+    None,
+    pyarrow.compute.Expression,
+    pyarrow.Array,
+    pyarrow.ChunkedArray,
+    typing.Sequence[bool],
+]
+
+
+def get_arrow_schema(
+    message_descriptor: Descriptor,
+    fields: Fields = None,
+    options: ConversionOptions = DEFAULT_OPTIONS,
+) -> pyarrow.Schema:
+    if fields is None:
+        return pyarrow.schema(get_arrow_fields(message_descriptor, options))
+    else:
+        return get_conversion_plan(message_descriptor, fields, options).schema
+
+
+def _add_field_path(
+    tree: dict,
+    message_descriptor: Descriptor,
+    names: typing.List[str],
+    path: str,
+    options: ConversionOptions,
+):
+    name = names[0]
+    field_descriptor = message_descriptor.fields_by_name.get(name)
+    if field_descriptor is None:
+        raise ValueError(
+            f"Invalid field path {path!r}: "
+            f"{message_descriptor.full_name} has no field {name!r}"
+        )
+    if get_field_encoding(field_descriptor, options).skip:
+        raise ValueError(
+            f"Invalid field path {path!r}: {field_descriptor.full_name} is skipped"
+        )
+    if len(names) == 1:
+        tree[name] = None
+    elif field_descriptor.type != FieldDescriptor.TYPE_MESSAGE or is_timestamp(
+        field_descriptor
+    ):
+        raise ValueError(
+            f"Invalid field path {path!r}: {field_descriptor.full_name} "
+            "has no sub fields"
+        )
+    elif name not in tree or tree[name] is not None:
+        _add_field_path(
+            tree.setdefault(name, {}),
+            field_descriptor.message_type,
+            names[1:],
+            path,
+            options,
+        )
 
 
-def get_arrow_schema(message_descriptor: Descriptor) -> pyarrow.Schema:
-    return pyarrow.schema(get_arrow_fields(message_descriptor))
+def _freeze_projection(tree: typing.Optional[dict]) -> Projection:
+    if tree is None:
+        return None
+    return tuple(
+        (name, _freeze_projection(sub_tree)) for name, sub_tree in sorted(tree.items())
+    )
+
+
+def get_projection(
+    message_descriptor: Descriptor,
+    fields: Fields,
+    options: ConversionOptions = DEFAULT_OPTIONS,
+) -> Projection:
+    """
+    Validates and normalizes field paths. Selecting a message field selects all
+    its sub fields, repeated messages can be projected too.
+    """
+    if fields is None:
+        return None
+    elif isinstance(fields, FieldMask):
+        paths = fields.paths
+    elif isinstance(fields, str):
+        paths = [fields]
+    else:
+        paths = fields
+    tree = {}
+    for path in paths:
+        _add_field_path(tree, message_descriptor, path.split("."), path, options)
+    return _freeze_projection(tree)
 
 
 def calculate_offsets(
@@ -65,48 +288,19 @@ def calculate_offsets(
     results = [0]
     current = 0
     for value in list_of_list:
-        current += len(value)
+        current += len(value) if value is not None else 0
         results.append(current)
     return results
 
 
-def messages_to_struct_array(
-    messages: typing.List[Message], message_descriptor: Descriptor
-) -> pyarrow.StructArray:
-    arrays = messages_to_arrays(messages, message_descriptor)
-    validity_mask = pyarrow.array(value is not None for value in messages)
-    validity_bitmask = validity_mask.buffers()[1]
-    return pyarrow.StructArray.from_buffers(
-        pyarrow.struct(get_arrow_fields(message_descriptor)),
-        len(messages),
-        [validity_bitmask],
-        children=arrays,
-    )
-
-
-def repeated_messages_to_list_array(
-    messages: typing.List[typing.List[Message]], message_descriptor: Descriptor
-) -> pyarrow.ListArray:
-    flat_messages = [item for sublist in messages if sublist for item in sublist]
-    struct_array = messages_to_struct_array(flat_messages, message_descriptor)
-    offsets = calculate_offsets(messages)
-    buffers = [
-        pyarrow.array(value is not None for value in messages).buffers()[1],
-        pyarrow.array(offsets, pyarrow.int32()).buffers()[1],
-    ]
-    return pyarrow.ListArray.from_buffers(
-        type=pyarrow.list_(struct_array.type),
-        length=len(messages),
-        buffers=buffers,
-        children=[struct_array],
-    )
-
-
 def convert_timestamp_to_ns(
     timestamps: typing.List[google.protobuf.timestamp_pb2.Timestamp],
 ) -> typing.List[int]:
     return [
-        timestamp.seconds * 1_000_000_000 + timestamp.nanos for timestamp in timestamps
+        timestamp.seconds * 1_000_000_000 + timestamp.nanos
+        if timestamp is not None
+        else None
+        for timestamp in timestamps
     ]
 
 
@@ -119,116 +313,882 @@ def convert_to_proto_timestamp(
     )
 
 
-def get_field_array(
-    messages: typing.List[Message], field_descriptor: FieldDescriptor
-) -> pyarrow.Array:
-    if field_descriptor.containing_oneof is not None:
-        values = [
-            getattr(message, field_descriptor.name)
-            if message is not None and message.HasField(field_descriptor.name)
-            else None
-            for message in messages
-        ]
+def convert_scalar(scalar, field_descriptor: FieldDescriptor):
+    return scalar.as_py()
+
+
+def timestamps_to_int64(
+    timestamps: typing.Iterable[
+        typing.Optional[google.protobuf.timestamp_pb2.Timestamp]
+    ],
+    unit: str = "ns",
+) -> numpy.ndarray:
+    """
+    Counts of `unit` since epoch, None become 0.
+    Reading the fields is the bulk of the cost, so it is done in a single pass.
+    """
+    nanos_per_unit = NANOS_PER_UNIT[unit]
+    units_per_second = 1_000_000_000 // nanos_per_unit
+    return numpy.fromiter(
+        (
+            timestamp.seconds * units_per_second + timestamp.nanos // nanos_per_unit
+            if timestamp is not None
+            else 0
+            for timestamp in timestamps
+        ),
+        numpy.int64,
+    )
+
+
+def int64_to_seconds_and_nanos(
+    values: numpy.ndarray, unit: str = "ns"
+) -> typing.Tuple[typing.List[int], typing.List[int]]:
+    nanos_per_unit = NANOS_PER_UNIT[unit]
+    seconds, remainder = numpy.divmod(values, 1_000_000_000 // nanos_per_unit)
+    return seconds.tolist(), (remainder * nanos_per_unit).tolist()
+
+
+def timestamp_array_to_int64(array: pyarrow.TimestampArray) -> numpy.ndarray:
+    """Nulls become 0"""
+    values = array.cast(pyarrow.int64())
+    if values.null_count:
+        values = values.fill_null(0)
+    return values.to_numpy()
+
+
+def make_validity_buffer(
+    values: typing.Sequence[typing.Any],
+) -> typing.Optional[pyarrow.Buffer]:
+    if any(value is None for value in values):
+        return pyarrow.array(
+            [value is not None for value in values], pyarrow.bool_()
+        ).buffers()[1]
     else:
-        values = [
-            getattr(message, field_descriptor.name) if message else None
-            for message in messages
-        ]
-
-    if (
-        not is_timestamp(field_descriptor)
-        and field_descriptor.type == FieldDescriptor.TYPE_MESSAGE
+        return None
+
+
+def make_list_array(
+    list_type: typing.Union[pyarrow.ListType, pyarrow.LargeListType],
+    lists: typing.Sequence[typing.Optional[typing.Sized]],
+    flat_values: pyarrow.Array,
+) -> pyarrow.ListArray:
+    """Puts together the flattened values of `lists` and their offsets"""
+    offset_type = numpy.int64 if pyarrow.types.is_large_list(list_type) else numpy.int32
+    validity = make_validity_buffer(lists)
+    if validity is None:
+        offsets = numpy.zeros(len(lists) + 1, offset_type)
+        numpy.cumsum(
+            numpy.fromiter(map(len, lists), offset_type, len(lists)), out=offsets[1:]
+        )
+    else:
+        offsets = numpy.array(calculate_offsets(lists), offset_type)
+    return pyarrow.Array.from_buffers(
+        type=list_type,
+        length=len(lists),
+        buffers=[validity, pyarrow.py_buffer(offsets)],
+        children=[flat_values],
+    )
+
+
+class EnumDictionary:
+    """
+    The names of an enum in declaration order, used as the dictionary of its
+    columns, and the mapping between value numbers and dictionary indices.
+    Aliases share the index of the first name of their number.
+    """
+
+    def __init__(self, enum_descriptor: EnumDescriptor):
+        self.enum_descriptor = enum_descriptor
+        self.dictionary = pyarrow.array(
+            [value.name for value in enum_descriptor.values], pyarrow.utf8()
+        )
+        numbers = numpy.array(
+            [value.number for value in enum_descriptor.values], numpy.int32
+        )
+        self.sorted_numbers, first_indices = numpy.unique(numbers, return_index=True)
+        self.sorted_indices = first_indices.astype(numpy.int32)
+
+    def encode(
+        self, numbers: numpy.ndarray, mask: typing.Optional[numpy.ndarray] = None
+    ) -> pyarrow.DictionaryArray:
+        """`mask` is True for nulls, whose number is ignored"""
+        positions = numpy.searchsorted(self.sorted_numbers, numbers)
+        numpy.minimum(positions, len(self.sorted_numbers) - 1, out=positions)
+        unknown = self.sorted_numbers[positions] != numbers
+        if mask is not None:
+            unknown &= ~mask
+        if unknown.any():
+            raise ValueError(
+                f"{numbers[unknown][0]} is not a value of "
+                f"{self.enum_descriptor.full_name}"
+            )
+        return pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array(self.sorted_indices[positions], pyarrow.int32(), mask=mask),
+            self.dictionary,
+        )
+
+    def decode(self, array: pyarrow.DictionaryArray) -> pyarrow.Int32Array:
+        """
+        Numbers of the values, the names are looked up so any dictionary works
+        """
+        values_by_name = self.enum_descriptor.values_by_name
+        try:
+            numbers = numpy.array(
+                [values_by_name[name].number for name in array.dictionary.to_pylist()],
+                numpy.int32,
+            )
+        except KeyError as e:
+            raise ValueError(
+                f"{e.args[0]!r} is not a value of {self.enum_descriptor.full_name}"
+            ) from None
+        indices = array.indices
+        if indices.null_count:
+            indices = indices.fill_null(0)
+        if len(numbers) == 0:
+            numbers = numpy.zeros(1, numpy.int32)
+        return pyarrow.array(
+            numbers[indices.to_numpy()],
+            pyarrow.int32(),
+            mask=(
+                array.is_null().to_numpy(zero_copy_only=False)
+                if array.null_count
+                else None
+            ),
+        )
+
+
+@functools.lru_cache(maxsize=128)
+def get_enum_dictionary(enum_descriptor: EnumDescriptor) -> EnumDictionary:
+    return EnumDictionary(enum_descriptor)
+
+
+def get_chunks(
+    array: typing.Union[pyarrow.Array, pyarrow.ChunkedArray]
+) -> typing.List[pyarrow.Array]:
+    if isinstance(array, pyarrow.ChunkedArray):
+        return array.chunks
+    else:
+        return [array]
+
+
+def get_validity(array: pyarrow.Array) -> numpy.ndarray:
+    """A new boolean array, False for nulls"""
+    if array.null_count == 0:
+        return numpy.ones(len(array), bool)
+    else:
+        return array.is_valid().to_numpy(zero_copy_only=False)
+
+
+def get_values_and_offsets(
+    list_array: pyarrow.ListArray,
+) -> typing.Tuple[pyarrow.Array, typing.List[int]]:
+    """
+    The values of a list array and their offsets, restricted to the slice.
+    `list_array.values` ignores the offset of sliced arrays and returns all values.
+    """
+    offsets = list_array.offsets.to_numpy()
+    if len(offsets) == 0:
+        return list_array.values.slice(0, 0), [0]
+    first = int(offsets[0])
+    return (
+        list_array.values.slice(first, int(offsets[-1]) - first),
+        (offsets - first).tolist(),
+    )
+
+
+def array_to_pylist(array: pyarrow.Array) -> typing.List[typing.Any]:
+    """
+    Bulk conversion to python values, going through numpy when there are no nulls
+    """
+    if array.null_count == 0 and (
+        pyarrow.types.is_integer(array.type)
+        or pyarrow.types.is_floating(array.type)
+        or pyarrow.types.is_boolean(array.type)
     ):
-        if field_descriptor.label == FieldDescriptor.LABEL_REPEATED:
-            return repeated_messages_to_list_array(
-                values, field_descriptor.message_type
+        return array.to_numpy(zero_copy_only=False).tolist()
+    else:
+        return array.to_pylist()
+
+
+class FieldPlan:
+    """
+    Conversion of one field, both ways, with every check done once up front
+    """
+
+    def __init__(
+        self,
+        field_descriptor: FieldDescriptor,
+        plan_cache: "ConversionPlanCache",
+        projection: Projection = None,
+        options: ConversionOptions = DEFAULT_OPTIONS,
+    ):
+        self.field_descriptor = field_descriptor
+        self.options = options
+        self.name = field_descriptor.name
+        self.is_oneof = field_descriptor.containing_oneof is not None
+        self.is_repeated = field_descriptor.label == FieldDescriptor.LABEL_REPEATED
+        self.is_timestamp = is_timestamp(field_descriptor)
+        self.is_message = (
+            field_descriptor.type == FieldDescriptor.TYPE_MESSAGE
+            and not self.is_timestamp
+        )
+        self.encoding = get_field_encoding(field_descriptor, options)
+        self.is_enum = field_descriptor.type == FieldDescriptor.TYPE_ENUM
+        self.is_enum_dictionary = self.is_enum and self.encoding.dictionary
+        self.message_plan = (
+            plan_cache.get(field_descriptor.message_type, projection, options)
+            if self.is_message
+            else None
+        )
+        if self.is_message:
+            value_type = self.message_plan.struct_type
+        else:
+            value_type = get_arrow_type(field_descriptor, options)
+        if self.is_message and self.is_repeated:
+            self.arrow_type = (
+                pyarrow.large_list(value_type)
+                if self.encoding.large
+                else pyarrow.list_(value_type)
             )
         else:
-            return messages_to_struct_array(values, field_descriptor.message_type)
-    else:
-        if field_descriptor.label == FieldDescriptor.LABEL_REPEATED:
-            if is_timestamp(field_descriptor):
-                values = [convert_timestamp_to_ns(value) for value in values]
+            self.arrow_type = value_type
+        self.arrow_field = pyarrow.field(self.name, self.arrow_type)
+
+        if self.is_message:
+            self.encoder = (
+                self._encode_repeated_messages
+                if self.is_repeated
+                else self.message_plan.to_struct_array
+            )
+            self.decoder = (
+                self.message_plan.from_list_array
+                if self.is_repeated
+                else self.message_plan.from_struct_array
+            )
+            self.extractor = (
+                self._extract_repeated_messages
+                if self.is_repeated
+                else self._extract_messages
+            )
+        elif self.is_timestamp:
+            self.encoder = self._encode_timestamps
+            self.decoder = self._decode_values
+            self.extractor = (
+                self._extract_repeated_timestamps
+                if self.is_repeated
+                else self._extract_timestamps
+            )
+        elif self.is_enum_dictionary:
+            self.encoder = self._encode_enums
+            self.decoder = self._decode_values
+            self.extractor = self._extract_values
+        else:
+            self.encoder = (
+                self._encode_repeated_values
+                if self.is_repeated
+                else self._encode_values
+            )
+            self.decoder = self._decode_values
+            self.extractor = self._extract_values
+        # Numeric values are collected straight into numpy, the other types
+        # (bool, string and bytes) convert faster from a flat list
+        value_type = self.arrow_type.value_type if self.is_repeated else None
+        self.numpy_type = (
+            value_type.to_pandas_dtype()
+            if value_type is not None
+            and (
+                pyarrow.types.is_integer(value_type)
+                or pyarrow.types.is_floating(value_type)
+            )
+            else None
+        )
+
+        if self.is_timestamp:
+            self.assigner = (
+                self._extend_timestamps if self.is_repeated else self._set_timestamps
+            )
+        elif self.is_repeated:
+            self.assigner = self._extend_values
+        elif self.is_message:
+            self.assigner = self._copy_values
+        else:
+            self.assigner = self._set_values
+
+    def get_values(self, messages: typing.List[Message]) -> typing.List[typing.Any]:
+        name = self.name
+        if self.is_oneof:
+            return [
+                getattr(message, name)
+                if message is not None and message.HasField(name)
+                else None
+                for message in messages
+            ]
+        else:
+            return [getattr(message, name) if message else None for message in messages]
+
+    def to_array(self, messages: typing.List[Message]) -> pyarrow.Array:
+        return self.encoder(self.get_values(messages))
+
+    def _encode_values(self, values: typing.List[typing.Any]) -> pyarrow.Array:
+        return pyarrow.array(values, self.arrow_type)
+
+    def _encode_repeated_messages(
+        self, values: typing.List[typing.Any]
+    ) -> pyarrow.ListArray:
+        return self.message_plan.to_list_array(values, self.arrow_type)
+
+    def _encode_repeated_values(
+        self, values: typing.List[typing.Any]
+    ) -> pyarrow.ListArray:
+        """Flattens the repeated fields in one go, rather than a list per row"""
+        flat_values = itertools.chain.from_iterable(filter(None, values))
+        if self.numpy_type is not None:
+            flat_array = pyarrow.array(
+                numpy.fromiter(flat_values, self.numpy_type),
+                self.arrow_type.value_type,
+            )
+        else:
+            flat_array = pyarrow.array(list(flat_values), self.arrow_type.value_type)
+        return make_list_array(self.arrow_type, values, flat_array)
+
+    def _encode_enums(self, values: typing.List[typing.Any]) -> pyarrow.Array:
+        enum_dictionary = get_enum_dictionary(self.field_descriptor.enum_type)
+        if self.is_repeated:
+            numbers = numpy.fromiter(
+                itertools.chain.from_iterable(filter(None, values)), numpy.int32
+            )
+            return make_list_array(
+                self.arrow_type, values, enum_dictionary.encode(numbers)
+            )
+        else:
+            mask = numpy.fromiter(
+                (value is None for value in values), bool, len(values)
+            )
+            numbers = numpy.fromiter(
+                (0 if value is None else value for value in values),
+                numpy.int32,
+                len(values),
+            )
+            return enum_dictionary.encode(numbers, mask if mask.any() else None)
+
+    def _encode_timestamps(self, values: typing.List[typing.Any]) -> pyarrow.Array:
+        if self.is_repeated:
+            data = timestamps_to_int64(
+                (
+                    timestamp
+                    for value in values
+                    if value is not None
+                    for timestamp in value
+                ),
+                self.encoding.timestamp_unit,
+            )
+            return make_list_array(
+                self.arrow_type, values, self._make_timestamp_array(data, None)
+            )
+        else:
+            return self._make_timestamp_array(
+                timestamps_to_int64(values, self.encoding.timestamp_unit),
+                make_validity_buffer(values),
+            )
+
+    def _make_timestamp_array(
+        self, data: numpy.ndarray, validity: typing.Optional[pyarrow.Buffer]
+    ) -> pyarrow.TimestampArray:
+        return pyarrow.Array.from_buffers(
+            self.arrow_type.value_type if self.is_repeated else self.arrow_type,
+            len(data),
+            [validity, pyarrow.py_buffer(data)],
+        )
+
+    def extract(
+        self,
+        array: typing.Union[pyarrow.Array, pyarrow.ChunkedArray],
+        messages: typing.List[Message],
+    ):
+        self.extractor(array, messages)
+
+    def _extract_values(
+        self,
+        array: typing.Union[pyarrow.Array, pyarrow.ChunkedArray],
+        messages: typing.List[Message],
+    ):
+        self.assigner(messages, self.decoder(array))
+
+    def _extract_messages(
+        self,
+        array: typing.Union[pyarrow.StructArray, pyarrow.ChunkedArray],
+        messages: typing.List[Message],
+    ):
+        """Decodes the nested messages in place, rather than copying them over"""
+        name = self.name
+        start = 0
+        for chunk in get_chunks(array):
+            targets = []
+            for message, is_valid in zip(
+                messages[start : start + len(chunk)], get_validity(chunk).tolist()
+            ):
+                if message is not None and is_valid:
+                    target = getattr(message, name)
+                    target.SetInParent()
+                    targets.append(target)
+                else:
+                    targets.append(None)
+            self.message_plan.fill(chunk, targets)
+            start += len(chunk)
+
+    def _extract_timestamps(
+        self,
+        array: typing.Union[pyarrow.TimestampArray, pyarrow.ChunkedArray],
+        messages: typing.List[Message],
+    ):
+        """Splits seconds and nanos with numpy, in the unit of the array"""
+        name = self.name
+        start = 0
+        for chunk in get_chunks(array):
+            seconds, nanos = int64_to_seconds_and_nanos(
+                timestamp_array_to_int64(chunk), chunk.type.unit
+            )
+            for message, is_valid, second, nano in zip(
+                messages[start : start + len(chunk)],
+                get_validity(chunk).tolist(),
+                seconds,
+                nanos,
+            ):
+                if message is not None and is_valid:
+                    timestamp = getattr(message, name)
+                    timestamp.seconds = second
+                    timestamp.nanos = nano
+            start += len(chunk)
+
+    def _extract_repeated_timestamps(
+        self,
+        array: typing.Union[pyarrow.ListArray, pyarrow.ChunkedArray],
+        messages: typing.List[Message],
+    ):
+        name = self.name
+        start = 0
+        for chunk in get_chunks(array):
+            values, offsets = get_values_and_offsets(chunk)
+            seconds, nanos = int64_to_seconds_and_nanos(
+                timestamp_array_to_int64(values), chunk.type.value_type.unit
+            )
+            for message, is_valid, begin, end in zip(
+                messages[start : start + len(chunk)],
+                get_validity(chunk).tolist(),
+                offsets,
+                offsets[1:],
+            ):
+                if message is not None and is_valid and begin < end:
+                    add = getattr(message, name).add
+                    for index in range(begin, end):
+                        add(seconds=seconds[index], nanos=nanos[index])
+            start += len(chunk)
+
+    def _extract_repeated_messages(
+        self,
+        array: typing.Union[pyarrow.ListArray, pyarrow.ChunkedArray],
+        messages: typing.List[Message],
+    ):
+        """Adds the nested messages to their container and decodes them in place"""
+        name = self.name
+        start = 0
+        for chunk in get_chunks(array):
+            values, offsets = get_values_and_offsets(chunk)
+            targets = [None] * len(values)
+            for message, is_valid, begin, end in zip(
+                messages[start : start + len(chunk)],
+                get_validity(chunk).tolist(),
+                offsets,
+                offsets[1:],
+            ):
+                if message is not None and is_valid and begin < end:
+                    container = getattr(message, name)
+                    for index in range(begin, end):
+                        targets[index] = container.add()
+            self.message_plan.fill(values, targets)
+            start += len(chunk)
+
+    def _decode_values(
+        self, array: typing.Union[pyarrow.Array, pyarrow.ChunkedArray]
+    ) -> typing.List[typing.Any]:
+        values = []
+        for chunk in get_chunks(array):
+            if self.is_repeated:
+                chunk_values, offsets = get_values_and_offsets(chunk)
+                flat_values = self._decode_chunk(chunk_values)
+                values.extend(
+                    flat_values[begin:end] if is_valid else None
+                    for is_valid, begin, end in zip(
+                        get_validity(chunk).tolist(), offsets, offsets[1:]
+                    )
+                )
+            else:
+                values.extend(self._decode_chunk(chunk))
+        return values
+
+    def _decode_chunk(self, array: pyarrow.Array) -> typing.List[typing.Any]:
+        if self.is_timestamp:
+            array = array.cast(pyarrow.int64())
+        elif pyarrow.types.is_dictionary(array.type):
+            # Read back whatever the options, enums from their names
+            if self.is_enum:
+                array = get_enum_dictionary(self.field_descriptor.enum_type).decode(
+                    array
+                )
             else:
-                values = [list(value) for value in values]
-        elif is_timestamp(field_descriptor):
-            values = convert_timestamp_to_ns(values)
-        return pyarrow.array(values, get_arrow_type(field_descriptor))
+                array = array.dictionary_decode()
+        return array_to_pylist(array)
+
+    def _extend_values(
+        self, messages: typing.List[Message], values: typing.List[typing.Any]
+    ):
+        assert len(messages) == len(values)
+        name = self.name
+        for message, value in zip(messages, values):
+            if message is not None and value is not None:
+                getattr(message, name).extend(value)
+
+    def _copy_values(
+        self, messages: typing.List[Message], values: typing.List[typing.Any]
+    ):
+        assert len(messages) == len(values)
+        name = self.name
+        for message, value in zip(messages, values):
+            if message is not None and value is not None:
+                getattr(message, name).CopyFrom(value)
+
+    def _set_values(
+        self, messages: typing.List[Message], values: typing.List[typing.Any]
+    ):
+        assert len(messages) == len(values)
+        name = self.name
+        for message, value in zip(messages, values):
+            if message is not None and value is not None:
+                setattr(message, name, value)
+
+    def _set_timestamps(
+        self, messages: typing.List[Message], values: typing.List[typing.Optional[int]]
+    ):
+        assert len(messages) == len(values)
+        name = self.name
+        nanos_per_unit = NANOS_PER_UNIT[self.encoding.timestamp_unit]
+        for message, value in zip(messages, values):
+            if message is not None and value is not None:
+                timestamp = getattr(message, name)
+                seconds, remainder = divmod(value, 1_000_000_000 // nanos_per_unit)
+                timestamp.seconds = seconds
+                timestamp.nanos = remainder * nanos_per_unit
+
+    def _extend_timestamps(
+        self,
+        messages: typing.List[Message],
+        values: typing.List[typing.Optional[typing.List[int]]],
+    ):
+        assert len(messages) == len(values)
+        name = self.name
+        nanos_per_unit = NANOS_PER_UNIT[self.encoding.timestamp_unit]
+        for message, value in zip(messages, values):
+            if message is not None and value is not None:
+                timestamps = getattr(message, name)
+                for count in value:
+                    seconds, remainder = divmod(count, 1_000_000_000 // nanos_per_unit)
+                    timestamps.add(seconds=seconds, nanos=remainder * nanos_per_unit)
+
+
+class ConversionPlan:
+    """
+    Conversion of a message type to and from arrow, compiled once per descriptor
+    and projection. Use `get_conversion_plan` to get the cached instance.
+    """
+
+    def __init__(
+        self,
+        message_descriptor: Descriptor,
+        plan_cache: "ConversionPlanCache",
+        projection: Projection = None,
+        options: ConversionOptions = DEFAULT_OPTIONS,
+    ):
+        self.message_descriptor = message_descriptor
+        self.projection = projection
+        self.options = options
+        if projection is None:
+            self.fields = [
+                FieldPlan(field, plan_cache, None, options)
+                for field in message_descriptor.fields
+                if not get_field_encoding(field, options).skip
+            ]
+        else:
+            selected = dict(projection)
+            self.fields = [
+                FieldPlan(field, plan_cache, selected[field.name], options)
+                for field in message_descriptor.fields
+                if field.name in selected
+            ]
+        self.fields_by_number = {
+            field.field_descriptor.number: field for field in self.fields
+        }
+        self.arrow_fields = [field.arrow_field for field in self.fields]
+        self.struct_type = pyarrow.struct(self.arrow_fields)
+        self.schema = pyarrow.schema(self.arrow_fields)
+
+    def new_messages(self, count: int) -> typing.List[Message]:
+        message_class = self.message_descriptor._concrete_class
+        return [message_class() for _ in range(count)]
+
+    def to_arrays(self, messages: typing.List[Message]) -> typing.List[pyarrow.Array]:
+        return [field.to_array(messages) for field in self.fields]
+
+    def to_table(self, messages: typing.List[Message]) -> pyarrow.Table:
+        return pyarrow.Table.from_arrays(self.to_arrays(messages), schema=self.schema)
+
+    def to_record_batch(self, messages: typing.List[Message]) -> pyarrow.RecordBatch:
+        return pyarrow.RecordBatch.from_arrays(
+            self.to_arrays(messages), schema=self.schema
+        )
+
+    def to_struct_array(self, messages: typing.List[Message]) -> pyarrow.StructArray:
+        arrays = self.to_arrays(messages)
+        validity_mask = pyarrow.array(
+            [value is not None for value in messages], pyarrow.bool_()
+        )
+        return pyarrow.StructArray.from_buffers(
+            self.struct_type,
+            len(messages),
+            [validity_mask.buffers()[1]],
+            children=arrays,
+        )
+
+    def to_list_array(
+        self,
+        messages: typing.List[typing.List[Message]],
+        list_type: typing.Optional[pyarrow.DataType] = None,
+    ) -> pyarrow.ListArray:
+        flat_messages = [item for sublist in messages if sublist for item in sublist]
+        return make_list_array(
+            list_type or pyarrow.list_(self.struct_type),
+            messages,
+            self.to_struct_array(flat_messages),
+        )
+
+    def from_table(
+        self, table: typing.Union[pyarrow.Table, pyarrow.RecordBatch]
+    ) -> typing.List[Message]:
+        messages = self.new_messages(table.num_rows)
+        for field in self.fields:
+            field.extract(table[field.name], messages)
+        return messages
+
+    def fill(
+        self,
+        struct_array: pyarrow.StructArray,
+        messages: typing.List[typing.Optional[Message]],
+    ):
+        """
+        Decodes the struct array into existing messages, skipping None.
+        Children are looked up by name, so the array can have more fields than
+        the plan.
+        """
+        for field in self.fields:
+            field.extract(struct_array.field(field.name), messages)
+
+    def from_struct_array(
+        self, struct_array: typing.Union[pyarrow.StructArray, pyarrow.ChunkedArray]
+    ) -> typing.List[Message]:
+        message_class = self.message_descriptor._concrete_class
+        results = []
+        for chunk in get_chunks(struct_array):
+            messages = [
+                message_class() if is_valid else None
+                for is_valid in get_validity(chunk).tolist()
+            ]
+            self.fill(chunk, messages)
+            results.extend(messages)
+        return results
+
+    def from_list_array(
+        self, list_array: typing.Union[pyarrow.ListArray, pyarrow.ChunkedArray]
+    ) -> typing.List[typing.List[Message]]:
+        results = []
+        for chunk in get_chunks(list_array):
+            chunk_values, offsets = get_values_and_offsets(chunk)
+            values = self.from_struct_array(chunk_values)
+            results.extend(
+                values[begin:end] if is_valid else None
+                for is_valid, begin, end in zip(
+                    get_validity(chunk).tolist(), offsets, offsets[1:]
+                )
+            )
+        return results
+
+
+PlanCacheInfo = collections.namedtuple(
+    "PlanCacheInfo", ["hits", "misses", "maxsize", "currsize"]
+)
+
+
+class ConversionPlanCache:
+    """
+    Bounded LRU cache of `ConversionPlan`, keyed by message full name, projection
+    and options
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._plans = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(
+        self,
+        message_descriptor: Descriptor,
+        projection: Projection = None,
+        options: ConversionOptions = DEFAULT_OPTIONS,
+    ) -> ConversionPlan:
+        key = (message_descriptor.full_name, projection, options)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None and plan.message_descriptor is message_descriptor:
+                self.hits += 1
+                self._plans.move_to_end(key)
+                return plan
+            self.misses += 1
+        # Compiled outside the lock, nested plans come from the cache too
+        plan = ConversionPlan(message_descriptor, self, projection, options)
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+        return plan
+
+    def info(self) -> PlanCacheInfo:
+        with self._lock:
+            return PlanCacheInfo(self.hits, self.misses, self.maxsize, len(self._plans))
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+PLAN_CACHE = ConversionPlanCache()
+
+
+def get_conversion_plan(
+    message_descriptor: Descriptor,
+    fields: Fields = None,
+    options: ConversionOptions = DEFAULT_OPTIONS,
+) -> ConversionPlan:
+    return PLAN_CACHE.get(
+        message_descriptor, get_projection(message_descriptor, fields, options), options
+    )
+
+
+def get_plan_cache_info() -> PlanCacheInfo:
+    return PLAN_CACHE.info()
+
+
+def clear_plan_cache():
+    PLAN_CACHE.clear()
+
+
+def _get_field_plan(field_descriptor: FieldDescriptor) -> FieldPlan:
+    if get_field_encoding(field_descriptor).skip:
+        raise ValueError(f"{field_descriptor.full_name} is skipped, it has no column")
+    return get_conversion_plan(field_descriptor.containing_type).fields_by_number[
+        field_descriptor.number
+    ]
+
+
+def messages_to_struct_array(
+    messages: typing.List[Message],
+    message_descriptor: Descriptor,
+    options: ConversionOptions = DEFAULT_OPTIONS,
+) -> pyarrow.StructArray:
+    return get_conversion_plan(message_descriptor, None, options).to_struct_array(
+        messages
+    )
+
+
+def repeated_messages_to_list_array(
+    messages: typing.List[typing.List[Message]],
+    message_descriptor: Descriptor,
+    options: ConversionOptions = DEFAULT_OPTIONS,
+) -> pyarrow.ListArray:
+    return get_conversion_plan(message_descriptor, None, options).to_list_array(
+        messages
+    )
+
+
+def get_field_array(
+    messages: typing.List[Message], field_descriptor: FieldDescriptor
+) -> pyarrow.Array:
+    return _get_field_plan(field_descriptor).to_array(messages)
 
 
 def messages_to_arrays(
-    messages: typing.List[Message], message_descriptor: Descriptor
+    messages: typing.List[Message],
+    message_descriptor: Descriptor,
+    fields: Fields = None,
+    options: ConversionOptions = DEFAULT_OPTIONS,
 ) -> typing.List[pyarrow.Array]:
-    return [get_field_array(messages, field) for field in message_descriptor.fields]
+    return get_conversion_plan(message_descriptor, fields, options).to_arrays(messages)
 
 
 def messages_to_table(
-    messages: typing.List[Message], message_descriptor: Descriptor
+    messages: typing.List[Message],
+    message_descriptor: Descriptor,
+    fields: Fields = None,
+    workers: Workers = None,
+    options: ConversionOptions = DEFAULT_OPTIONS,
 ) -> pyarrow.Table:
-    arrays = messages_to_arrays(messages, message_descriptor)
-    return pyarrow.Table.from_arrays(
-        arrays, schema=get_arrow_schema(message_descriptor)
-    )
-
+    """
+    Converts messages to a table, `fields` selects the columns to build,
+    with the same schema as `get_arrow_schema(message_descriptor, fields, options)`.
+    `workers` is a number of processes, or an executor, to convert in parallel.
+    """
+    if workers is None or workers == 1:
+        return get_conversion_plan(message_descriptor, fields, options).to_table(
+            messages
+        )
+    else:
+        from arrowgen.parallel import parallel_messages_to_table
 
-def convert_scalar(scalar, field_descriptor: FieldDescriptor):
-    return scalar.as_py()
+        return parallel_messages_to_table(
+            messages, message_descriptor, workers, fields, options
+        )
 
 
 def struct_array_to_messages(
-    struct_array: pyarrow.StructArray, message_descriptor: Descriptor
+    struct_array: pyarrow.StructArray,
+    message_descriptor: Descriptor,
+    fields: Fields = None,
 ) -> typing.List[Message]:
-    assert len(struct_array.type) == len(message_descriptor.fields)
-    valid = struct_array.is_valid()
-    messages = [
-        message_descriptor._concrete_class() if is_valid.as_py() else None
-        for is_valid in valid
-    ]
-    for i, field_descriptor in enumerate(message_descriptor.fields):
-        extract_field(struct_array.field(i), field_descriptor, messages)
-    return messages
+    return get_conversion_plan(message_descriptor, fields).from_struct_array(
+        struct_array
+    )
 
 
 def chunked_array_to_messages(
     chunked_array: pyarrow.ChunkedArray, message_descriptor: Descriptor
 ) -> typing.List[Message]:
-    if isinstance(chunked_array, pyarrow.ChunkedArray):
-        results = []
-        for chunk in chunked_array.chunks:
-            results.extend(struct_array_to_messages(chunk, message_descriptor))
-        return results
-    else:
-        assert isinstance(chunked_array, pyarrow.StructArray)
-        return struct_array_to_messages(chunked_array, message_descriptor)
+    assert isinstance(chunked_array, (pyarrow.ChunkedArray, pyarrow.StructArray))
+    return get_conversion_plan(message_descriptor).from_struct_array(chunked_array)
 
 
 def list_array_to_list_of_messages(
     list_array: pyarrow.ListArray, message_descriptor: Descriptor
 ) -> typing.List[typing.List[Message]]:
-    values_view = list_array.values
-    values = struct_array_to_messages(values_view, message_descriptor)
-    offsets = list_array.offsets
-    is_valid = list_array.is_valid()
-    results = []
-    for i in range(len(list_array)):
-        if is_valid[i].as_py():
-            results.append(values[offsets[i].as_py() : offsets[i + 1].as_py()])
-        else:
-            results.append(None)
-    return results
+    return get_conversion_plan(message_descriptor).from_list_array(list_array)
 
 
 def chunked_array_to_list_of_messages(
     chunked_array: pyarrow.ChunkedArray, message_descriptor: Descriptor
 ) -> typing.List[typing.List[Message]]:
-    if isinstance(chunked_array, pyarrow.ChunkedArray):
-        results = []
-        for chunk in chunked_array.chunks:
-            results.extend(list_array_to_list_of_messages(chunk, message_descriptor))
-        return results
-    else:
-        assert isinstance(chunked_array, pyarrow.ListArray)
-        return list_array_to_list_of_messages(chunked_array, message_descriptor)
+    assert isinstance(chunked_array, (pyarrow.ChunkedArray, pyarrow.ListArray))
+    return get_conversion_plan(message_descriptor).from_list_array(chunked_array)
 
 
 def assign_values(
@@ -236,24 +1196,7 @@ def assign_values(
     values: typing.List[typing.Any],
     field_descriptor: FieldDescriptor,
 ):
-    assert len(messages) == len(values)
-    if field_descriptor.label == FieldDescriptor.LABEL_REPEATED:
-        for message, value in zip(messages, values):
-            if message is not None and value is not None:
-                if is_timestamp(field_descriptor):
-                    value = [convert_to_proto_timestamp(v) for v in value]
-                getattr(message, field_descriptor.name).extend(value)
-    elif field_descriptor.type == FieldDescriptor.TYPE_MESSAGE:
-        for message, value in zip(messages, values):
-            if message is not None and value is not None:
-                if is_timestamp(field_descriptor):
-                    value = convert_to_proto_timestamp(value)
-
-                getattr(message, field_descriptor.name).CopyFrom(value)
-    else:
-        for message, value in zip(messages, values):
-            if message is not None and value is not None:
-                setattr(message, field_descriptor.name, value)
+    _get_field_plan(field_descriptor).assigner(messages, values)
 
 
 def extract_field(
@@ -261,29 +1204,39 @@ def extract_field(
     field_descriptor: FieldDescriptor,
     messages: typing.List[Message],
 ):
-    if (
-        not is_timestamp(field_descriptor)
-        and field_descriptor.type == FieldDescriptor.TYPE_MESSAGE
-    ):
-        if field_descriptor.label == FieldDescriptor.LABEL_REPEATED:
-            values = chunked_array_to_list_of_messages(
-                array, field_descriptor.message_type
-            )
-        else:
-            values = chunked_array_to_messages(array, field_descriptor.message_type)
+    _get_field_plan(field_descriptor).extract(array, messages)
+
+
+def filter_table(
+    table: typing.Union[pyarrow.Table, pyarrow.RecordBatch], predicate: Predicate
+) -> typing.Union[pyarrow.Table, pyarrow.RecordBatch]:
+    if predicate is None:
+        return table
+    elif isinstance(table, pyarrow.RecordBatch):
+        # RecordBatch.filter only takes expressions from pyarrow 21
+        return pyarrow.Table.from_batches([table]).filter(predicate)
     else:
-        valid_array = array.is_valid()
-        values = [
-            convert_scalar(array[i], field_descriptor) if valid else None
-            for i, valid in enumerate(valid_array)
-        ]
-    assign_values(messages, values, field_descriptor)
+        return table.filter(predicate)
 
 
 def table_to_messages(
-    table: pyarrow.Table, message_descriptor: Descriptor
+    table: pyarrow.Table,
+    message_descriptor: Descriptor,
+    fields: Fields = None,
+    predicate: Predicate = None,
+    workers: Workers = None,
 ) -> typing.List[Message]:
-    messages = [message_descriptor._concrete_class() for _ in range(table.num_rows)]
-    for field_descriptor in message_descriptor.fields:
-        extract_field(table[field_descriptor.name], field_descriptor, messages)
-    return messages
+    """
+    Converts a table to messages, only the columns selected by `fields` are read.
+    The table can have either the full or the projected schema.
+    `predicate` is evaluated on the columns first, so only the matching rows are
+    converted. It can use any column of the table, selected or not.
+    `workers` is a number of processes, or an executor, to convert in parallel.
+    """
+    table = filter_table(table, predicate)
+    if workers is None or workers == 1:
+        return get_conversion_plan(message_descriptor, fields).from_table(table)
+    else:
+        from arrowgen.parallel import parallel_table_to_messages
+
+        return parallel_table_to_messages(table, message_descriptor, workers, fields)
@@ -8,6 +8,7 @@ from typing import Dict, Tuple
 from google.protobuf.descriptor import FileDescriptor
 from jinja2 import Template
 
+from arrowgen.arrow_converter import ConversionOptions, DEFAULT_OPTIONS
 from arrowgen.utils import run_command, load_python_file
 from arrowgen.wrappers import FileWrapper
 
@@ -22,38 +23,51 @@ def clang_format(code: str) -> str:
         return results.stdout
 
 
-def generate_for_descriptor(file_descriptor: FileDescriptor) -> Dict[str, str]:
-    """
-    Generates the arrow appender and returns the file names and content
-    """
+def render(template_name: str, wrapper: FileWrapper) -> str:
+    template = pkgutil.get_data(__name__, "templates/" + template_name).decode("utf-8")
+    return clang_format(Template(template).render(file_wrapper=wrapper))
 
-    wrapper = FileWrapper(file_descriptor)
 
-    header_template = pkgutil.get_data(__name__, "templates/arrow.h").decode("utf-8")
-    header = Template(header_template).render(file_wrapper=wrapper)
-
-    source_template = pkgutil.get_data(__name__, "templates/arrow.cc").decode("utf-8")
-    source = Template(source_template).render(file_wrapper=wrapper)
-    # TODO: format in place
+def generate_for_descriptor(
+    file_descriptor: FileDescriptor, options: ConversionOptions = DEFAULT_OPTIONS
+) -> Dict[str, str]:
+    """
+    Generates the arrow appender and returns the file names and content.
+    The Parquet writers and readers go in their own files, so only the code that
+    uses them needs parquet.
+    """
 
+    wrapper = FileWrapper(file_descriptor, options)
     return {
-        wrapper.appender_header(): clang_format(header),
-        wrapper.appender_source(): clang_format(source),
+        wrapper.appender_header(): render("arrow.h", wrapper),
+        wrapper.appender_source(): render("arrow.cc", wrapper),
+        wrapper.parquet_header(): render("arrow_parquet.h", wrapper),
+        wrapper.parquet_source(): render("arrow_parquet.cc", wrapper),
     }
 
 
-def write_files(content: Dict[str, str]) -> Tuple[str, str]:
+def write_files(content: Dict[str, str]) -> Tuple[str, ...]:
     for file_name, file_content in content.items():
         with (open(file_name, "w")) as fp:
             fp.write(file_content)
     return tuple(content.keys())
 
 
+# Where "arrowgen/options.proto" can be imported from
+OPTIONS_INCLUDE = pathlib.Path(__file__).parent.parent.as_posix()
+
+
 def get_proto_module(proto_file: str):
     with tempfile.TemporaryDirectory() as tempdir:
         include = pathlib.Path(proto_file).parent.as_posix()
         run_command(
-            ["protoc", "--proto_path=" + include, proto_file, "--python_out=" + tempdir]
+            [
+                "protoc",
+                "--proto_path=" + include,
+                "--proto_path=" + OPTIONS_INCLUDE,
+                proto_file,
+                "--python_out=" + tempdir,
+            ]
         )
         python_file = os.path.join(
             tempdir, os.path.basename(proto_file[:-6]) + "_pb2.py"
@@ -61,6 +75,8 @@ def get_proto_module(proto_file: str):
         return load_python_file(python_file)
 
 
-def generate_for_file(proto_file: str) -> Tuple[str, str]:
+def generate_for_file(
+    proto_file: str, options: ConversionOptions = DEFAULT_OPTIONS
+) -> Tuple[str, ...]:
     file_descriptor = get_proto_module(proto_file).DESCRIPTOR
-    return write_files(generate_for_descriptor(file_descriptor))
+    return write_files(generate_for_descriptor(file_descriptor, options))
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: arrowgen/options.proto
+"""Generated protocol buffer code."""
+from google.protobuf.internal import builder as _builder
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+from google.protobuf import descriptor_pb2 as google_dot_protobuf_dot_descriptor__pb2
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16\x61rrowgen/options.proto\x12\x08\x61rrowgen\x1a google/protobuf/descriptor.proto\"\xc2\x01\n\x0c\x41rrowOptions\x12\x17\n\ndictionary\x18\x01 \x01(\x08H\x00\x88\x01\x01\x12\x12\n\x05large\x18\x02 \x01(\x08H\x01\x88\x01\x01\x12\x1b\n\x0etimestamp_unit\x18\x03 \x01(\tH\x02\x88\x01\x01\x12\x14\n\x07\x66loat32\x18\x04 \x01(\x08H\x03\x88\x01\x01\x12\x11\n\x04skip\x18\x05 \x01(\x08H\x04\x88\x01\x01\x42\r\n\x0b_dictionaryB\x08\n\x06_largeB\x11\n\x0f_timestamp_unitB\n\n\x08_float32B\x07\n\x05_skip:N\n\rfield_options\x12\x1d.google.protobuf.FieldOptions\x18\xb8\x8e\x03 \x01(\x0b\x32\x16.arrowgen.ArrowOptions:R\n\x0fmessage_options\x12\x1f.google.protobuf.MessageOptions\x18\xb8\x8e\x03 \x01(\x0b\x32\x16.arrowgen.ArrowOptionsb\x06proto3')
+
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, globals())
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'arrowgen.options_pb2', globals())
+if _descriptor._USE_C_DESCRIPTORS == False:
+  google_dot_protobuf_dot_descriptor__pb2.FieldOptions.RegisterExtension(field_options)
+  google_dot_protobuf_dot_descriptor__pb2.MessageOptions.RegisterExtension(message_options)
+
+  DESCRIPTOR._options = None
+  _ARROWOPTIONS._serialized_start=71
+  _ARROWOPTIONS._serialized_end=265
+# @@protoc_insertion_point(module_scope)
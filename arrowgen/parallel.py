@@ -0,0 +1,203 @@
+"""
+Conversion of large batches over a pool of processes.
+
+Descriptors can't be pickled, so the workers rebuild them from the serialized
+proto files. Messages travel as serialized bytes and tables as arrow IPC
+streams. Results come back in submission order, so the output is the same as
+the single process conversion.
+"""
+
+import concurrent.futures
+import functools
+import math
+import os
+import typing
+
+import pyarrow
+import pyarrow.ipc
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+from google.protobuf.descriptor import Descriptor, FileDescriptor
+from google.protobuf.field_mask_pb2 import FieldMask
+from google.protobuf.message import Message
+
+from arrowgen.arrow_converter import (
+    DEFAULT_OPTIONS,
+    ConversionOptions,
+    Fields,
+    Workers,
+    get_conversion_plan,
+)
+
+# Each worker gets a few chunks, to even out the load
+CHUNKS_PER_WORKER = 4
+
+
+def _add_file(
+    file_descriptor: FileDescriptor,
+    file_set: descriptor_pb2.FileDescriptorSet,
+    seen: typing.Set[str],
+):
+    if file_descriptor.name not in seen:
+        seen.add(file_descriptor.name)
+        for dependency in file_descriptor.dependencies:
+            _add_file(dependency, file_set, seen)
+        file_descriptor.CopyToProto(file_set.file.add())
+
+
+def get_file_descriptor_set(message_descriptor: Descriptor) -> bytes:
+    """The file of the message and its dependencies, dependencies first"""
+    file_set = descriptor_pb2.FileDescriptorSet()
+    _add_file(message_descriptor.file, file_set, set())
+    return file_set.SerializeToString()
+
+
+@functools.lru_cache(maxsize=32)
+def _load_descriptor(file_descriptor_set: bytes, full_name: str) -> Descriptor:
+    file_set = descriptor_pb2.FileDescriptorSet.FromString(file_descriptor_set)
+    pool = descriptor_pool.DescriptorPool()
+    for file_proto in file_set.file:
+        pool.Add(file_proto)
+    message_descriptor = pool.FindMessageTypeByName(full_name)
+    message_factory.GetMessageClass(message_descriptor)
+    return message_descriptor
+
+
+def _get_paths(fields: Fields) -> typing.Optional[typing.List[str]]:
+    """Field masks don't pickle across descriptor pools, send the paths"""
+    if fields is None or isinstance(fields, str):
+        return fields
+    elif isinstance(fields, FieldMask):
+        return list(fields.paths)
+    else:
+        return list(fields)
+
+
+def _write_ipc(record_batch: pyarrow.RecordBatch) -> pyarrow.Buffer:
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, record_batch.schema) as writer:
+        writer.write_batch(record_batch)
+    return sink.getvalue()
+
+
+def _read_ipc(buffer: pyarrow.Buffer) -> typing.List[pyarrow.RecordBatch]:
+    return list(pyarrow.ipc.open_stream(buffer))
+
+
+def _payloads_to_ipc(
+    file_descriptor_set: bytes,
+    full_name: str,
+    fields: typing.Optional[typing.List[str]],
+    options: ConversionOptions,
+    payloads: typing.List[bytes],
+) -> bytes:
+    message_descriptor = _load_descriptor(file_descriptor_set, full_name)
+    message_class = message_descriptor._concrete_class
+    messages = [message_class.FromString(payload) for payload in payloads]
+    plan = get_conversion_plan(message_descriptor, fields, options)
+    return _write_ipc(plan.to_record_batch(messages)).to_pybytes()
+
+
+def _ipc_to_payloads(
+    file_descriptor_set: bytes,
+    full_name: str,
+    fields: typing.Optional[typing.List[str]],
+    ipc: bytes,
+) -> typing.List[bytes]:
+    message_descriptor = _load_descriptor(file_descriptor_set, full_name)
+    plan = get_conversion_plan(message_descriptor, fields)
+    return [
+        message.SerializeToString()
+        for record_batch in _read_ipc(pyarrow.py_buffer(ipc))
+        for message in plan.from_table(record_batch)
+    ]
+
+
+def _get_chunk_size(rows: int, workers: Workers) -> int:
+    """Executors don't tell their size, they are taken to have a worker per cpu"""
+    if isinstance(workers, int):
+        count = workers
+    else:
+        count = os.cpu_count() or 1
+    return max(1, math.ceil(rows / (count * CHUNKS_PER_WORKER)))
+
+
+def _map(
+    workers: Workers, function: typing.Callable, chunks: typing.List
+) -> typing.List:
+    """Runs on the executor, or on a pool of `workers` processes for this call"""
+    if isinstance(workers, concurrent.futures.Executor):
+        return list(workers.map(function, chunks))
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(function, chunks))
+
+
+def parallel_messages_to_table(
+    messages: typing.List[Message],
+    message_descriptor: Descriptor,
+    workers: Workers,
+    fields: Fields = None,
+    options: ConversionOptions = DEFAULT_OPTIONS,
+) -> pyarrow.Table:
+    """
+    Same as `messages_to_table`, each chunk of messages converted by a worker.
+    The table has one chunk per worker task.
+    """
+    plan = get_conversion_plan(message_descriptor, fields, options)
+    chunk_size = _get_chunk_size(len(messages), workers)
+    payloads = [message.SerializeToString() for message in messages]
+    function = functools.partial(
+        _payloads_to_ipc,
+        get_file_descriptor_set(message_descriptor),
+        message_descriptor.full_name,
+        _get_paths(fields),
+        options,
+    )
+    results = _map(
+        workers,
+        function,
+        [
+            payloads[start : start + chunk_size]
+            for start in range(0, len(payloads), chunk_size)
+        ],
+    )
+    return pyarrow.Table.from_batches(
+        [
+            record_batch
+            for result in results
+            for record_batch in _read_ipc(pyarrow.py_buffer(result))
+        ],
+        schema=plan.schema,
+    )
+
+
+def parallel_table_to_messages(
+    table: pyarrow.Table,
+    message_descriptor: Descriptor,
+    workers: Workers,
+    fields: Fields = None,
+) -> typing.List[Message]:
+    """
+    Same as `table_to_messages`, the record batches of the table are converted by
+    the workers. Batches larger than a fair share of the rows are sliced.
+    """
+    plan = get_conversion_plan(message_descriptor, fields)
+    # Only ship the columns the workers read
+    table = table.select([field.name for field in plan.fields])
+    chunk_size = _get_chunk_size(table.num_rows, workers)
+    chunks = [
+        _write_ipc(record_batch.slice(start, chunk_size)).to_pybytes()
+        for record_batch in table.to_batches()
+        for start in range(0, record_batch.num_rows, chunk_size)
+    ]
+    function = functools.partial(
+        _ipc_to_payloads,
+        get_file_descriptor_set(message_descriptor),
+        message_descriptor.full_name,
+        _get_paths(fields),
+    )
+    message_class = plan.message_descriptor._concrete_class
+    return [
+        message_class.FromString(payload)
+        for payloads in _map(workers, function, chunks)
+        for payload in payloads
+    ]
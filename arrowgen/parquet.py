@@ -0,0 +1,158 @@
+"""
+Streaming between protobuf messages and Parquet files, one row group at a time
+"""
+
+import collections
+import concurrent.futures
+import threading
+import typing
+
+import pyarrow
+import pyarrow.parquet
+from google.protobuf.descriptor import Descriptor
+from google.protobuf.message import Message
+
+from arrowgen.arrow_converter import (
+    DEFAULT_OPTIONS,
+    ConversionOptions,
+    Fields,
+    get_conversion_plan,
+)
+from arrowgen.streaming import DEFAULT_MAX_ROWS, MessageAppender
+
+# Path, file object or buffer, anything `pyarrow.parquet` can read or write
+Where = typing.Any
+
+
+class ParquetMessageWriter:
+    """
+    Writes messages to a Parquet file, a row group every `max_rows` messages or
+    `max_bytes` (serialized size of the messages), so only one row group worth
+    of messages is held in memory.
+    `compression`, `use_dictionary` and any other keyword argument are passed to
+    `pyarrow.parquet.ParquetWriter`.
+    """
+
+    def __init__(
+        self,
+        where: Where,
+        message_descriptor: Descriptor,
+        max_rows: typing.Optional[int] = DEFAULT_MAX_ROWS,
+        max_bytes: typing.Optional[int] = None,
+        compression: typing.Union[str, typing.Dict[str, str]] = "snappy",
+        use_dictionary: typing.Union[bool, typing.List[str]] = True,
+        fields: Fields = None,
+        options: ConversionOptions = DEFAULT_OPTIONS,
+        **writer_options,
+    ):
+        self.appender = MessageAppender(
+            message_descriptor, max_rows, max_bytes, fields, options
+        )
+        # Nanosecond timestamps, the default from pyarrow 13
+        writer_options.setdefault("version", "2.6")
+        self.writer = pyarrow.parquet.ParquetWriter(
+            where,
+            self.appender.schema,
+            compression=compression,
+            use_dictionary=use_dictionary,
+            **writer_options,
+        )
+
+    @property
+    def schema(self) -> pyarrow.Schema:
+        return self.appender.schema
+
+    def append(self, message: Message):
+        self.appender.append(message)
+        if self.appender.is_full():
+            self.flush()
+
+    def extend(self, messages: typing.Iterable[Message]):
+        for message in messages:
+            self.append(message)
+
+    def flush(self):
+        """Writes the pending messages as a row group, if there are any"""
+        batch = self.appender.flush()
+        if batch is not None:
+            self.writer.write_batch(batch, row_group_size=batch.num_rows)
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self) -> "ParquetMessageWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ParquetMessageReader:
+    """
+    Reads the messages of a Parquet file one row group at a time, only the
+    columns selected by `fields`.
+    With `threads`, that many row groups are read and decompressed ahead, in
+    background threads, while the messages of the current one are converted.
+    """
+
+    def __init__(
+        self,
+        source: Where,
+        message_descriptor: Descriptor,
+        fields: Fields = None,
+        threads: int = 0,
+    ):
+        if threads < 0:
+            raise ValueError(f"threads should not be negative, got {threads}")
+        self.plan = get_conversion_plan(message_descriptor, fields)
+        self.source = source
+        self.parquet_file = pyarrow.parquet.ParquetFile(source)
+        self.columns = [field.name for field in self.plan.fields]
+        self.threads = threads
+        self._local = threading.local()
+
+    @property
+    def num_row_groups(self) -> int:
+        return self.parquet_file.num_row_groups
+
+    def _get_parquet_file(self) -> pyarrow.parquet.ParquetFile:
+        """Each thread reads through its own file, sharing the metadata"""
+        if threading.current_thread() is threading.main_thread():
+            return self.parquet_file
+        parquet_file = getattr(self._local, "parquet_file", None)
+        if parquet_file is None:
+            parquet_file = self._local.parquet_file = pyarrow.parquet.ParquetFile(
+                self.source, metadata=self.parquet_file.metadata
+            )
+        return parquet_file
+
+    def read_row_group(self, index: int) -> pyarrow.Table:
+        return self._get_parquet_file().read_row_group(
+            index, columns=self.columns, use_threads=False
+        )
+
+    def read_messages(self, index: int) -> typing.List[Message]:
+        return self.plan.from_table(self.read_row_group(index))
+
+    def iter_row_groups(self) -> typing.Iterator[pyarrow.Table]:
+        if not self.threads:
+            for index in range(self.num_row_groups):
+                yield self.read_row_group(index)
+            return
+        indices = iter(range(self.num_row_groups))
+        with concurrent.futures.ThreadPoolExecutor(self.threads) as executor:
+            pending = collections.deque(
+                executor.submit(self.read_row_group, index)
+                for _, index in zip(range(self.threads), indices)
+            )
+            while pending:
+                table = pending.popleft().result()
+                index = next(indices, None)
+                if index is not None:
+                    pending.append(executor.submit(self.read_row_group, index))
+                yield table
+
+    def __iter__(self) -> typing.Iterator[Message]:
+        for table in self.iter_row_groups():
+            yield from self.plan.from_table(table)
@@ -0,0 +1,302 @@
+"""
+Read only views of arrow rows, with the same attributes as the protobuf messages
+"""
+
+import collections.abc
+import functools
+import typing
+
+import pyarrow
+import pyarrow.compute
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+from google.protobuf.message import Message
+
+from arrowgen.arrow_converter import (
+    ConversionPlan,
+    FieldPlan,
+    get_conversion_plan,
+    get_enum_dictionary,
+    get_field_encoding,
+    get_validity,
+    get_values_and_offsets,
+    is_timestamp,
+)
+from arrowgen.streaming import DEFAULT_BATCH_SIZE, Source, iter_batches
+
+
+def _is_numpy_friendly(data_type: pyarrow.DataType) -> bool:
+    return (
+        pyarrow.types.is_integer(data_type)
+        or pyarrow.types.is_floating(data_type)
+        or pyarrow.types.is_boolean(data_type)
+    )
+
+
+class ValueAccessor:
+    """
+    Reads single values of a scalar column.
+    Numeric columns without nulls are read from numpy, zero copy but for booleans.
+    """
+
+    def __init__(self, array: pyarrow.Array):
+        self.array = array
+        if array.null_count == 0 and _is_numpy_friendly(array.type):
+            self.values = array.to_numpy(zero_copy_only=False)
+        else:
+            self.values = None
+
+    def get(self, index: int) -> typing.Any:
+        if self.values is not None:
+            return self.values[index].item()
+        else:
+            return self.array[index].as_py()
+
+
+def _get_field_paths(
+    message_descriptor: Descriptor, arrow_fields: typing.Iterable[pyarrow.Field]
+) -> typing.List[str]:
+    """The field paths of the columns of projected data, to convert it back"""
+    paths = []
+    for arrow_field in arrow_fields:
+        field_descriptor = message_descriptor.fields_by_name[arrow_field.name]
+        data_type = arrow_field.type
+        if pyarrow.types.is_list(data_type) or pyarrow.types.is_large_list(data_type):
+            data_type = data_type.value_type
+        if (
+            field_descriptor.type == FieldDescriptor.TYPE_MESSAGE
+            and not is_timestamp(field_descriptor)
+            and data_type.num_fields > 0
+        ):
+            paths.extend(
+                f"{arrow_field.name}.{path}"
+                for path in _get_field_paths(field_descriptor.message_type, data_type)
+            )
+        else:
+            paths.append(arrow_field.name)
+    return paths
+
+
+class ListAccessor:
+    def __init__(self, list_array: pyarrow.ListArray, item_accessor):
+        self.validity = get_validity(list_array)
+        self.offsets = get_values_and_offsets(list_array)[1]
+        self.item_accessor = item_accessor
+
+    def get(self, index: int) -> typing.Optional["ListView"]:
+        if not self.validity[index]:
+            return None
+        return ListView(
+            self.item_accessor, self.offsets[index], self.offsets[index + 1]
+        )
+
+
+class MessageAccessor:
+    """
+    Reads the fields of a record batch or a struct array, building the accessors
+    of the columns on first use
+    """
+
+    def __init__(
+        self,
+        message_descriptor: Descriptor,
+        struct_array: typing.Optional[pyarrow.StructArray] = None,
+        record_batch: typing.Optional[pyarrow.RecordBatch] = None,
+    ):
+        self.view_class = get_row_view_class(message_descriptor)
+        self.plan = get_conversion_plan(message_descriptor)
+        self.struct_array = struct_array
+        self.validity = None if struct_array is None else get_validity(struct_array)
+        self.record_batch = record_batch
+        self.accessors = [None] * len(self.plan.fields)
+        self.message_plan = None
+
+    @staticmethod
+    def for_record_batch(
+        record_batch: pyarrow.RecordBatch, message_descriptor: Descriptor
+    ) -> "MessageAccessor":
+        return MessageAccessor(message_descriptor, record_batch=record_batch)
+
+    @staticmethod
+    def for_struct_array(
+        struct_array: pyarrow.StructArray, message_descriptor: Descriptor
+    ) -> "MessageAccessor":
+        return MessageAccessor(message_descriptor, struct_array=struct_array)
+
+    def _get_column(self, name: str) -> pyarrow.Array:
+        """Columns are looked up by name, so projected data can be viewed"""
+        if self.record_batch is not None:
+            return self.record_batch.column(name)
+        else:
+            return self.struct_array.field(name)
+
+    def field_value(self, position: int, index: int) -> typing.Any:
+        accessor = self.accessors[position]
+        if accessor is None:
+            field_plan = self.plan.fields[position]
+            accessor = self.accessors[position] = _make_accessor(
+                field_plan, self._get_column(field_plan.name)
+            )
+        return accessor.get(index)
+
+    def get(self, index: int) -> typing.Optional["RowView"]:
+        if self.validity is not None and not self.validity[index]:
+            return None
+        return self.view_class(self, index)
+
+    def _get_message_plan(self) -> ConversionPlan:
+        """The plan of the columns that are there, which may be a projection"""
+        if self.message_plan is None:
+            arrow_fields = (
+                self.record_batch.schema
+                if self.record_batch is not None
+                else self.struct_array.type
+            )
+            if list(arrow_fields) == list(self.plan.schema):
+                self.message_plan = self.plan
+            else:
+                self.message_plan = get_conversion_plan(
+                    self.plan.message_descriptor,
+                    _get_field_paths(self.plan.message_descriptor, arrow_fields),
+                )
+        return self.message_plan
+
+    def to_message(self, index: int) -> Message:
+        plan = self._get_message_plan()
+        if self.record_batch is not None:
+            return plan.from_table(self.record_batch.slice(index, 1))[0]
+        else:
+            return plan.from_struct_array(self.struct_array.slice(index, 1))[0]
+
+
+def _make_value_accessor(field_plan: FieldPlan, array: pyarrow.Array):
+    if field_plan.is_message:
+        return MessageAccessor.for_struct_array(
+            array, field_plan.message_plan.message_descriptor
+        )
+    elif field_plan.is_enum and pyarrow.types.is_dictionary(array.type):
+        return ValueAccessor(
+            get_enum_dictionary(field_plan.field_descriptor.enum_type).decode(array)
+        )
+    else:
+        return ValueAccessor(array)
+
+
+def _make_accessor(field_plan: FieldPlan, array: pyarrow.Array):
+    if field_plan.is_repeated:
+        return ListAccessor(
+            array, _make_value_accessor(field_plan, get_values_and_offsets(array)[0])
+        )
+    else:
+        return _make_value_accessor(field_plan, array)
+
+
+class ListView(collections.abc.Sequence):
+    """Lazy view of a repeated field"""
+
+    __slots__ = ("_accessor", "_begin", "_end")
+
+    def __init__(self, accessor, begin: int, end: int):
+        self._accessor = accessor
+        self._begin = begin
+        self._end = end
+
+    def __len__(self) -> int:
+        return self._end - self._begin
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError(item)
+        return self._accessor.get(self._begin + item)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class RowView:
+    """
+    Base class of the views, attributes are generated for each message type
+    by `get_row_view_class`
+    """
+
+    __slots__ = ("_accessor", "_index")
+    DESCRIPTOR: Descriptor = None
+
+    def __init__(self, accessor: MessageAccessor, index: int):
+        self._accessor = accessor
+        self._index = index
+
+    def to_message(self) -> Message:
+        return self._accessor.to_message(self._index)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{field.name}={getattr(self, field.name)!r}"
+            for field in self._accessor.plan.fields
+        )
+        return f"{type(self).__name__}({fields})"
+
+
+def _field_property(position: int, field_descriptor: FieldDescriptor) -> property:
+    def getter(self: RowView):
+        return self._accessor.field_value(position, self._index)
+
+    return property(getter, doc=f"Value of {field_descriptor.full_name}")
+
+
+@functools.lru_cache(maxsize=128)
+def get_row_view_class(message_descriptor: Descriptor) -> typing.Type[RowView]:
+    # Skipped fields aren't in arrow, so they have no attribute
+    fields = [
+        field
+        for field in message_descriptor.fields
+        if not get_field_encoding(field).skip
+    ]
+    attributes = {
+        field.name: _field_property(position, field)
+        for position, field in enumerate(fields)
+    }
+    attributes["__slots__"] = ()
+    attributes["DESCRIPTOR"] = message_descriptor
+    return type(message_descriptor.name + "View", (RowView,), attributes)
+
+
+class BatchView(collections.abc.Sequence):
+    """The rows of a record batch, as views"""
+
+    def __init__(
+        self, record_batch: pyarrow.RecordBatch, message_descriptor: Descriptor
+    ):
+        self._accessor = MessageAccessor.for_record_batch(
+            record_batch, message_descriptor
+        )
+        self._length = record_batch.num_rows
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError(item)
+        return self._accessor.get(item)
+
+
+def iter_row_views(
+    source: Source,
+    message_descriptor: Descriptor,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    predicate: typing.Optional[pyarrow.compute.Expression] = None,
+) -> typing.Iterator[RowView]:
+    """Like `iter_messages`, but yields views instead of messages"""
+    for record_batch in iter_batches(source, batch_size, predicate):
+        yield from BatchView(record_batch, message_descriptor)
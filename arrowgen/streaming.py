@@ -0,0 +1,190 @@
+"""
+Incremental conversion between protobuf messages and arrow record batches
+"""
+
+import os
+import typing
+
+import pyarrow
+import pyarrow.compute
+import pyarrow.ipc
+from google.protobuf.descriptor import Descriptor
+from google.protobuf.message import Message
+
+from arrowgen.arrow_converter import (
+    DEFAULT_OPTIONS,
+    ConversionOptions,
+    Fields,
+    get_conversion_plan,
+)
+
+DEFAULT_MAX_ROWS = 65_536
+DEFAULT_BATCH_SIZE = 4_096
+IPC_FILE_MAGIC = b"ARROW1"
+
+Source = typing.Union[
+    str,
+    os.PathLike,
+    pyarrow.Table,
+    pyarrow.RecordBatch,
+    pyarrow.RecordBatchReader,
+    typing.Iterable[pyarrow.RecordBatch],
+]
+
+
+class MessageAppender:
+    """
+    Python counterpart of the generated XXXAppender.
+    Messages are kept until `flush` or `build` converts them in one go.
+    `max_rows` and `max_bytes` (serialized size of the messages) tell when
+    `is_full` and it is time to flush.
+    `fields` restricts the columns built.
+    """
+
+    def __init__(
+        self,
+        message_descriptor: Descriptor,
+        max_rows: typing.Optional[int] = DEFAULT_MAX_ROWS,
+        max_bytes: typing.Optional[int] = None,
+        fields: Fields = None,
+        options: ConversionOptions = DEFAULT_OPTIONS,
+    ):
+        if max_rows is not None and max_rows <= 0:
+            raise ValueError(f"max_rows should be positive, got {max_rows}")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError(f"max_bytes should be positive, got {max_bytes}")
+        self.plan = get_conversion_plan(message_descriptor, fields, options)
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self._messages = []
+        self._bytes = 0
+
+    @property
+    def schema(self) -> pyarrow.Schema:
+        return self.plan.schema
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def approximate_bytes(self) -> int:
+        return self._bytes
+
+    def append(self, message: Message):
+        self._messages.append(message)
+        if self.max_bytes is not None:
+            self._bytes += message.ByteSize()
+
+    def extend(self, messages: typing.Iterable[Message]):
+        for message in messages:
+            self.append(message)
+
+    def is_full(self) -> bool:
+        return (self.max_rows is not None and len(self._messages) >= self.max_rows) or (
+            self.max_bytes is not None and self._bytes >= self.max_bytes
+        )
+
+    def flush(self) -> typing.Optional[pyarrow.RecordBatch]:
+        """Converts the pending messages, returns None if there are none"""
+        if not self._messages:
+            return None
+        batch = self.plan.to_record_batch(self._messages)
+        self._messages = []
+        self._bytes = 0
+        return batch
+
+    def build(self) -> pyarrow.Table:
+        """Converts the pending messages to a table, which may be empty"""
+        batch = self.flush()
+        return pyarrow.Table.from_batches(
+            [batch] if batch is not None else [], schema=self.schema
+        )
+
+
+def iter_record_batches(
+    messages: typing.Iterable[Message],
+    message_descriptor: Descriptor,
+    max_rows: typing.Optional[int] = DEFAULT_MAX_ROWS,
+    max_bytes: typing.Optional[int] = None,
+    fields: Fields = None,
+    options: ConversionOptions = DEFAULT_OPTIONS,
+) -> typing.Iterator[pyarrow.RecordBatch]:
+    """
+    Consumes messages lazily and yields a record batch every time `max_rows`
+    or `max_bytes` is reached, so only one batch worth of messages is in memory
+    """
+    appender = MessageAppender(message_descriptor, max_rows, max_bytes, fields, options)
+    for message in messages:
+        appender.append(message)
+        if appender.is_full():
+            yield appender.flush()
+    batch = appender.flush()
+    if batch is not None:
+        yield batch
+
+
+def _iter_ipc_file(path: typing.Union[str, os.PathLike]):
+    with pyarrow.memory_map(os.fspath(path)) as source:
+        if source.read(len(IPC_FILE_MAGIC)) == IPC_FILE_MAGIC:
+            source.seek(0)
+            reader = pyarrow.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+        else:
+            source.seek(0)
+            yield from pyarrow.ipc.open_stream(source)
+
+
+def iter_batches(
+    source: Source,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    predicate: typing.Optional[pyarrow.compute.Expression] = None,
+) -> typing.Iterator[pyarrow.RecordBatch]:
+    """
+    Yields zero-copy slices of at most `batch_size` rows from the source.
+    Paths are arrow IPC files (or streams), memory mapped.
+    With a `predicate`, slices are filtered and the empty ones skipped.
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size should be positive, got {batch_size}")
+    if predicate is not None and not isinstance(predicate, pyarrow.compute.Expression):
+        # Masks can't be lined up with the slices
+        raise TypeError(
+            f"predicate should be a pyarrow.compute.Expression, got {type(predicate)}"
+        )
+    if isinstance(source, (str, os.PathLike)):
+        batches = _iter_ipc_file(source)
+    elif isinstance(source, pyarrow.Table):
+        batches = source.to_batches()
+    elif isinstance(source, pyarrow.RecordBatch):
+        batches = [source]
+    else:
+        batches = source
+    for batch in batches:
+        for offset in range(0, batch.num_rows, batch_size):
+            if predicate is None:
+                yield batch.slice(offset, batch_size)
+            else:
+                # RecordBatch.filter only takes expressions from pyarrow 21
+                filtered = pyarrow.Table.from_batches(
+                    [batch.slice(offset, batch_size)]
+                ).filter(predicate)
+                # Empty tables have no batches
+                yield from filtered.combine_chunks().to_batches()
+
+
+def iter_messages(
+    source: Source,
+    message_descriptor: Descriptor,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    fields: Fields = None,
+    predicate: typing.Optional[pyarrow.compute.Expression] = None,
+) -> typing.Iterator[Message]:
+    """
+    Lazily converts the source back to messages, one slice of `batch_size` rows
+    at a time, so memory is bounded by the batch size rather than the table size.
+    Only the columns selected by `fields` are read, and only the rows matching
+    `predicate` are converted.
+    """
+    plan = get_conversion_plan(message_descriptor, fields)
+    for batch in iter_batches(source, batch_size, predicate):
+        yield from plan.from_table(batch)
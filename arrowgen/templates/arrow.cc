@@ -1,10 +1,436 @@
 #include "{{file_wrapper.appender_header()}}"
 
+#include <algorithm>
+#include <atomic>
+#include <cstring>
+#include <limits>
+#include <string_view>
+
+#include <arrow/io/file.h>
+#include <arrow/util/future.h>
+#include <arrow/util/utf8.h>
+
+
+{% macro load_chunk(field) -%}
+        {% if field.is_repeated() %}
+        {{field.list_array_name()}} = {{field.list_array_caster()}}({{field.get_array_statement()}});
+        {{field.array_name()}} = {{field.array_caster()}}({{field.list_array_name()}}->values());
+        {% else %}
+        {{field.array_name()}} = {{field.array_caster()}}({{field.get_array_statement()}});
+        {% endif %}
+        {% if field.is_enum_dictionary() %}
+        {{field.numbers_name()}} = {{field.numbers_statement()}};
+        {% endif %}
+{%- endmacro %}
+
+{% macro next_chunk(field) -%}
+    while ({{field.index_name()}} >= {{field.main_array_name()}}{{field.length_statement()}}) {
+        {{field.index_name()}} = 0;
+        ++{{field.chunk_name()}};
+        {{ load_chunk(field) }}
+    }
+{%- endmacro %}
+
+{% macro read_field(field, row_index) -%}
+    {% if field.is_oneof() %}
+    if (!{{ field.is_null_statement(row_index) }})
+    {
+    {% endif %}
+    {% if field.is_repeated() %}
+    {
+      {{field.offset_type()}} const values_begin = {{field.list_array_name()}}->value_offset({{row_index}});
+      {{field.offset_type()}} const values_end = {{field.list_array_name()}}->value_offset({{row_index}} + 1);
+      // Grows the field once, on the arena of the message if it has one
+      message.mutable_{{field.name()}}()->Reserve(message.{{field.name()}}_size() + static_cast<int>(values_end - values_begin));
+      for ({{field.offset_type()}} value_index = values_begin; value_index < values_end; ++value_index) {
+        {% if field.is_message() %}
+        {{field.array_name()}}.GetValue(value_index, *message.add_{{ field.name() }}());
+        {% else %}
+        message.add_{{field.name()}}({{field.value_statement("value_index")}} );
+        {% endif %}
+      }
+    }
+    {% elif field.is_message() %}
+    {{field.array_name()}}.GetValue({{row_index}}, *message.mutable_{{field.name()}}());
+    {% else %}
+    message.set_{{field.name()}}({{field.value_statement(row_index)}});
+    {% endif %}
+    {% if field.is_oneof() %}
+    }
+    {% endif %}
+{%- endmacro %}
+
+{% macro read_batch(wrapper, grow, message) -%}
+  ARROW_RETURN_NOT_OK(status_);
+  while (n > 0 && !end()) {
+    // The rows left in the current chunk of every column
+    int64_t run = std::min(static_cast<int64_t>(n), table_->num_rows() - current_);
+    {% for field in wrapper.reader_fields() -%}
+    {{ next_chunk(field) }}
+    run = std::min(run, static_cast<int64_t>({{field.main_array_name()}}{{field.length_statement()}} - {{field.index_name()}}));
+    {% endfor %}
+    size_t const first = messages.size();
+    {{ grow }}
+    {% for field in wrapper.reader_fields() -%}
+    for (int64_t row = 0; row < run; ++row) {
+      {{wrapper.message_name()}}& message = {{ message }};
+      {{ read_field(field, field.index_name() + " + row") }}
+    }
+    {{field.index_name()}} += run;
+    {% endfor %}
+    current_ += run;
+    n -= run;
+    status_ = loadNext();
+    ARROW_RETURN_NOT_OK(status_);
+  }
+  return arrow::Status::OK();
+{%- endmacro %}
 
 {% for namespace in file_wrapper.namespaces() -%}
 namespace {{namespace}} {
 {% endfor %}
 
+{% if file_wrapper.enum_wrappers() -%}
+namespace {
+
+std::shared_ptr<arrow::Array> makeEnumDictionary(std::vector<std::string> const& names) {
+  arrow::StringBuilder builder;
+  std::shared_ptr<arrow::Array> dictionary;
+  arrow::Status status = builder.AppendValues(names);
+  if (status.ok()) {
+    status = builder.Finish(&dictionary);
+  }
+  if (!status.ok()) {
+    status.Abort("Could not build enum dictionary");
+  }
+  return dictionary;
+}
+
+{% for enum_wrapper in file_wrapper.enum_wrappers() -%}
+std::shared_ptr<arrow::Array> const& {{enum_wrapper.dictionary_function()}}() {
+  static std::shared_ptr<arrow::Array> const dictionary = makeEnumDictionary({
+    {% for name in enum_wrapper.names() -%}
+    "{{name}}"{{ "," if not loop.last }}
+    {% endfor %}
+  });
+  return dictionary;
+}
+
+arrow::Result<int32_t> {{enum_wrapper.index_function()}}(int const value) {
+  switch (value) {
+    {% for number, index in enum_wrapper.index_cases() -%}
+    case {{number}}: return {{index}};
+    {% endfor -%}
+    default: return arrow::Status::Invalid("{{enum_wrapper.descriptor.full_name}} has no value ", value);
+  }
+}
+
+// Names missing from the enum read as the default value
+std::vector<int> {{enum_wrapper.numbers_function()}}(std::shared_ptr<arrow::DictionaryArray> const& array) {
+  arrow::StringArray const& names = static_cast<arrow::StringArray const&>(*array->dictionary());
+  std::vector<int> numbers(names.length(), 0);
+  for (int64_t index = 0; index < names.length(); ++index) {
+    {{enum_wrapper.enum_name()}} value;
+    if ({{enum_wrapper.parse_function()}}(names.GetString(index), &value)) {
+      numbers[index] = value;
+    }
+  }
+  return numbers;
+}
+
+{% endfor -%}
+} // namespace
+{% endif %}
+
+namespace {
+
+// Reads the varint length prefix of a delimited message, at most 5 bytes
+arrow::Status readLength(const char*& position, const char* end, size_t& length) {
+  length = 0;
+  for (int shift = 0; shift < 35 && position < end; shift += 7) {
+    uint8_t const byte = static_cast<uint8_t>(*position++);
+    length |= static_cast<size_t>(byte & 0x7F) << shift;
+    if (byte < 0x80) {
+      return arrow::Status::OK();
+    }
+  }
+  return arrow::Status::SerializationError("Invalid length prefix");
+}
+
+// The wire format, https://protobuf.dev/programming-guides/encoding/
+enum WireType : uint64_t {
+  WIRETYPE_VARINT = 0,
+  WIRETYPE_FIXED64 = 1,
+  WIRETYPE_LENGTH_DELIMITED = 2,
+  WIRETYPE_START_GROUP = 3,
+  WIRETYPE_END_GROUP = 4,
+  WIRETYPE_FIXED32 = 5,
+};
+
+bool readVarint(const char*& position, const char* end, uint64_t& value) {
+  value = 0;
+  for (int shift = 0; shift < 64 && position < end; shift += 7) {
+    uint8_t const byte = static_cast<uint8_t>(*position++);
+    value |= static_cast<uint64_t>(byte & 0x7F) << shift;
+    if (byte < 0x80) {
+      return true;
+    }
+  }
+  return false;
+}
+
+// Little endian on the wire, as on the hosts arrow runs on
+template <class T> bool readFixed(const char*& position, const char* end, T& value) {
+  if (end - position < static_cast<std::ptrdiff_t>(sizeof(T))) {
+    return false;
+  }
+  std::memcpy(&value, position, sizeof(T));
+  position += sizeof(T);
+  return true;
+}
+
+// Length delimited values point into the input, nothing is copied
+bool readBytes(const char*& position, const char* end, std::string_view& value) {
+  uint64_t length;
+  if (!readVarint(position, end, length) || length > static_cast<uint64_t>(end - position)) {
+    return false;
+  }
+  value = std::string_view(position, length);
+  position += length;
+  return true;
+}
+
+int32_t decodeZigZag32(uint64_t const value) {
+  uint32_t const bits = static_cast<uint32_t>(value);
+  return static_cast<int32_t>((bits >> 1) ^ (~(bits & 1) + 1));
+}
+
+int64_t decodeZigZag64(uint64_t const value) {
+  return static_cast<int64_t>((value >> 1) ^ (~(value & 1) + 1));
+}
+
+// proto3 strings must be valid UTF-8, as checked by ParseFromArray
+bool isUtf8(std::string_view const value) {
+  static bool const initialized = (arrow::util::InitializeUTF8(), true);
+  return initialized && arrow::util::ValidateUTF8(value);
+}
+
+// Skips a field of unknown number or wire type, groups included
+bool skipField(const char*& position, const char* end, uint64_t tag) {
+  int depth = 0;
+  while (true) {
+    switch (tag & 7) {
+      case WIRETYPE_VARINT: {
+        uint64_t value;
+        if (!readVarint(position, end, value)) {
+          return false;
+        }
+        break;
+      }
+      case WIRETYPE_FIXED64: {
+        uint64_t value;
+        if (!readFixed(position, end, value)) {
+          return false;
+        }
+        break;
+      }
+      case WIRETYPE_LENGTH_DELIMITED: {
+        std::string_view value;
+        if (!readBytes(position, end, value)) {
+          return false;
+        }
+        break;
+      }
+      case WIRETYPE_START_GROUP:
+        ++depth;
+        break;
+      case WIRETYPE_END_GROUP:
+        if (depth == 0) {
+          return false;
+        }
+        --depth;
+        break;
+      case WIRETYPE_FIXED32: {
+        uint32_t value;
+        if (!readFixed(position, end, value)) {
+          return false;
+        }
+        break;
+      }
+      default:
+        return false;
+    }
+    if (depth == 0) {
+      return true;
+    } else if (!readVarint(position, end, tag) || (tag >> 3) == 0) {
+      return false;
+    }
+  }
+}
+
+// The bytes of a message field. Like ParseFromArray, occurrences of the same
+// field are merged, which for the wire format is a concatenation.
+class MessageBytes {
+public:
+  void add(std::string_view const value) {
+    if (view_.empty()) {
+      view_ = value;
+    } else {
+      if (merged_.empty()) {
+        merged_.assign(view_);
+      }
+      merged_.append(value);
+      view_ = merged_;
+    }
+  }
+
+  void clear() {
+    view_ = std::string_view();
+    merged_.clear();
+  }
+
+  const char* data() const { return view_.data(); }
+  size_t size() const { return view_.size(); }
+
+private:
+  std::string_view view_;
+  std::string merged_;
+};
+
+// The capacity of a builder and its children, depth first
+void saveCapacity(arrow::ArrayBuilder const& builder, std::vector<int64_t>& capacities) {
+  capacities.push_back(builder.capacity());
+  switch (builder.type()->id()) {
+    case arrow::Type::STRING:
+    case arrow::Type::BINARY:
+      capacities.push_back(static_cast<arrow::BinaryBuilder const&>(builder).value_data_capacity());
+      break;
+    case arrow::Type::LARGE_STRING:
+    case arrow::Type::LARGE_BINARY:
+      capacities.push_back(static_cast<arrow::LargeBinaryBuilder const&>(builder).value_data_capacity());
+      break;
+    case arrow::Type::LIST:
+      saveCapacity(*static_cast<arrow::ListBuilder const&>(builder).value_builder(), capacities);
+      break;
+    case arrow::Type::LARGE_LIST:
+      saveCapacity(*static_cast<arrow::LargeListBuilder const&>(builder).value_builder(), capacities);
+      break;
+    case arrow::Type::STRUCT:
+      for (int i = 0; i < builder.num_children(); ++i) {
+        saveCapacity(*builder.child_builder(i), capacities);
+      }
+      break;
+    default:
+      break;
+  }
+}
+
+// Reserves, in an empty builder, the capacity saved by saveCapacity
+arrow::Status restoreCapacity(arrow::ArrayBuilder& builder, std::vector<int64_t>::const_iterator& capacity) {
+  ARROW_RETURN_NOT_OK(builder.Reserve(*capacity++));
+  switch (builder.type()->id()) {
+    case arrow::Type::STRING:
+    case arrow::Type::BINARY:
+      return static_cast<arrow::BinaryBuilder&>(builder).ReserveData(*capacity++);
+    case arrow::Type::LARGE_STRING:
+    case arrow::Type::LARGE_BINARY:
+      return static_cast<arrow::LargeBinaryBuilder&>(builder).ReserveData(*capacity++);
+    case arrow::Type::LIST:
+      return restoreCapacity(*static_cast<arrow::ListBuilder&>(builder).value_builder(), capacity);
+    case arrow::Type::LARGE_LIST:
+      return restoreCapacity(*static_cast<arrow::LargeListBuilder&>(builder).value_builder(), capacity);
+    case arrow::Type::STRUCT:
+      for (int i = 0; i < builder.num_children(); ++i) {
+        ARROW_RETURN_NOT_OK(restoreCapacity(*builder.child_builder(i), capacity));
+      }
+      return arrow::Status::OK();
+    default:
+      return arrow::Status::OK();
+  }
+}
+
+arrow::Status restoreCapacities(
+    std::vector<std::shared_ptr<arrow::ArrayBuilder>> const& builders, std::vector<int64_t> const& capacities) {
+  std::vector<int64_t>::const_iterator capacity = capacities.begin();
+  for (std::shared_ptr<arrow::ArrayBuilder> const& builder : builders) {
+    ARROW_RETURN_NOT_OK(restoreCapacity(*builder, capacity));
+  }
+  return arrow::Status::OK();
+}
+
+// Memory taken by the values of a builder and its children
+int64_t builderBytes(arrow::ArrayBuilder const& builder) {
+  int64_t const length = builder.length();
+  int64_t const validity = (length + 7) / 8;
+  switch (builder.type()->id()) {
+    case arrow::Type::STRING:
+    case arrow::Type::BINARY:
+      return validity + length * 4 + static_cast<arrow::BinaryBuilder const&>(builder).value_data_length();
+    case arrow::Type::LARGE_STRING:
+    case arrow::Type::LARGE_BINARY:
+      return validity + length * 8 + static_cast<arrow::LargeBinaryBuilder const&>(builder).value_data_length();
+    case arrow::Type::LIST:
+      return validity + length * 4 + builderBytes(*static_cast<arrow::ListBuilder const&>(builder).value_builder());
+    case arrow::Type::LARGE_LIST:
+      return validity + length * 8 + builderBytes(*static_cast<arrow::LargeListBuilder const&>(builder).value_builder());
+    case arrow::Type::STRUCT: {
+      int64_t bytes = validity;
+      for (int i = 0; i < builder.num_children(); ++i) {
+        bytes += builderBytes(*builder.child_builder(i));
+      }
+      return bytes;
+    }
+    case arrow::Type::DICTIONARY:
+      // The indices, the dictionary is shared by the batches
+      return validity + length * 4;
+    default:
+      if (arrow::is_fixed_width(builder.type()->id())) {
+        return validity + length * static_cast<arrow::FixedWidthType const&>(*builder.type()).bit_width() / 8;
+      } else {
+        return validity;
+      }
+  }
+}
+
+// The first row of each chunk
+std::vector<int64_t> chunkOffsets(arrow::ChunkedArray const& column) {
+  std::vector<int64_t> offsets;
+  offsets.reserve(column.num_chunks());
+  int64_t offset = 0;
+  for (std::shared_ptr<arrow::Array> const& chunk : column.chunks()) {
+    offsets.push_back(offset);
+    offset += chunk->length();
+  }
+  return offsets;
+}
+
+// The chunk holding a row, the last one if there are empty chunks before it
+uint64_t findChunk(std::vector<int64_t> const& offsets, int64_t row) {
+  return std::upper_bound(offsets.begin(), offsets.end(), row) - offsets.begin() - 1;
+}
+
+// A table with an empty chunk per column, rather than no chunk
+std::shared_ptr<arrow::Table> emptyTable(std::shared_ptr<arrow::Schema> const& schema) {
+  return arrow::Table::MakeEmpty(schema).ValueOrDie();
+}
+
+// A stable index per thread, in the order threads first ask for it, to spread them over shards
+size_t threadIndex() {
+  static std::atomic<size_t> next(0);
+  thread_local size_t const index = next++;
+  return index;
+}
+
+std::vector<int64_t> saveCapacities(std::vector<std::shared_ptr<arrow::ArrayBuilder>> const& builders) {
+  std::vector<int64_t> capacities;
+  for (std::shared_ptr<arrow::ArrayBuilder> const& builder : builders) {
+    saveCapacity(*builder, capacities);
+  }
+  return capacities;
+}
+
+} // namespace
+
 {% for wrapper in file_wrapper.message_wrappers() -%}
 
 {{wrapper.appender_name()}}::{{wrapper.appender_name()}}(arrow::MemoryPool *pool)
@@ -15,23 +441,101 @@ namespace {{namespace}} {
 }
 
 arrow::Status {{wrapper.appender_name()}}::append(const char* bytes, size_t size) {
-  {{wrapper.message_name()}} message;
-  if (!message.ParseFromArray(bytes, size)) {
-    return arrow::Status::SerializationError("Could not serialize {{wrapper.message_name()}}");
-  } else {
-    return this->append(message);
+  const char* position = bytes;
+  const char* const end = bytes + size;
+  {% for statement in wrapper.scan_declarations() -%}
+  {{statement}}
+  {% endfor %}
+  {% for statement in wrapper.scan_start_statements() -%}
+  {{statement}}
+  {% endfor %}
+  while (position < end) {
+    uint64_t tag;
+    bool ok = readVarint(position, end, tag) && (tag >> 3) != 0;
+    if (ok) {
+      switch (tag >> 3) {
+        {% for field in wrapper.appender_fields() -%}
+        case {{field.field.number}}: {
+          {% for statement in field.scan_case_statements() -%}
+          {{statement}}
+          {% endfor %}
+          break;
+        }
+        {% endfor -%}
+        default:
+          ok = skipField(position, end, tag);
+      }
+    }
+    if (!ok) {
+      return arrow::Status::SerializationError("Could not parse {{wrapper.message_name()}} at byte ", position - bytes);
+    }
   }
+  {% for statement in wrapper.scan_finish_statements() -%}
+  {{statement}}
+  {% endfor %}
+  return this->flushIfFull();
+}
+
+arrow::Status {{wrapper.appender_name()}}::appendDelimited(const char* bytes, size_t size) {
+  const char* position = bytes;
+  const char* const end = bytes + size;
+  while (position < end) {
+    size_t length;
+    ARROW_RETURN_NOT_OK(readLength(position, end, length));
+    if (length > static_cast<size_t>(end - position)) {
+      return arrow::Status::SerializationError("Truncated {{wrapper.message_name()}} at byte ", position - bytes);
+    }
+    ARROW_RETURN_NOT_OK(this->append(position, length));
+    position += length;
+  }
+  return arrow::Status::OK();
+}
+
+arrow::Status {{wrapper.appender_name()}}::appendDelimitedFile(std::string const& path) {
+  ARROW_ASSIGN_OR_RAISE(
+      std::shared_ptr<arrow::io::MemoryMappedFile> file,
+      arrow::io::MemoryMappedFile::Open(path, arrow::io::FileMode::READ));
+  ARROW_ASSIGN_OR_RAISE(int64_t const size, file->GetSize());
+  ARROW_ASSIGN_OR_RAISE(std::shared_ptr<arrow::Buffer> buffer, file->ReadAt(0, size));
+  ARROW_RETURN_NOT_OK(this->appendDelimited(reinterpret_cast<const char*>(buffer->data()), buffer->size()));
+  return file->Close();
 }
 
 arrow::Status {{wrapper.appender_name()}}::append({{wrapper.message_name()}} const& message) {
     {% for append_statement in wrapper.append_statements() -%}
     {{ append_statement }}
     {% endfor %}
-    return arrow::Status::OK();
+    return this->flushIfFull();
+}
+
+arrow::Status {{wrapper.appender_name()}}::append(
+    {{wrapper.message_name()}} const* begin, {{wrapper.message_name()}} const* end) {
+  // With a sink, the messages are cut at maxRows
+  while (begin != end) {
+    {{wrapper.message_name()}} const* chunkEnd = end;
+    if (sink_ && maxRows_ > 0 && end - begin > maxRows_ - this->length()) {
+      chunkEnd = begin + (maxRows_ - this->length());
+    }
+    std::vector<{{wrapper.message_name()}} const*> messages;
+    messages.reserve(chunkEnd - begin);
+    for ({{wrapper.message_name()}} const* message = begin; message != chunkEnd; ++message) {
+      messages.push_back(message);
+    }
+    ARROW_RETURN_NOT_OK(this->append(messages));
+    begin = chunkEnd;
+  }
+  return arrow::Status::OK();
+}
 
+arrow::Status {{wrapper.appender_name()}}::append(std::vector<{{wrapper.message_name()}} const*> const& messages) {
+    {% for append_statement in wrapper.bulk_append_statements() -%}
+    {{ append_statement }}
+    {% endfor %}
+    return this->flushIfFull();
 }
 
 arrow::Status {{wrapper.appender_name()}}::build(arrow::ArrayVector& arrays) {
+    nextMeasure_ = 0;
     {% for finish_statement in wrapper.finish_statements() -%}
     {{ finish_statement }}
     {% endfor %}
@@ -60,6 +564,99 @@ arrow::Status {{wrapper.appender_name()}}::build(std::shared_ptr<arrow::Table> *
     return arrow::Status::OK();
 }
 
+arrow::Status {{wrapper.appender_name()}}::build(std::shared_ptr<arrow::RecordBatch> * batch) {
+    int64_t const length = this->length();
+    arrow::ArrayVector arrays;
+    ARROW_RETURN_NOT_OK(this->build(arrays));
+    *batch = arrow::RecordBatch::Make({{wrapper.appender_name()}}::SCHEMA, length, arrays);
+    return arrow::Status::OK();
+}
+
+arrow::Status {{wrapper.appender_name()}}::rebuild(std::shared_ptr<arrow::Table> * table) {
+    std::vector<std::shared_ptr<arrow::ArrayBuilder>> const builders = this->getBuilders();
+    std::vector<int64_t> const capacities = saveCapacities(builders);
+    ARROW_RETURN_NOT_OK(this->build(table));
+    return restoreCapacities(builders, capacities);
+}
+
+arrow::Status {{wrapper.appender_name()}}::reserve(int64_t rows, int64_t stringBytes) {
+    {% for reserve_statement in wrapper.reserve_statements() -%}
+    {{ reserve_statement }}
+    {% endfor %}
+    return arrow::Status::OK();
+}
+
+arrow::Status {{wrapper.appender_name()}}::reset() {
+    std::vector<std::shared_ptr<arrow::ArrayBuilder>> const builders = this->getBuilders();
+    std::vector<int64_t> const capacities = saveCapacities(builders);
+    for (std::shared_ptr<arrow::ArrayBuilder> const& builder : builders) {
+      builder->Reset();
+    }
+    nextMeasure_ = 0;
+    return restoreCapacities(builders, capacities);
+}
+
+void {{wrapper.appender_name()}}::setSink(RecordBatchSink sink, int64_t maxRows, int64_t maxBytes) {
+    sink_ = std::move(sink);
+    maxRows_ = maxRows;
+    maxBytes_ = maxBytes;
+    nextMeasure_ = 0;
+}
+
+arrow::Status {{wrapper.appender_name()}}::flush() {
+    if (!sink_) {
+      return arrow::Status::Invalid("No sink set for {{wrapper.appender_name()}}");
+    } else if (this->length() == 0) {
+      return arrow::Status::OK();
+    }
+    // The capacity is kept for the next batch, like rebuild
+    std::vector<std::shared_ptr<arrow::ArrayBuilder>> const builders = this->getBuilders();
+    std::vector<int64_t> const capacities = saveCapacities(builders);
+    std::shared_ptr<arrow::RecordBatch> batch;
+    ARROW_RETURN_NOT_OK(this->build(&batch));
+    ARROW_RETURN_NOT_OK(restoreCapacities(builders, capacities));
+    return sink_(batch);
+}
+
+arrow::Status {{wrapper.appender_name()}}::flushIfFull() {
+    if (!sink_) {
+      return arrow::Status::OK();
+    }
+    int64_t const length = this->length();
+    bool full = maxRows_ > 0 && length >= maxRows_;
+    if (!full && maxBytes_ > 0 && length >= nextMeasure_) {
+      // Walking the builders is not cheap, so the next measure is half way to
+      // the length where maxBytes is expected, given the bytes per row so far
+      int64_t const bytes = this->approximateBytes();
+      full = bytes >= maxBytes_;
+      double const bytesPerRow = static_cast<double>(std::max<int64_t>(bytes, 1)) / std::max<int64_t>(length, 1);
+      nextMeasure_ = length + std::max<int64_t>(1, static_cast<int64_t>((maxBytes_ - bytes) / bytesPerRow / 2));
+    }
+    if (full) {
+      return this->flush();
+    } else {
+      return arrow::Status::OK();
+    }
+}
+
+int64_t {{wrapper.appender_name()}}::length() const {
+    {% for field in wrapper.appender_fields() -%}
+    {% if loop.first -%}
+    return {{field.main_builder_name()}}->length();
+    {%- endif %}
+    {% else -%}
+    return 0;
+    {% endfor %}
+}
+
+int64_t {{wrapper.appender_name()}}::approximateBytes() const {
+    int64_t bytes = 0;
+    {% for field in wrapper.appender_fields() -%}
+    bytes += builderBytes(*{{field.main_builder_name()}});
+    {% endfor -%}
+    return bytes;
+}
+
 arrow::Status {{wrapper.appender_name()}}::Finish(std::shared_ptr<arrow::Array>* array) {
     std::shared_ptr<arrow::StructArray> struct_array;
     ARROW_RETURN_NOT_OK(this->build(&struct_array));
@@ -96,6 +693,82 @@ arrow::Status {{wrapper.appender_name()}}::build(std::shared_ptr<arrow::StructAr
 }
 
 
+{{wrapper.sharded_appender_name()}}::Shard::Shard(arrow::MemoryPool *pool) : appender(pool) {}
+
+{{wrapper.sharded_appender_name()}}::{{wrapper.sharded_appender_name()}}(int shards, arrow::MemoryPool *pool) {
+  for (int index = 0; index < std::max(shards, 1); ++index) {
+    shards_.push_back(std::make_unique<Shard>(pool));
+  }
+}
+
+{{wrapper.sharded_appender_name()}}::Shard& {{wrapper.sharded_appender_name()}}::threadShard() {
+  return *shards_[threadIndex() % shards_.size()];
+}
+
+arrow::Status {{wrapper.sharded_appender_name()}}::append(const char* bytes, size_t size) {
+  Shard& shard = this->threadShard();
+  std::lock_guard<std::mutex> lock(shard.mutex);
+  return shard.appender.append(bytes, size);
+}
+
+arrow::Status {{wrapper.sharded_appender_name()}}::append({{wrapper.message_name()}} const& message) {
+  Shard& shard = this->threadShard();
+  std::lock_guard<std::mutex> lock(shard.mutex);
+  return shard.appender.append(message);
+}
+
+arrow::Status {{wrapper.sharded_appender_name()}}::append({{wrapper.message_name()}} const* begin, {{wrapper.message_name()}} const* end) {
+  Shard& shard = this->threadShard();
+  std::lock_guard<std::mutex> lock(shard.mutex);
+  return shard.appender.append(begin, end);
+}
+
+int {{wrapper.sharded_appender_name()}}::numShards() const {
+  return static_cast<int>(shards_.size());
+}
+
+int64_t {{wrapper.sharded_appender_name()}}::length() {
+  int64_t length = 0;
+  for (std::unique_ptr<Shard> const& shard : shards_) {
+    std::lock_guard<std::mutex> lock(shard->mutex);
+    length += shard->appender.length();
+  }
+  return length;
+}
+
+arrow::Status {{wrapper.sharded_appender_name()}}::build(std::shared_ptr<arrow::Table>* table, bool useThreads) {
+  // The chunks are the arrays of the shards, nothing is copied
+  std::vector<std::shared_ptr<arrow::RecordBatch>> batches(shards_.size());
+  auto const buildShard = [this, &batches](int index) {
+    std::lock_guard<std::mutex> lock(shards_[index]->mutex);
+    return shards_[index]->appender.build(&batches[index]);
+  };
+  // The thread pool is arrow's internal API, as is OptionalParallelFor.
+  // A task of the pool waiting on tasks queued behind it could wait forever, so it builds the shards itself.
+  arrow::internal::ThreadPool* threadPool = arrow::internal::GetCpuThreadPool();
+  if (useThreads && !threadPool->OwnsThisThread()) {
+    std::vector<arrow::Future<>> futures;
+    arrow::Status submitted;
+    for (int index = 0; index < this->numShards() && submitted.ok(); ++index) {
+      arrow::Result<arrow::Future<>> future = threadPool->Submit(buildShard, index);
+      if (future.ok()) {
+        futures.push_back(std::move(future).ValueUnsafe());
+      } else {
+        submitted = future.status();
+      }
+    }
+    // The shards that were submitted are waited for, they write to batches
+    ARROW_RETURN_NOT_OK(arrow::AllFinished(futures).status());
+    ARROW_RETURN_NOT_OK(submitted);
+  } else {
+    for (int index = 0; index < this->numShards(); ++index) {
+      ARROW_RETURN_NOT_OK(buildShard(index));
+    }
+  }
+  ARROW_ASSIGN_OR_RAISE(*table, arrow::Table::FromRecordBatches({{wrapper.appender_name()}}::SCHEMA, batches));
+  return arrow::Status::OK();
+}
+
 {{wrapper.struct_reader_name()}}::{{wrapper.struct_reader_name()}}(std::shared_ptr<arrow::StructArray> struct_array)
     : struct_array_(struct_array),
     {% for array_member in wrapper.struct_reader_members() -%}
@@ -115,31 +788,7 @@ arrow::Status {{wrapper.struct_reader_name()}}::GetValue(uint64_t const index, {
     return arrow::Status::IndexError("Too Far");
   } else {
     {% for field in wrapper.reader_fields() -%}
-    {% if field.is_oneof() %}
-    if (!{{field.is_null_statement()}})
-    {
-    {% endif%}
-    {% if field.is_repeated() -%}
-    for ({{field.offset_type()}} value_index = {{field.list_array_name()}}->value_offset(index);
-         value_index < {{field.list_array_name()}}->value_offset(index + 1);
-         ++value_index) {
-      {% if field.is_message() %}
-      {{field.array_name()}}.GetValue(value_index, *message.add_{{field.name()}}());
-      {% else %}
-      message.add_{{field.name()}}({{field.optional_cast()}}{{field.array_name()}}->{{field.value_reader()}}(value_index) );
-      {% endif %}
-    }
-    {% else %}
-    {% if field.is_message() %}
-    {{field.array_name()}}.GetValue(index, *message.mutable_{{field.name()}}());
-    {% else %}
-    message.set_{{field.name()}}({{field.optional_cast()}}{{field.array_name()}}->{{field.value_reader()}}(index));
-    {% endif %}
-    {% endif %}
-
-    {% if field.is_oneof() %}
-    }
-    {% endif %}
+    {{ read_field(field, "index") }}
     {% endfor %}
     return arrow::Status::OK();
   }
@@ -150,7 +799,20 @@ uint64_t {{wrapper.struct_reader_name()}}::length() const {
 }
 
 {{wrapper.reader_name()}}::{{wrapper.reader_name()}}(std::shared_ptr<arrow::Table> table)
+: {{wrapper.reader_name()}}(table, nullptr)
+{
+}
+
+{{wrapper.reader_name()}}::{{wrapper.reader_name()}}(std::shared_ptr<arrow::RecordBatchReader> batchReader)
+: {{wrapper.reader_name()}}(emptyTable(batchReader->schema()), batchReader)
+{
+  status_ = loadNext();
+}
+
+{{wrapper.reader_name()}}::{{wrapper.reader_name()}}(std::shared_ptr<arrow::Table> table, std::shared_ptr<arrow::RecordBatchReader> batchReader)
 : table_(table),
+batchReader_(batchReader),
+streaming_(batchReader != nullptr),
 current_(0),
     {% for reader_member in wrapper.reader_members() -%}
     {{reader_member.name}}({{reader_member.initializer}}){{ "," if not loop.last }}
@@ -158,57 +820,109 @@ current_(0),
 {
 }
 
+arrow::Status {{wrapper.reader_name()}}::loadNext() {
+  while (batchReader_ && current_ >= table_->num_rows()) {
+    std::shared_ptr<arrow::RecordBatch> batch;
+    ARROW_RETURN_NOT_OK(batchReader_->ReadNext(&batch));
+    if (!batch) {
+      batchReader_.reset();
+    } else if (batch->num_rows() > 0) {
+      ARROW_ASSIGN_OR_RAISE(table_, arrow::Table::FromRecordBatches({batch}));
+      current_ = 0;
+      {% for load_statement in wrapper.reader_load_statements() -%}
+      {{ load_statement }}
+      {% endfor %}
+    }
+  }
+  return arrow::Status::OK();
+}
+
 bool {{wrapper.reader_name()}}::end() const {
-  return current_ >= table_->num_rows();
+  // Not the end while there is an error to report
+  return status_.ok() && current_ >= table_->num_rows();
 }
 
 
 arrow::Status {{wrapper.reader_name()}}::readNext({{wrapper.message_name()}} &message) {
+  ARROW_RETURN_NOT_OK(status_);
   if (end()) {
     return arrow::Status::IndexError("Too far");
   } else {
     {% for field in wrapper.reader_fields() -%}
-    while ({{field.index_name()}} >= {{field.main_array_name()}}{{field.length_statement()}}) {
-        {{field.index_name()}} = 0;
-        ++{{field.chunk_name()}};
-        {% if field.is_repeated() %}
-        {{field.list_array_name()}} = {{field.list_array_caster()}}({{field.get_array_statement()}});
-        {{field.array_name()}} = {{field.array_caster()}}({{field.list_array_name()}}->values());
-        {% else %}
-        {{field.array_name()}} = {{field.array_caster()}}({{field.get_array_statement()}});
-        {% endif %}
-    }
-    {% if field.is_oneof() %}
-    if (!{{ field.is_null_statement(field.index_name()) }})
-    {
-    {% endif %}
-    {% if field.is_repeated() %}
-    for ({{field.offset_type()}} index = {{field.list_array_name()}}->value_offset({{field.index_name()}});
-         index < {{field.list_array_name()}}->value_offset({{field.index_name()}} + 1);
-         ++index) {
-      {% if field.is_message() %}
-      {{field.array_name()}}.GetValue(index, *message.add_{{ field.name() }}());
-      {% else %}
-      message.add_{{field.name()}}({{field.optional_cast()}}{{field.array_name()}}->{{field.value_reader()}}(index) );
-      {% endif %}
-    }
-    {% elif field.is_message() %}
-    {{field.value_type()}}* {{field.name()}} = new {{field.value_type()}}();
-    {{field.array_name()}}.GetValue({{field.index_name()}}, *{{field.name()}});
-    message.set_allocated_{{field.name()}}({{field.name()}});
-    {% else %}
-    message.set_{{field.name()}}({{field.optional_cast()}}{{field.array_name()}}->{{field.value_reader()}}({{field.index_name()}}));
-    {% endif %}
-    {% if field.is_oneof() %}
-    }
-    {% endif %}
+    {{ next_chunk(field) }}
+    {{ read_field(field, field.index_name()) }}
     ++{{field.index_name()}};
     {% endfor %}
 
     ++current_;
-    return arrow::Status::OK();
+    status_ = loadNext();
+    return status_;
+  }
+
+}
+
+arrow::Status {{wrapper.reader_name()}}::seek(int64_t row) {
+  ARROW_RETURN_NOT_OK(status_);
+  if (streaming_) {
+    return arrow::Status::NotImplemented("Cannot seek in a RecordBatchReader");
+  } else if (row < 0 || row > table_->num_rows()) {
+    return arrow::Status::IndexError("Row ", row, " out of ", table_->num_rows());
   }
+  {% for field in wrapper.reader_fields() -%}
+  {{field.chunk_name()}} = findChunk({{field.chunk_offsets_name()}}, row);
+  {{field.index_name()}} = row - {{field.chunk_offsets_name()}}[{{field.chunk_name()}}];
+  {{ load_chunk(field) }}
+  {% endfor %}
+  current_ = row;
+  return arrow::Status::OK();
+}
+
+arrow::Status {{wrapper.reader_name()}}::read(int64_t row, {{wrapper.message_name()}}& message) {
+  ARROW_RETURN_NOT_OK(this->seek(row));
+  return this->readNext(message);
+}
+
+arrow::Status {{wrapper.reader_name()}}::readRange(int64_t begin, int64_t end, std::vector<{{wrapper.message_name()}}>& messages) {
+  if (begin > end || end > table_->num_rows()) {
+    return arrow::Status::IndexError("Invalid range ", begin, " to ", end, " out of ", table_->num_rows());
+  }
+  ARROW_RETURN_NOT_OK(this->seek(begin));
+  return this->readBatch(messages, end - begin);
+}
+
+arrow::Status {{wrapper.reader_name()}}::readBatch(std::vector<{{wrapper.message_name()}}>& messages, size_t n) {
+  {{ read_batch(wrapper, "messages.resize(first + run);", "messages[first + row]") }}
+}
+
+arrow::Result<{{wrapper.message_name()}}*> {{wrapper.reader_name()}}::readNext(google::protobuf::Arena* arena) {
+  ARROW_RETURN_NOT_OK(status_);
+  if (end()) {
+    return arrow::Status::IndexError("Too far");
+  }
+  {{wrapper.message_name()}}* message = google::protobuf::Arena::CreateMessage<{{wrapper.message_name()}}>(arena);
+  arrow::Status const status = this->readNext(*message);
+  if (!status.ok()) {
+    if (arena == nullptr) {
+      delete message;
+    }
+    return status;
+  }
+  return message;
+}
+
+arrow::Status {{wrapper.reader_name()}}::readRange(int64_t begin, int64_t end, std::vector<{{wrapper.message_name()}}*>& messages, google::protobuf::Arena* arena) {
+  if (begin > end || end > table_->num_rows()) {
+    return arrow::Status::IndexError("Invalid range ", begin, " to ", end, " out of ", table_->num_rows());
+  }
+  ARROW_RETURN_NOT_OK(this->seek(begin));
+  return this->readBatch(messages, end - begin, arena);
+}
 
+arrow::Status {{wrapper.reader_name()}}::readBatch(std::vector<{{wrapper.message_name()}}*>& messages, size_t n, google::protobuf::Arena* arena) {
+  {{ read_batch(
+      wrapper,
+      "for (int64_t row = 0; row < run; ++row) { messages.push_back(google::protobuf::Arena::CreateMessage<" + wrapper.message_name() + ">(arena)); }",
+      "*messages[first + row]") }}
 }
 
 {% endfor %}
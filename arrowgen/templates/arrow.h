@@ -4,7 +4,13 @@
 // Source: {{file_wrapper.name() }}
 // Generated code, do not modify
 
+#include <functional>
+#include <memory>
+#include <mutex>
+
 #include <arrow/api.h>
+#include <arrow/util/thread_pool.h>
+#include <google/protobuf/arena.h>
 #include "{{file_wrapper.message_header()}}"
 
 {% for namespace in file_wrapper.namespaces() -%}
@@ -18,24 +24,86 @@ class {{ wrapper.appender_name() }} {
     static const std::vector<std::string> FIELD_NAMES;
     static const std::shared_ptr<arrow::DataType> DATA_TYPE;
     static const std::shared_ptr<arrow::Schema> SCHEMA;
+    using RecordBatchSink = std::function<arrow::Status(std::shared_ptr<arrow::RecordBatch> const&)>;
 
     explicit {{ wrapper.appender_name() }}(arrow::MemoryPool *pool = arrow::default_memory_pool());
+    // Scans the wire format straight into the builders, skipping unknown fields.
+    // After a SerializationError the message may be partly appended, reset() the appender.
     arrow::Status append(const char* bytes, size_t size);
     arrow::Status append({{wrapper.message_name()}} const& message);
+    // Appends the messages one field at a time, rather than one message at a time
+    arrow::Status append({{wrapper.message_name()}} const* begin, {{wrapper.message_name()}} const* end);
+    arrow::Status append(std::vector<{{wrapper.message_name()}} const*> const& messages);
+    // Messages prefixed by their varint length, as written by writeDelimitedTo
+    arrow::Status appendDelimited(const char* bytes, size_t size);
+    // Memory maps the file and appends its delimited messages
+    arrow::Status appendDelimitedFile(std::string const& path);
     arrow::Status build(std::shared_ptr<arrow::Table>* table);
+    arrow::Status build(std::shared_ptr<arrow::RecordBatch>* batch);
+    // Like build, but reserves the capacity reached by this batch for the next one
+    arrow::Status rebuild(std::shared_ptr<arrow::Table>* table);
     arrow::Status Finish(std::shared_ptr<arrow::Array>* array);
+    // Reserves rows (and a value per row for lists) and stringBytes for each string column
+    arrow::Status reserve(int64_t rows, int64_t stringBytes = 0);
+    // Drops the pending messages, keeping the capacity of the builders
+    arrow::Status reset();
+    // Once maxRows messages or maxBytes (approximateBytes) are pending, builds them
+    // into a record batch for the sink and carries on. 0 means no limit.
+    void setSink(RecordBatchSink sink, int64_t maxRows, int64_t maxBytes = 0);
+    // Hands the pending messages, if any, to the sink
+    arrow::Status flush();
+    // Number of pending messages
+    int64_t length() const;
+    // Memory taken by the pending messages in the builders
+    int64_t approximateBytes() const;
 
     std::vector<std::shared_ptr<arrow::ArrayBuilder>> getBuilders();
 
     private:
     arrow::Status build(std::shared_ptr<arrow::StructArray>* struct_array);
     arrow::Status build(arrow::ArrayVector& arrays);
+    arrow::Status flushIfFull();
+
+    RecordBatchSink sink_;
+    int64_t maxRows_ = 0;
+    int64_t maxBytes_ = 0;
+    // Length from which approximateBytes is checked against maxBytes again
+    int64_t nextMeasure_ = 0;
 
     {% for member in wrapper.appender_members() -%}
     {{member.cpp_type}} {{member.name}};
     {% endfor %}
 };
 
+// Appends from several threads, each shard has its own appender and lock,
+// so threads only contend when there are more of them than shards
+class {{ wrapper.sharded_appender_name() }} {
+    public:
+    explicit {{ wrapper.sharded_appender_name() }}(
+        int shards = arrow::GetCpuThreadPoolCapacity(),
+        arrow::MemoryPool *pool = arrow::default_memory_pool());
+    // Appends to the shard of the calling thread
+    arrow::Status append(const char* bytes, size_t size);
+    arrow::Status append({{wrapper.message_name()}} const& message);
+    arrow::Status append({{wrapper.message_name()}} const* begin, {{wrapper.message_name()}} const* end);
+    int numShards() const;
+    // Number of pending messages, over all shards
+    int64_t length();
+    // Finishes the shards, in parallel on the arrow CPU thread pool with useThreads,
+    // into a table with a chunk per shard. Called from a task of the pool, it builds them one by one.
+    arrow::Status build(std::shared_ptr<arrow::Table>* table, bool useThreads = true);
+
+    private:
+    struct Shard {
+      explicit Shard(arrow::MemoryPool *pool);
+      std::mutex mutex;
+      {{ wrapper.appender_name() }} appender;
+    };
+    Shard& threadShard();
+
+    std::vector<std::unique_ptr<Shard>> shards_;
+};
+
 class {{wrapper.struct_reader_name() }} {
   public:
     {{ wrapper.struct_reader_name() }}(std::shared_ptr<arrow::StructArray> struct_array);
@@ -56,12 +124,32 @@ class {{wrapper.struct_reader_name() }} {
 class {{ wrapper.reader_name()}} {
     public:
     {{ wrapper.reader_name() }}(std::shared_ptr<arrow::Table> table);
+    // Reads the batches as they come, without materializing a table
+    {{ wrapper.reader_name() }}(std::shared_ptr<arrow::RecordBatchReader> batchReader);
     arrow::Status readNext({{wrapper.message_name()}}& message);
+    // Appends up to n messages, reading one field at a time
+    arrow::Status readBatch(std::vector<{{wrapper.message_name()}}>& messages, size_t n);
+    // Moves to a row, tables only (not RecordBatchReader)
+    arrow::Status seek(int64_t row);
+    arrow::Status read(int64_t row, {{wrapper.message_name()}}& message);
+    // Appends the messages from row begin to end (excluded)
+    arrow::Status readRange(int64_t begin, int64_t end, std::vector<{{wrapper.message_name()}}>& messages);
+    // Same, but the messages (and their nested messages) are created on the arena, to be freed all at once.
+    // Without arena (nullptr) they are on the heap, owned by the caller.
+    arrow::Result<{{wrapper.message_name()}}*> readNext(google::protobuf::Arena* arena);
+    arrow::Status readBatch(std::vector<{{wrapper.message_name()}}*>& messages, size_t n, google::protobuf::Arena* arena);
+    arrow::Status readRange(int64_t begin, int64_t end, std::vector<{{wrapper.message_name()}}*>& messages, google::protobuf::Arena* arena);
     bool end() const;
 
     private:
+    {{ wrapper.reader_name() }}(std::shared_ptr<arrow::Table> table, std::shared_ptr<arrow::RecordBatchReader> batchReader);
+    arrow::Status loadNext();
+
     std::shared_ptr<arrow::Table> table_;
-    uint64_t current_;
+    std::shared_ptr<arrow::RecordBatchReader> batchReader_;
+    bool const streaming_;
+    arrow::Status status_;
+    int64_t current_;
 
     {% for reader_field in wrapper.reader_fields() -%}
     {% for member in reader_field.members() -%}
@@ -0,0 +1,176 @@
+#include "{{file_wrapper.parquet_header()}}"
+
+#include <algorithm>
+#include <future>
+
+#include <parquet/arrow/schema.h>
+
+
+{% for namespace in file_wrapper.namespaces() -%}
+namespace {{namespace}} {
+{% endfor %}
+
+namespace {
+
+// Parquet selects the leaf columns of nested fields
+void addLeafColumns(parquet::arrow::SchemaField const& field, std::vector<int>& columns) {
+  if (field.is_leaf()) {
+    columns.push_back(field.column_index);
+  } else {
+    for (parquet::arrow::SchemaField const& child : field.children) {
+      addLeafColumns(child, columns);
+    }
+  }
+}
+
+} // namespace
+
+{% for wrapper in file_wrapper.message_wrappers() -%}
+
+{{wrapper.parquet_writer_name()}}::{{wrapper.parquet_writer_name()}}(std::unique_ptr<parquet::arrow::FileWriter> writer, int64_t maxRows, int64_t maxBytes, arrow::MemoryPool *pool)
+: writer_(std::move(writer)),
+appender_(pool),
+maxRows_(maxRows),
+maxBytes_(maxBytes),
+rows_(0),
+bytes_(0)
+{
+}
+
+arrow::Result<std::unique_ptr<{{wrapper.parquet_writer_name()}}>> {{wrapper.parquet_writer_name()}}::Open(
+    std::shared_ptr<arrow::io::OutputStream> sink,
+    int64_t maxRows,
+    int64_t maxBytes,
+    parquet::Compression::type compression,
+    bool dictionary,
+    arrow::MemoryPool *pool) {
+  parquet::WriterProperties::Builder properties;
+  properties.compression(compression);
+  if (dictionary) {
+    properties.enable_dictionary();
+  } else {
+    properties.disable_dictionary();
+  }
+  // The arrow schema is stored so dictionary and large types read back as such
+  ARROW_ASSIGN_OR_RAISE(
+      std::unique_ptr<parquet::arrow::FileWriter> writer,
+      parquet::arrow::FileWriter::Open(
+          *{{wrapper.appender_name()}}::SCHEMA,
+          pool,
+          sink,
+          properties.build(),
+          parquet::ArrowWriterProperties::Builder().store_schema()->build()));
+  return std::unique_ptr<{{wrapper.parquet_writer_name()}}>(
+      new {{wrapper.parquet_writer_name()}}(std::move(writer), maxRows, maxBytes, pool));
+}
+
+arrow::Status {{wrapper.parquet_writer_name()}}::append({{wrapper.message_name()}} const& message) {
+  ARROW_RETURN_NOT_OK(appender_.append(message));
+  ++rows_;
+  if (maxBytes_ > 0) {
+    bytes_ += message.ByteSizeLong();
+  }
+  if ((maxRows_ > 0 && rows_ >= maxRows_) || (maxBytes_ > 0 && bytes_ >= maxBytes_)) {
+    return flush();
+  } else {
+    return arrow::Status::OK();
+  }
+}
+
+arrow::Status {{wrapper.parquet_writer_name()}}::flush() {
+  if (rows_ == 0) {
+    return arrow::Status::OK();
+  }
+  std::shared_ptr<arrow::Table> table;
+  ARROW_RETURN_NOT_OK(appender_.build(&table));
+  rows_ = 0;
+  bytes_ = 0;
+  return writer_->WriteTable(*table, table->num_rows());
+}
+
+arrow::Status {{wrapper.parquet_writer_name()}}::close() {
+  ARROW_RETURN_NOT_OK(flush());
+  return writer_->Close();
+}
+
+{{wrapper.parquet_reader_name()}}::{{wrapper.parquet_reader_name()}}(std::unique_ptr<parquet::arrow::FileReader> reader, bool readAhead)
+: reader_(std::move(reader)),
+rowGroup_(0),
+readAhead_(readAhead)
+{
+}
+
+arrow::Result<std::unique_ptr<{{wrapper.parquet_reader_name()}}>> {{wrapper.parquet_reader_name()}}::Open(
+    std::shared_ptr<arrow::io::RandomAccessFile> source,
+    bool useThreads,
+    bool readAhead,
+    arrow::MemoryPool *pool) {
+  parquet::ArrowReaderProperties properties;
+  properties.set_use_threads(useThreads);
+  parquet::arrow::FileReaderBuilder builder;
+  ARROW_RETURN_NOT_OK(builder.Open(source));
+  ARROW_ASSIGN_OR_RAISE(
+      std::unique_ptr<parquet::arrow::FileReader> fileReader,
+      builder.memory_pool(pool)->properties(properties)->Build());
+  std::unique_ptr<{{wrapper.parquet_reader_name()}}> reader(new {{wrapper.parquet_reader_name()}}(std::move(fileReader), readAhead));
+  // Only the columns of the message are read
+  std::vector<parquet::arrow::SchemaField> const& fields = reader->reader_->manifest().schema_fields;
+  for (std::string const& name : {{wrapper.appender_name()}}::FIELD_NAMES) {
+    auto const field = std::find_if(fields.begin(), fields.end(), [&name](parquet::arrow::SchemaField const& field) {
+      return field.field->name() == name;
+    });
+    if (field == fields.end()) {
+      return arrow::Status::Invalid("Missing column ", name);
+    }
+    addLeafColumns(*field, reader->columns_);
+  }
+  ARROW_RETURN_NOT_OK(reader->advance());
+  return reader;
+}
+
+arrow::Status {{wrapper.parquet_reader_name()}}::advance() {
+  while ((rowGroupReader_ == nullptr || rowGroupReader_->end()) && rowGroup_ < numRowGroups()) {
+    std::shared_ptr<arrow::Table> table;
+    if (nextRowGroup_.valid()) {
+      ARROW_ASSIGN_OR_RAISE(table, nextRowGroup_.get());
+    } else {
+      ARROW_ASSIGN_OR_RAISE(table, reader_->ReadRowGroup(rowGroup_, columns_));
+    }
+    ++rowGroup_;
+    // One row group at a time, so the file reader is only used by one thread
+    if (readAhead_ && rowGroup_ < numRowGroups()) {
+      int const next = rowGroup_;
+      nextRowGroup_ = std::async(std::launch::async, [this, next]() {
+        return reader_->ReadRowGroup(next, columns_);
+      });
+    }
+    rowGroupReader_.reset();
+    if (table->num_rows() > 0) {
+      rowGroupReader_.reset(new {{wrapper.reader_name()}}(table));
+    }
+  }
+  return arrow::Status::OK();
+}
+
+bool {{wrapper.parquet_reader_name()}}::end() const {
+  return rowGroupReader_ == nullptr || rowGroupReader_->end();
+}
+
+int {{wrapper.parquet_reader_name()}}::numRowGroups() const {
+  return reader_->num_row_groups();
+}
+
+arrow::Status {{wrapper.parquet_reader_name()}}::readNext({{wrapper.message_name()}}& message) {
+  if (end()) {
+    return arrow::Status::IndexError("Too far");
+  }
+  ARROW_RETURN_NOT_OK(rowGroupReader_->readNext(message));
+  return advance();
+}
+
+{% endfor %}
+
+
+{% for namespace in file_wrapper.namespaces()[::-1] -%}
+} // namespace {{namespace}}
+{% endfor %}
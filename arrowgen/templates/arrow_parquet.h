@@ -0,0 +1,81 @@
+#ifndef {{ file_wrapper.parquet_include_guard_name() }}
+#define {{ file_wrapper.parquet_include_guard_name() }}
+
+// Source: {{file_wrapper.name() }}
+// Generated code, do not modify
+
+#include <future>
+#include <memory>
+
+#include <arrow/api.h>
+#include <parquet/arrow/reader.h>
+#include <parquet/arrow/writer.h>
+#include "{{file_wrapper.appender_header()}}"
+
+{% for namespace in file_wrapper.namespaces() -%}
+namespace {{namespace}} {
+{% endfor %}
+
+{% for wrapper in file_wrapper.message_wrappers() -%}
+// Writes a row group every maxRows messages or maxBytes (serialized size), 0 for no limit
+class {{ wrapper.parquet_writer_name() }} {
+    public:
+    static arrow::Result<std::unique_ptr<{{ wrapper.parquet_writer_name() }}>> Open(
+        std::shared_ptr<arrow::io::OutputStream> sink,
+        int64_t maxRows = 65536,
+        int64_t maxBytes = 0,
+        parquet::Compression::type compression = parquet::Compression::SNAPPY,
+        bool dictionary = true,
+        arrow::MemoryPool *pool = arrow::default_memory_pool());
+    arrow::Status append({{wrapper.message_name()}} const& message);
+    // Writes the pending messages as a row group
+    arrow::Status flush();
+    arrow::Status close();
+
+    private:
+    {{ wrapper.parquet_writer_name() }}(std::unique_ptr<parquet::arrow::FileWriter> writer, int64_t maxRows, int64_t maxBytes, arrow::MemoryPool *pool);
+
+    std::unique_ptr<parquet::arrow::FileWriter> writer_;
+    {{ wrapper.appender_name() }} appender_;
+    int64_t const maxRows_;
+    int64_t const maxBytes_;
+    int64_t rows_;
+    int64_t bytes_;
+};
+
+// Reads the messages one row group at a time.
+// useThreads decodes the columns of a row group in parallel,
+// readAhead reads the next row group in the background while the current one is read.
+class {{ wrapper.parquet_reader_name() }} {
+    public:
+    static arrow::Result<std::unique_ptr<{{ wrapper.parquet_reader_name() }}>> Open(
+        std::shared_ptr<arrow::io::RandomAccessFile> source,
+        bool useThreads = false,
+        bool readAhead = false,
+        arrow::MemoryPool *pool = arrow::default_memory_pool());
+    arrow::Status readNext({{wrapper.message_name()}}& message);
+    bool end() const;
+    int numRowGroups() const;
+
+    private:
+    {{ wrapper.parquet_reader_name() }}(std::unique_ptr<parquet::arrow::FileReader> reader, bool readAhead);
+    // Loads row groups until there is a message to read, or none are left
+    arrow::Status advance();
+
+    std::unique_ptr<parquet::arrow::FileReader> reader_;
+    std::vector<int> columns_;
+    int rowGroup_;
+    bool const readAhead_;
+    std::unique_ptr<{{ wrapper.reader_name() }}> rowGroupReader_;
+    // Last, so it is waited for before the file reader goes
+    std::future<arrow::Result<std::shared_ptr<arrow::Table>>> nextRowGroup_;
+};
+
+
+{% endfor %}
+
+{% for namespace in file_wrapper.namespaces()[::-1] -%}
+} // namespace {{namespace}}
+{% endfor %}
+
+#endif
@@ -0,0 +1,1079 @@
+"""
+Converts between serialized protobuf messages and arrow.
+Encoding goes column by column with numpy, without going through Message objects.
+Decoding parses the messages with protobuf, or, to save memory, decodes them
+with a pure python decoder.
+"""
+
+import array
+import functools
+import itertools
+import os
+import struct
+import typing
+
+import numpy
+import pyarrow
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+from google.protobuf.message import Message
+
+from arrowgen.arrow_converter import (
+    ARROW_TYPES,
+    LARGE_TYPES,
+    NANOS_PER_UNIT,
+    get_arrow_type,
+    get_conversion_plan,
+    get_enum_dictionary,
+    get_field_encoding,
+    get_validity,
+    is_timestamp,
+)
+from arrowgen.streaming import DEFAULT_BATCH_SIZE
+
+WIRETYPE_VARINT = 0
+WIRETYPE_FIXED64 = 1
+WIRETYPE_LENGTH_DELIMITED = 2
+WIRETYPE_START_GROUP = 3
+WIRETYPE_END_GROUP = 4
+WIRETYPE_FIXED32 = 5
+
+_MASK_32 = (1 << 32) - 1
+_MASK_64 = (1 << 64) - 1
+
+# A row is the list of (start, end) ranges making up a message, or None for null.
+# Several ranges for the same message are merged, like the protobuf parser does.
+Ranges = typing.Optional[typing.List[typing.Tuple[int, int]]]
+
+
+def _to_int32(value: int) -> int:
+    value &= _MASK_32
+    return value - (1 << 32) if value >> 31 else value
+
+
+def _to_int64(value: int) -> int:
+    value &= _MASK_64
+    return value - (1 << 64) if value >> 63 else value
+
+
+def _to_uint32(value: int) -> int:
+    return value & _MASK_32
+
+
+def _to_uint64(value: int) -> int:
+    return value & _MASK_64
+
+
+def _zigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _to_bool(value: int) -> bool:
+    return value != 0
+
+
+VARINT_CONVERTERS = {
+    FieldDescriptor.TYPE_INT64: _to_int64,
+    FieldDescriptor.TYPE_UINT64: _to_uint64,
+    FieldDescriptor.TYPE_INT32: _to_int32,
+    FieldDescriptor.TYPE_BOOL: _to_bool,
+    FieldDescriptor.TYPE_UINT32: _to_uint32,
+    FieldDescriptor.TYPE_ENUM: _to_int32,
+    FieldDescriptor.TYPE_SINT32: _zigzag,
+    FieldDescriptor.TYPE_SINT64: _zigzag,
+}
+
+FIXED_FORMATS = {
+    FieldDescriptor.TYPE_DOUBLE: "d",
+    FieldDescriptor.TYPE_FLOAT: "f",
+    FieldDescriptor.TYPE_FIXED64: "Q",
+    FieldDescriptor.TYPE_FIXED32: "I",
+    FieldDescriptor.TYPE_SFIXED32: "i",
+    FieldDescriptor.TYPE_SFIXED64: "q",
+}
+
+TYPECODES = {
+    FieldDescriptor.TYPE_DOUBLE: "d",
+    FieldDescriptor.TYPE_FLOAT: "f",
+    FieldDescriptor.TYPE_INT64: "q",
+    FieldDescriptor.TYPE_UINT64: "Q",
+    FieldDescriptor.TYPE_INT32: "i",
+    FieldDescriptor.TYPE_FIXED64: "Q",
+    FieldDescriptor.TYPE_FIXED32: "I",
+    FieldDescriptor.TYPE_BOOL: "B",
+    FieldDescriptor.TYPE_UINT32: "I",
+    FieldDescriptor.TYPE_ENUM: "i",
+    FieldDescriptor.TYPE_SFIXED32: "i",
+    FieldDescriptor.TYPE_SFIXED64: "q",
+    FieldDescriptor.TYPE_SINT32: "i",
+    FieldDescriptor.TYPE_SINT64: "q",
+}
+
+
+WIRE_TYPES = {
+    FieldDescriptor.TYPE_DOUBLE: WIRETYPE_FIXED64,
+    FieldDescriptor.TYPE_FLOAT: WIRETYPE_FIXED32,
+    FieldDescriptor.TYPE_INT64: WIRETYPE_VARINT,
+    FieldDescriptor.TYPE_UINT64: WIRETYPE_VARINT,
+    FieldDescriptor.TYPE_INT32: WIRETYPE_VARINT,
+    FieldDescriptor.TYPE_FIXED64: WIRETYPE_FIXED64,
+    FieldDescriptor.TYPE_FIXED32: WIRETYPE_FIXED32,
+    FieldDescriptor.TYPE_BOOL: WIRETYPE_VARINT,
+    FieldDescriptor.TYPE_STRING: WIRETYPE_LENGTH_DELIMITED,
+    FieldDescriptor.TYPE_MESSAGE: WIRETYPE_LENGTH_DELIMITED,
+    FieldDescriptor.TYPE_BYTES: WIRETYPE_LENGTH_DELIMITED,
+    FieldDescriptor.TYPE_UINT32: WIRETYPE_VARINT,
+    FieldDescriptor.TYPE_ENUM: WIRETYPE_VARINT,
+    FieldDescriptor.TYPE_SFIXED32: WIRETYPE_FIXED32,
+    FieldDescriptor.TYPE_SFIXED64: WIRETYPE_FIXED64,
+    FieldDescriptor.TYPE_SINT32: WIRETYPE_VARINT,
+    FieldDescriptor.TYPE_SINT64: WIRETYPE_VARINT,
+}
+
+
+def read_varint(data, position: int) -> typing.Tuple[int, int]:
+    byte = data[position]
+    if byte < 0x80:
+        return byte, position + 1
+    result = byte & 0x7F
+    shift = 7
+    position += 1
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+def skip_field(data, position: int, wire_type: int) -> int:
+    if wire_type == WIRETYPE_VARINT:
+        return read_varint(data, position)[1]
+    elif wire_type == WIRETYPE_FIXED64:
+        return position + 8
+    elif wire_type == WIRETYPE_LENGTH_DELIMITED:
+        length, position = read_varint(data, position)
+        return position + length
+    elif wire_type == WIRETYPE_FIXED32:
+        return position + 4
+    elif wire_type == WIRETYPE_START_GROUP:
+        while True:
+            tag, position = read_varint(data, position)
+            if tag & 7 == WIRETYPE_END_GROUP:
+                return position
+            position = skip_field(data, position, tag & 7)
+    else:
+        raise ValueError(f"Unsupported wire type {wire_type} at {position}")
+
+
+class FieldDecoder:
+    """
+    Reads the occurrences of one field from the wire into the row state
+    """
+
+    def __init__(self, field_descriptor: FieldDescriptor):
+        self.field_descriptor = field_descriptor
+        self.number = field_descriptor.number
+        self.wire_type = WIRE_TYPES[field_descriptor.type]
+        self.repeated = field_descriptor.label == FieldDescriptor.LABEL_REPEATED
+        self.is_message = field_descriptor.type == FieldDescriptor.TYPE_MESSAGE
+        self.packable = self.repeated and self.wire_type != WIRETYPE_LENGTH_DELIMITED
+        self.converter = VARINT_CONVERTERS.get(field_descriptor.type)
+        fixed_format = FIXED_FORMATS.get(field_descriptor.type)
+        self.fixed_format = fixed_format
+        self.fixed = struct.Struct("<" + fixed_format) if fixed_format else None
+        if field_descriptor.containing_oneof is not None:
+            self.oneof_siblings = [
+                f.number
+                for f in field_descriptor.containing_oneof.fields
+                if f.number != self.number
+            ]
+            self.default = None
+        else:
+            self.oneof_siblings = []
+            self.default = self._default()
+
+    def _default(self):
+        if self.repeated or self.is_message:
+            return []
+        elif self.wire_type == WIRETYPE_LENGTH_DELIMITED:
+            return (0, 0)
+        elif self.converter is not None:
+            return self.converter(0)
+        else:
+            return self.fixed.unpack(bytes(self.fixed.size))[0]
+
+    def read(self, data, position: int, wire_type: int, state: dict) -> int:
+        if wire_type == WIRETYPE_LENGTH_DELIMITED and self.packable:
+            length, position = read_varint(data, position)
+            end = position + length
+            state.setdefault(self.number, []).extend(
+                self.read_packed(data, position, end)
+            )
+            return end
+        elif wire_type != self.wire_type:
+            return skip_field(data, position, wire_type)
+
+        if wire_type == WIRETYPE_VARINT:
+            value = data[position]
+            if value < 0x80:
+                position += 1
+            else:
+                value, position = read_varint(data, position)
+            value = self.converter(value)
+        elif wire_type == WIRETYPE_LENGTH_DELIMITED:
+            length = data[position]
+            if length < 0x80:
+                position += 1
+            else:
+                length, position = read_varint(data, position)
+            value = (position, position + length)
+            position += length
+        else:
+            value = self.fixed.unpack_from(data, position)[0]
+            position += self.fixed.size
+
+        if self.repeated:
+            state.setdefault(self.number, []).append(
+                [value] if self.is_message else value
+            )
+        elif self.is_message:
+            state.setdefault(self.number, []).append(value)
+        else:
+            state[self.number] = value
+        for sibling in self.oneof_siblings:
+            state.pop(sibling, None)
+        return position
+
+    def read_packed(self, data, start: int, end: int) -> typing.List[typing.Any]:
+        if self.fixed is not None:
+            count = (end - start) // self.fixed.size
+            return list(struct.unpack_from(f"<{count}{self.fixed_format}", data, start))
+        else:
+            values = []
+            position = start
+            while position < end:
+                value, position = read_varint(data, position)
+                values.append(self.converter(value))
+            return values
+
+
+class MessageDecoder:
+    """
+    Walks the wire format of a message and dispatches every field to its decoder
+    """
+
+    def __init__(self, message_descriptor: Descriptor):
+        self.message_descriptor = message_descriptor
+        # Skipped fields have no column, they are skipped on the wire too
+        self.field_decoders = [
+            FieldDecoder(field)
+            for field in message_descriptor.fields
+            if not get_field_encoding(field).skip
+        ]
+        self.decoders_by_number = {
+            decoder.number: decoder for decoder in self.field_decoders
+        }
+
+    def parse(self, data, ranges: typing.List[typing.Tuple[int, int]]) -> dict:
+        state = {}
+        decoders_by_number = self.decoders_by_number
+        for position, end in ranges:
+            while position < end:
+                tag = data[position]
+                if tag < 0x80:
+                    position += 1
+                else:
+                    tag, position = read_varint(data, position)
+                decoder = decoders_by_number.get(tag >> 3)
+                if decoder is None:
+                    position = skip_field(data, position, tag & 7)
+                else:
+                    position = decoder.read(data, position, tag & 7, state)
+            if position != end:
+                raise ValueError(
+                    f"Truncated {self.message_descriptor.full_name} at {end}"
+                )
+        return state
+
+    def decode(self, data, rows: typing.List[Ranges]) -> typing.List[pyarrow.Array]:
+        columns = [
+            make_column(decoder.field_descriptor, data)
+            for decoder in self.field_decoders
+        ]
+        pairs = list(zip(self.field_decoders, columns))
+        for ranges in rows:
+            if ranges is None:
+                for column in columns:
+                    column.append(None)
+            else:
+                state = self.parse(data, ranges)
+                for decoder, column in pairs:
+                    column.append(state.get(decoder.number, decoder.default))
+        return [column.finish() for column in columns]
+
+
+def _validity_buffer(validity: bytearray, null_count: int) -> pyarrow.Buffer:
+    if null_count == 0:
+        return None
+    else:
+        return pyarrow.py_buffer(
+            numpy.packbits(numpy.frombuffer(validity, numpy.uint8), bitorder="little")
+        )
+
+
+def get_value_type(field_descriptor: FieldDescriptor) -> pyarrow.DataType:
+    """
+    Type the columns are built with. Scalars use their plain type, `EncodedColumn`
+    converts them to the type of the field options.
+    """
+    if field_descriptor.type in ARROW_TYPES:
+        return ARROW_TYPES[field_descriptor.type]
+    arrow_type = get_arrow_type(field_descriptor)
+    if field_descriptor.label == FieldDescriptor.LABEL_REPEATED:
+        return arrow_type.value_type
+    else:
+        return arrow_type
+
+
+class PrimitiveColumn:
+    def __init__(self, field_descriptor: FieldDescriptor):
+        self.arrow_type = get_value_type(field_descriptor)
+        self.values = array.array(TYPECODES[field_descriptor.type])
+        self.validity = bytearray()
+        self.null_count = 0
+
+    def append(self, value):
+        if value is None:
+            self.values.append(0)
+            self.validity.append(0)
+            self.null_count += 1
+        else:
+            self.values.append(value)
+            self.validity.append(1)
+
+    def extend(self, values: typing.List[typing.Any]):
+        self.values.extend(values)
+        self.validity.extend(itertools.repeat(1, len(values)))
+
+    def finish(self) -> pyarrow.Array:
+        if self.values.typecode == "B":
+            data = numpy.packbits(
+                numpy.frombuffer(self.values, numpy.uint8), bitorder="little"
+            )
+        else:
+            data = self.values
+        return pyarrow.Array.from_buffers(
+            self.arrow_type,
+            len(self.values),
+            [
+                _validity_buffer(self.validity, self.null_count),
+                pyarrow.py_buffer(data),
+            ],
+            null_count=self.null_count,
+        )
+
+
+class BinaryColumn:
+    def __init__(self, field_descriptor: FieldDescriptor, data):
+        self.arrow_type = get_value_type(field_descriptor)
+        self.data = data
+        self.offsets = array.array("i", [0])
+        self.values = bytearray()
+        self.validity = bytearray()
+        self.null_count = 0
+
+    def append(self, value: typing.Optional[typing.Tuple[int, int]]):
+        if value is None:
+            self.validity.append(0)
+            self.null_count += 1
+        else:
+            self.values += self.data[value[0] : value[1]]
+            self.validity.append(1)
+        self.offsets.append(len(self.values))
+
+    def extend(self, values: typing.List[typing.Tuple[int, int]]):
+        for value in values:
+            self.append(value)
+
+    def finish(self) -> pyarrow.Array:
+        return pyarrow.Array.from_buffers(
+            self.arrow_type,
+            len(self.validity),
+            [
+                _validity_buffer(self.validity, self.null_count),
+                pyarrow.py_buffer(self.offsets),
+                pyarrow.py_buffer(self.values),
+            ],
+            null_count=self.null_count,
+        )
+
+
+class TimestampColumn:
+    def __init__(self, field_descriptor: FieldDescriptor, data):
+        self.arrow_type = get_value_type(field_descriptor)
+        self.nanos_per_unit = NANOS_PER_UNIT[self.arrow_type.unit]
+        self.data = data
+        self.values = array.array("q")
+        self.validity = bytearray()
+        self.null_count = 0
+
+    def append(self, ranges: Ranges):
+        if ranges is None:
+            self.values.append(0)
+            self.validity.append(0)
+            self.null_count += 1
+        else:
+            self.values.append(self._read_units(ranges))
+            self.validity.append(1)
+
+    def extend(self, values: typing.List[Ranges]):
+        for value in values:
+            self.append(value)
+
+    def _read_units(self, ranges: typing.List[typing.Tuple[int, int]]) -> int:
+        """Rounded down to the unit of the column, like `timestamps_to_int64`"""
+        seconds = 0
+        nanos = 0
+        data = self.data
+        for position, end in ranges:
+            while position < end:
+                tag, position = read_varint(data, position)
+                if tag == 0x08:
+                    seconds, position = read_varint(data, position)
+                elif tag == 0x10:
+                    nanos, position = read_varint(data, position)
+                else:
+                    position = skip_field(data, position, tag & 7)
+        nanos_per_unit = self.nanos_per_unit
+        return (
+            _to_int64(seconds) * (1_000_000_000 // nanos_per_unit)
+            + _to_int32(nanos) // nanos_per_unit
+        )
+
+    def finish(self) -> pyarrow.Array:
+        return pyarrow.Array.from_buffers(
+            self.arrow_type,
+            len(self.values),
+            [
+                _validity_buffer(self.validity, self.null_count),
+                pyarrow.py_buffer(self.values),
+            ],
+            null_count=self.null_count,
+        )
+
+
+class StructColumn:
+    def __init__(self, field_descriptor: FieldDescriptor, data):
+        self.arrow_type = get_value_type(field_descriptor)
+        self.message_decoder = MessageDecoder(field_descriptor.message_type)
+        self.data = data
+        self.rows = []
+
+    def append(self, ranges: Ranges):
+        self.rows.append(ranges)
+
+    def extend(self, values: typing.List[Ranges]):
+        self.rows.extend(values)
+
+    def finish(self) -> pyarrow.Array:
+        children = self.message_decoder.decode(self.data, self.rows)
+        validity = bytearray(ranges is not None for ranges in self.rows)
+        null_count = len(validity) - sum(validity)
+        return pyarrow.StructArray.from_buffers(
+            self.arrow_type,
+            len(self.rows),
+            [_validity_buffer(validity, null_count)],
+            null_count=null_count,
+            children=children,
+        )
+
+
+class EncodedColumn:
+    """Converts the values of a column to the type set by the field options"""
+
+    def __init__(self, field_descriptor: FieldDescriptor, column):
+        self.column = column
+        self.append = column.append
+        self.extend = column.extend
+        self.enum_type = field_descriptor.enum_type
+        arrow_type = get_arrow_type(field_descriptor)
+        if field_descriptor.label == FieldDescriptor.LABEL_REPEATED:
+            arrow_type = arrow_type.value_type
+        self.arrow_type = arrow_type
+
+    def finish(self) -> pyarrow.Array:
+        array = self.column.finish()
+        if not pyarrow.types.is_dictionary(self.arrow_type):
+            return array.cast(self.arrow_type, safe=False)
+        elif self.enum_type is not None:
+            return get_enum_dictionary(self.enum_type).encode(
+                _to_numpy(array), ~get_validity(array) if array.null_count else None
+            )
+        else:
+            return array.dictionary_encode()
+
+
+class ListColumn:
+    def __init__(self, field_descriptor: FieldDescriptor, item_column):
+        self.arrow_type = get_arrow_type(field_descriptor)
+        self.item_column = item_column
+        self.offsets = array.array(
+            "q" if pyarrow.types.is_large_list(self.arrow_type) else "i", [0]
+        )
+        self.validity = bytearray()
+        self.null_count = 0
+        self.size = 0
+
+    def append(self, values: typing.Optional[typing.List[typing.Any]]):
+        if values is None:
+            self.validity.append(0)
+            self.null_count += 1
+        else:
+            self.item_column.extend(values)
+            self.size += len(values)
+            self.validity.append(1)
+        self.offsets.append(self.size)
+
+    def finish(self) -> pyarrow.Array:
+        return pyarrow.Array.from_buffers(
+            self.arrow_type,
+            len(self.validity),
+            [
+                _validity_buffer(self.validity, self.null_count),
+                pyarrow.py_buffer(self.offsets),
+            ],
+            null_count=self.null_count,
+            children=[self.item_column.finish()],
+        )
+
+
+def _make_value_column(field_descriptor: FieldDescriptor, data):
+    if is_timestamp(field_descriptor):
+        return TimestampColumn(field_descriptor, data)
+    elif field_descriptor.type == FieldDescriptor.TYPE_MESSAGE:
+        return StructColumn(field_descriptor, data)
+    elif field_descriptor.type in (
+        FieldDescriptor.TYPE_STRING,
+        FieldDescriptor.TYPE_BYTES,
+    ):
+        return BinaryColumn(field_descriptor, data)
+    else:
+        return PrimitiveColumn(field_descriptor)
+
+
+def make_column(field_descriptor: FieldDescriptor, data):
+    column = _make_value_column(field_descriptor, data)
+    encoding = get_field_encoding(field_descriptor)
+    if (
+        encoding.dictionary
+        or encoding.float32
+        or (encoding.large and field_descriptor.type in LARGE_TYPES)
+    ):
+        column = EncodedColumn(field_descriptor, column)
+    if field_descriptor.label == FieldDescriptor.LABEL_REPEATED:
+        return ListColumn(field_descriptor, column)
+    else:
+        return column
+
+
+def _binary_array_to_rows(
+    binary_array: typing.Union[pyarrow.BinaryArray, pyarrow.LargeBinaryArray],
+) -> typing.Tuple[memoryview, typing.List[Ranges]]:
+    _, offsets_buffer, data_buffer = binary_array.buffers()
+    offset_type = (
+        numpy.int64 if pyarrow.types.is_large_binary(binary_array.type) else numpy.int32
+    )
+    offsets = numpy.frombuffer(offsets_buffer, offset_type)[
+        binary_array.offset : binary_array.offset + len(binary_array) + 1
+    ].tolist()
+    valid = binary_array.is_valid().to_pylist()
+    data = memoryview(data_buffer).cast("B") if data_buffer is not None else b""
+    rows = [
+        [(start, end)] if is_valid else None
+        for start, end, is_valid in zip(offsets, offsets[1:], valid)
+    ]
+    return data, rows
+
+
+def _bytes_to_rows(
+    payloads: typing.List[typing.Optional[bytes]],
+) -> typing.Tuple[bytes, typing.List[Ranges]]:
+    offsets = [0]
+    offsets.extend(
+        itertools.accumulate(len(payload) if payload else 0 for payload in payloads)
+    )
+    rows = [
+        [(start, end)] if payload is not None else None
+        for start, end, payload in zip(offsets, offsets[1:], payloads)
+    ]
+    data = b"".join(payload for payload in payloads if payload)
+    return data, rows
+
+
+def parse_messages(
+    payloads: typing.Iterable[typing.Optional[bytes]], message_descriptor: Descriptor
+) -> typing.List[typing.Optional[Message]]:
+    """Parses the payloads with the C parser of protobuf, None stays None"""
+    from_string = message_descriptor._concrete_class.FromString
+    return [
+        from_string(payload) if payload is not None else None for payload in payloads
+    ]
+
+
+def bytes_to_table(
+    payloads: typing.Union[
+        pyarrow.BinaryArray, pyarrow.LargeBinaryArray, typing.List[bytes]
+    ],
+    message_descriptor: Descriptor,
+    low_memory: bool = False,
+) -> pyarrow.Table:
+    """
+    Converts serialized messages to a table, the same as parsing the messages
+    and calling `messages_to_table`, with the cached conversion plan.
+    With `low_memory`, the messages are decoded straight into arrow buffers by a
+    pure python decoder instead, without ever building Message objects.
+    It keeps less in memory, but is 2 to 5 times slower.
+    """
+    if isinstance(payloads, pyarrow.ChunkedArray):
+        payloads = payloads.combine_chunks()
+    plan = get_conversion_plan(message_descriptor)
+    if not low_memory:
+        if isinstance(payloads, (pyarrow.BinaryArray, pyarrow.LargeBinaryArray)):
+            payloads = payloads.to_pylist()
+        return plan.to_table(parse_messages(payloads, message_descriptor))
+    if isinstance(payloads, (pyarrow.BinaryArray, pyarrow.LargeBinaryArray)):
+        data, rows = _binary_array_to_rows(payloads)
+    else:
+        data, rows = _bytes_to_rows(payloads)
+    arrays = MessageDecoder(message_descriptor).decode(data, rows)
+    return pyarrow.Table.from_arrays(arrays, schema=plan.schema)
+
+
+def delimited_offsets(data) -> typing.Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Returns the (starts, ends) of the messages of a buffer of varint length
+    prefixed messages, as written by `writeDelimitedTo`.
+    The prefixes are chained, each tells where the next one is, so this is a
+    single pass over the prefixes that never touches the messages themselves.
+    """
+    starts = array.array("q")
+    ends = array.array("q")
+    position = 0
+    size = len(data)
+    while position < size:
+        length = data[position]
+        if length < 0x80:
+            position += 1
+        else:
+            length, position = read_varint(data, position)
+        if position + length > size:
+            raise ValueError(f"Truncated message at {position}, {length} bytes")
+        starts.append(position)
+        position += length
+        ends.append(position)
+    return numpy.frombuffer(starts, numpy.int64), numpy.frombuffer(ends, numpy.int64)
+
+
+def iter_delimited_batches(
+    source: typing.Union[str, os.PathLike, bytes, pyarrow.Buffer],
+    message_descriptor: Descriptor,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    low_memory: bool = False,
+) -> typing.Iterator[pyarrow.RecordBatch]:
+    """
+    Converts a file (memory mapped) or buffer of varint length prefixed messages
+    into record batches of at most `batch_size` rows.
+    The messages are parsed from slices of the buffer, without copying them,
+    and converted with the cached plan. `low_memory` is as for `bytes_to_table`.
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size should be positive, got {batch_size}")
+    if isinstance(source, (str, os.PathLike)):
+        with pyarrow.memory_map(os.fspath(source)) as memory_map:
+            yield from iter_delimited_batches(
+                memory_map.read_buffer(), message_descriptor, batch_size, low_memory
+            )
+        return
+    data = memoryview(source).cast("B")
+    starts, ends = delimited_offsets(data)
+    plan = get_conversion_plan(message_descriptor)
+    decoder = MessageDecoder(message_descriptor) if low_memory else None
+    for offset in range(0, len(starts), batch_size):
+        batch_starts = starts[offset : offset + batch_size].tolist()
+        batch_ends = ends[offset : offset + batch_size].tolist()
+        if decoder is None:
+            yield plan.to_record_batch(
+                parse_messages(
+                    (data[start:end] for start, end in zip(batch_starts, batch_ends)),
+                    message_descriptor,
+                )
+            )
+        else:
+            rows = [[(start, end)] for start, end in zip(batch_starts, batch_ends)]
+            yield pyarrow.RecordBatch.from_arrays(
+                decoder.decode(data, rows), schema=plan.schema
+            )
+
+
+def delimited_to_table(
+    source: typing.Union[str, os.PathLike, bytes, pyarrow.Buffer],
+    message_descriptor: Descriptor,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    low_memory: bool = False,
+) -> pyarrow.Table:
+    """Like `iter_delimited_batches`, but returns all the batches as one table"""
+    return pyarrow.Table.from_batches(
+        iter_delimited_batches(source, message_descriptor, batch_size, low_memory),
+        schema=get_conversion_plan(message_descriptor).schema,
+    )
+
+
+# Encoding goes column by column: each field is turned into `Segments`, the bytes
+# of every row back to back, with numpy. The fields are then interleaved row by row.
+
+
+class Segments(typing.NamedTuple):
+    """The bytes of consecutive items (rows or list elements)"""
+
+    lengths: numpy.ndarray
+    data: numpy.ndarray
+
+    @staticmethod
+    def empty(count: int) -> "Segments":
+        return Segments(numpy.zeros(count, numpy.int64), numpy.zeros(0, numpy.uint8))
+
+
+def _exclusive_cumsum(lengths: numpy.ndarray) -> numpy.ndarray:
+    result = numpy.zeros(len(lengths) + 1, numpy.int64)
+    numpy.cumsum(lengths, out=result[1:])
+    return result
+
+
+def _select(segments: Segments, mask: numpy.ndarray) -> Segments:
+    """Items where `mask` is False become empty"""
+    if mask.all():
+        return segments
+    return Segments(
+        numpy.where(mask, segments.lengths, 0),
+        segments.data[numpy.repeat(mask, segments.lengths)],
+    )
+
+
+def _expand(segments: Segments, mask: numpy.ndarray) -> Segments:
+    """Spreads the segments of the items where `mask` is True to all items"""
+    lengths = numpy.zeros(len(mask), numpy.int64)
+    lengths[mask] = segments.lengths
+    return Segments(lengths, segments.data)
+
+
+def _concat(parts: typing.List[Segments], count: int) -> Segments:
+    """Item i of the result is item i of each part, one after the other"""
+    parts = [part for part in parts if len(part.data)]
+    if not parts:
+        return Segments.empty(count)
+    elif len(parts) == 1:
+        return parts[0]
+    lengths = sum(part.lengths for part in parts)
+    data = numpy.empty(int(lengths.sum()), numpy.uint8)
+    positions = _exclusive_cumsum(lengths)[:-1]
+    for part in parts:
+        starts = _exclusive_cumsum(part.lengths)[:-1]
+        data[
+            numpy.repeat(positions - starts, part.lengths)
+            + numpy.arange(len(part.data))
+        ] = part.data
+        positions = positions + part.lengths
+    return Segments(lengths, data)
+
+
+def _group(segments: Segments, offsets: numpy.ndarray) -> Segments:
+    """Joins the segments of list elements into one per list"""
+    ends = _exclusive_cumsum(segments.lengths)
+    return Segments(ends[offsets[1:]] - ends[offsets[:-1]], segments.data)
+
+
+_VARINT_SHIFTS = numpy.arange(10, dtype=numpy.uint64) * numpy.uint64(7)
+_VARINT_THRESHOLDS = numpy.uint64(1) << _VARINT_SHIFTS[1:]
+
+
+def encode_varints(values: numpy.ndarray) -> Segments:
+    values = values.astype(numpy.uint64, copy=False)
+    lengths = numpy.searchsorted(_VARINT_THRESHOLDS, values, side="right") + 1
+    width = int(lengths.max()) if len(lengths) else 1
+    groups = ((values[:, None] >> _VARINT_SHIFTS[:width]) & numpy.uint64(0x7F)).astype(
+        numpy.uint8
+    )
+    positions = numpy.arange(width)
+    groups[positions < (lengths - 1)[:, None]] |= 0x80
+    return Segments(lengths.astype(numpy.int64), groups[positions < lengths[:, None]])
+
+
+def _encode_tag(field_number: int, wire_type: int) -> bytes:
+    return encode_varints(numpy.array([field_number << 3 | wire_type])).data.tobytes()
+
+
+def _constant(payload: bytes, mask: numpy.ndarray) -> Segments:
+    return Segments(
+        mask * len(payload),
+        numpy.tile(numpy.frombuffer(payload, numpy.uint8), int(mask.sum())),
+    )
+
+
+def _to_numpy(array: pyarrow.Array) -> numpy.ndarray:
+    """Nulls become 0"""
+    if pyarrow.types.is_timestamp(array.type):
+        array = array.cast(pyarrow.int64())
+    if array.null_count:
+        array = array.fill_null(pyarrow.scalar(0, pyarrow.int64()).cast(array.type))
+    return array.to_numpy(zero_copy_only=False)
+
+
+def _to_wire_varint(values: numpy.ndarray, field_type: int) -> numpy.ndarray:
+    if field_type == FieldDescriptor.TYPE_SINT32:
+        values = values.astype(numpy.int32)
+        return ((values << 1) ^ (values >> 31)).view(numpy.uint32)
+    elif field_type == FieldDescriptor.TYPE_SINT64:
+        values = values.astype(numpy.int64)
+        return ((values << 1) ^ (values >> 63)).view(numpy.uint64)
+    elif field_type in (FieldDescriptor.TYPE_UINT32, FieldDescriptor.TYPE_UINT64):
+        return values.astype(numpy.uint64)
+    else:
+        # Negative int32 and enums are sign extended to 10 bytes, like int64
+        return values.astype(numpy.int64).view(numpy.uint64)
+
+
+_FIXED_DTYPES = {
+    field_type: numpy.dtype("<" + code) for field_type, code in FIXED_FORMATS.items()
+}
+
+
+def _binary_segments(array: pyarrow.Array) -> Segments:
+    _, offsets_buffer, data_buffer = array.buffers()
+    offset_type = (
+        numpy.int64
+        if pyarrow.types.is_large_string(array.type)
+        or pyarrow.types.is_large_binary(array.type)
+        else numpy.int32
+    )
+    offsets = numpy.frombuffer(offsets_buffer, offset_type)[
+        array.offset : array.offset + len(array) + 1
+    ]
+    if data_buffer is None:
+        data = numpy.zeros(0, numpy.uint8)
+    else:
+        data = numpy.frombuffer(data_buffer, numpy.uint8)[offsets[0] : offsets[-1]]
+    return Segments(numpy.diff(offsets).astype(numpy.int64), data)
+
+
+def _length_delimited(
+    tag: bytes, payloads: Segments, mask: numpy.ndarray, count: int
+) -> Segments:
+    """Tag, length and payload of the items where `mask` is True"""
+    payloads = _select(payloads, mask)
+    return _concat(
+        [
+            _constant(tag, mask),
+            _expand(encode_varints(payloads.lengths[mask]), mask),
+            payloads,
+        ],
+        count,
+    )
+
+
+_SECONDS_TAG = _encode_tag(1, WIRETYPE_VARINT)
+_NANOS_TAG = _encode_tag(2, WIRETYPE_VARINT)
+
+
+def _timestamp_segments(array: pyarrow.TimestampArray) -> Segments:
+    nanos_per_unit = NANOS_PER_UNIT[array.type.unit]
+    seconds, remainder = numpy.divmod(_to_numpy(array), 1_000_000_000 // nanos_per_unit)
+    nanos = remainder * nanos_per_unit
+    parts = []
+    for tag, values in [(_SECONDS_TAG, seconds), (_NANOS_TAG, nanos)]:
+        mask = values != 0
+        parts.append(_constant(tag, mask))
+        parts.append(_expand(encode_varints(values[mask].view(numpy.uint64)), mask))
+    return _concat(parts, len(array))
+
+
+class FieldEncoder:
+    def __init__(self, field_descriptor: FieldDescriptor):
+        self.name = field_descriptor.name
+        self.type = field_descriptor.type
+        self.is_repeated = field_descriptor.label == FieldDescriptor.LABEL_REPEATED
+        self.is_timestamp = is_timestamp(field_descriptor)
+        self.enum_type = field_descriptor.enum_type
+        self.message_encoder = (
+            get_message_encoder(field_descriptor.message_type)
+            if self.type == FieldDescriptor.TYPE_MESSAGE and not self.is_timestamp
+            else None
+        )
+        self.wire_type = WIRE_TYPES[self.type]
+        self.is_packed = (
+            self.is_repeated and self.wire_type != WIRETYPE_LENGTH_DELIMITED
+        )
+        # proto3 scalars are only written when not the default value
+        self.implicit_presence = (
+            not self.is_repeated
+            and field_descriptor.containing_oneof is None
+            and self.type != FieldDescriptor.TYPE_MESSAGE
+        )
+        self.tag = _encode_tag(
+            field_descriptor.number,
+            WIRETYPE_LENGTH_DELIMITED if self.is_packed else self.wire_type,
+        )
+        self.value_tag = _encode_tag(field_descriptor.number, self.wire_type)
+
+    def encode_values(
+        self, array: pyarrow.Array
+    ) -> typing.Tuple[Segments, typing.Optional[numpy.ndarray]]:
+        """Values without tags, and which are not the default value"""
+        if pyarrow.types.is_dictionary(array.type):
+            if self.type == FieldDescriptor.TYPE_ENUM:
+                array = get_enum_dictionary(self.enum_type).decode(array)
+            else:
+                array = array.dictionary_decode()
+        if self.message_encoder is not None:
+            return self.message_encoder.encode_struct(array), None
+        elif self.is_timestamp:
+            return _timestamp_segments(array), None
+        elif self.wire_type == WIRETYPE_LENGTH_DELIMITED:
+            segments = _binary_segments(array)
+            return segments, segments.lengths > 0
+        elif self.wire_type == WIRETYPE_VARINT:
+            values = _to_numpy(array)
+            return encode_varints(_to_wire_varint(values, self.type)), values != 0
+        else:
+            values = _to_numpy(array).astype(_FIXED_DTYPES[self.type])
+            bits = values.view(numpy.uint32 if values.itemsize == 4 else numpy.uint64)
+            return (
+                Segments(
+                    numpy.full(len(values), values.itemsize, numpy.int64),
+                    values.view(numpy.uint8),
+                ),
+                bits != 0,
+            )
+
+    def encode(
+        self, array: pyarrow.Array, keep: typing.Optional[numpy.ndarray] = None
+    ) -> Segments:
+        if isinstance(array, pyarrow.ChunkedArray):
+            array = array.combine_chunks()
+        count = len(array)
+        present = get_validity(array)
+        if keep is not None:
+            present &= keep
+        if self.is_repeated:
+            return self._encode_repeated(array, present)
+        values, not_default = self.encode_values(array)
+        if self.implicit_presence:
+            present &= not_default
+        if self.wire_type == WIRETYPE_LENGTH_DELIMITED:
+            return _length_delimited(self.tag, values, present, count)
+        else:
+            return _concat(
+                [_constant(self.tag, present), _select(values, present)], count
+            )
+
+    def _encode_repeated(self, array: pyarrow.ListArray, present: numpy.ndarray):
+        offsets = array.offsets.to_numpy().astype(numpy.int64)
+        values = array.values.slice(offsets[0], offsets[-1] - offsets[0])
+        offsets -= offsets[0]
+        element_mask = numpy.repeat(present, numpy.diff(offsets))
+        elements, _ = self.encode_values(values)
+        if self.is_packed:
+            payloads = _group(_select(elements, element_mask), offsets)
+            return _length_delimited(
+                self.tag, payloads, payloads.lengths > 0, len(array)
+            )
+        else:
+            elements = _length_delimited(
+                self.value_tag, elements, element_mask, len(values)
+            )
+            return _group(elements, offsets)
+
+
+class MessageEncoder:
+    def __init__(self, message_descriptor: Descriptor):
+        # Fields are written in field number order, like SerializeToString
+        self.fields = [
+            FieldEncoder(field)
+            for field in sorted(message_descriptor.fields, key=lambda f: f.number)
+        ]
+        self.oneofs = [
+            [field.name for field in oneof.fields]
+            for oneof in message_descriptor.oneofs
+        ]
+
+    def encode_columns(
+        self, columns: typing.Dict[str, pyarrow.Array], count: int
+    ) -> Segments:
+        """Missing columns are left out, so projected tables can be encoded"""
+        keep = {}
+        for names in self.oneofs:
+            # When several are set, the last one wins, like in table_to_messages
+            taken = numpy.zeros(count, bool)
+            for name in reversed(names):
+                if name in columns:
+                    keep[name] = ~taken
+                    taken |= get_validity(columns[name])
+        return _concat(
+            [
+                field.encode(columns[field.name], keep.get(field.name))
+                for field in self.fields
+                if field.name in columns
+            ],
+            count,
+        )
+
+    def encode_struct(self, struct_array: pyarrow.StructArray) -> Segments:
+        columns = {
+            field.name: struct_array.field(i)
+            for i, field in enumerate(struct_array.type)
+        }
+        return self.encode_columns(columns, len(struct_array))
+
+
+@functools.lru_cache(maxsize=128)
+def get_message_encoder(message_descriptor: Descriptor) -> MessageEncoder:
+    return MessageEncoder(message_descriptor)
+
+
+def table_to_bytes(
+    table: typing.Union[pyarrow.Table, pyarrow.RecordBatch],
+    message_descriptor: Descriptor,
+) -> pyarrow.BinaryArray:
+    """
+    Encodes the rows of the table straight into serialized messages.
+    The result is the same as `table_to_messages` then `SerializeToString`.
+    """
+    encoder = get_message_encoder(message_descriptor)
+    if isinstance(table, pyarrow.RecordBatch):
+        record_batches = [table]
+    else:
+        record_batches = table.to_batches()
+    arrays = [pyarrow.array([], pyarrow.binary())]
+    for record_batch in record_batches:
+        segments = encoder.encode_columns(
+            dict(zip(record_batch.schema.names, record_batch.columns)),
+            record_batch.num_rows,
+        )
+        offsets = _exclusive_cumsum(segments.lengths)
+        if offsets[-1] > numpy.iinfo(numpy.int32).max:
+            raise ValueError(
+                f"Record batch too large to encode: {offsets[-1]} bytes, "
+                "use smaller batches"
+            )
+        arrays.append(
+            pyarrow.Array.from_buffers(
+                pyarrow.binary(),
+                record_batch.num_rows,
+                [
+                    None,
+                    pyarrow.py_buffer(offsets.astype(numpy.int32)),
+                    pyarrow.py_buffer(segments.data),
+                ],
+            )
+        )
+    return pyarrow.concat_arrays(arrays)
@@ -1,9 +1,17 @@
+import functools
 from dataclasses import dataclass
 from typing import Sequence, Iterator
 
-from google.protobuf.descriptor import FileDescriptor, Descriptor, FieldDescriptor
+from google.protobuf.descriptor import (
+    FileDescriptor,
+    Descriptor,
+    FieldDescriptor,
+    EnumDescriptor,
+)
+from google.protobuf.descriptor_pb2 import FileDescriptorProto
 
 from arrowgen import arrow_converter
+from arrowgen.arrow_converter import ConversionOptions, DEFAULT_OPTIONS
 
 CPP_TYPES = {
     FieldDescriptor.TYPE_DOUBLE: "double",
@@ -83,6 +91,62 @@ ARROW_TYPES = {
 }
 
 
+LARGE_ARROW_TYPES = {
+    FieldDescriptor.TYPE_STRING: "arrow::large_utf8()",
+    FieldDescriptor.TYPE_BYTES: "arrow::large_binary()",
+}
+
+LARGE_CPP_BUILDERS = {
+    FieldDescriptor.TYPE_STRING: "arrow::LargeStringBuilder",
+    FieldDescriptor.TYPE_BYTES: "arrow::LargeBinaryBuilder",
+}
+
+LARGE_CPP_ARRAYS = {
+    FieldDescriptor.TYPE_STRING: "arrow::LargeStringArray",
+    FieldDescriptor.TYPE_BYTES: "arrow::LargeBinaryArray",
+}
+
+WIRE_TYPES = {
+    FieldDescriptor.TYPE_DOUBLE: "WIRETYPE_FIXED64",
+    FieldDescriptor.TYPE_FLOAT: "WIRETYPE_FIXED32",
+    FieldDescriptor.TYPE_INT64: "WIRETYPE_VARINT",
+    FieldDescriptor.TYPE_UINT64: "WIRETYPE_VARINT",
+    FieldDescriptor.TYPE_INT32: "WIRETYPE_VARINT",
+    FieldDescriptor.TYPE_FIXED64: "WIRETYPE_FIXED64",
+    FieldDescriptor.TYPE_FIXED32: "WIRETYPE_FIXED32",
+    FieldDescriptor.TYPE_BOOL: "WIRETYPE_VARINT",
+    FieldDescriptor.TYPE_STRING: "WIRETYPE_LENGTH_DELIMITED",
+    FieldDescriptor.TYPE_MESSAGE: "WIRETYPE_LENGTH_DELIMITED",
+    FieldDescriptor.TYPE_BYTES: "WIRETYPE_LENGTH_DELIMITED",
+    FieldDescriptor.TYPE_UINT32: "WIRETYPE_VARINT",
+    FieldDescriptor.TYPE_ENUM: "WIRETYPE_VARINT",
+    FieldDescriptor.TYPE_SFIXED32: "WIRETYPE_FIXED32",
+    FieldDescriptor.TYPE_SFIXED64: "WIRETYPE_FIXED64",
+    FieldDescriptor.TYPE_SINT32: "WIRETYPE_VARINT",
+    FieldDescriptor.TYPE_SINT64: "WIRETYPE_VARINT",
+}
+
+# From the raw varint to the value of the field
+VARINT_CONVERSIONS = {
+    FieldDescriptor.TYPE_INT64: "static_cast<int64_t>({})",
+    FieldDescriptor.TYPE_UINT64: "{}",
+    FieldDescriptor.TYPE_INT32: "static_cast<int32_t>({})",
+    FieldDescriptor.TYPE_BOOL: "{} != 0",
+    FieldDescriptor.TYPE_UINT32: "static_cast<uint32_t>({})",
+    FieldDescriptor.TYPE_ENUM: "static_cast<int32_t>({})",
+    FieldDescriptor.TYPE_SINT32: "decodeZigZag32({})",
+    FieldDescriptor.TYPE_SINT64: "decodeZigZag64({})",
+}
+
+
+@functools.lru_cache(maxsize=128)
+def is_proto3(file_descriptor: FileDescriptor) -> bool:
+    # FileDescriptor.syntax is deprecated, the proto still has it
+    file_proto = FileDescriptorProto()
+    file_descriptor.CopyToProto(file_proto)
+    return file_proto.syntax == "proto3"
+
+
 def shared_ptr(cpp_type: str) -> str:
     return f"std::shared_ptr<{cpp_type}>"
 
@@ -101,11 +165,67 @@ class ClassMember:
         )
 
 
+class EnumWrapper:
+    """
+    Helpers generated in the source file for the dictionary encoded enums:
+    the dictionary of the value names, and the conversions between the value
+    numbers and the dictionary indices
+    """
+
+    def __init__(self, descriptor: EnumDescriptor):
+        self.descriptor = descriptor
+
+    def enum_name(self):
+        return self.descriptor.full_name.replace(".", "::")
+
+    def function_prefix(self):
+        return self.descriptor.full_name.replace(".", "_")
+
+    def dictionary_function(self):
+        return self.function_prefix() + "_dictionary"
+
+    def index_function(self):
+        return self.function_prefix() + "_index"
+
+    def numbers_function(self):
+        return self.function_prefix() + "_numbers"
+
+    def parse_function(self):
+        # Nested enums are declared at namespace level, as Outer_Inner
+        package = self.descriptor.file.package
+        local_name = (
+            self.descriptor.full_name[len(package) + 1 :]
+            if package
+            else self.descriptor.full_name
+        )
+        namespace = package.replace(".", "::")
+        return f"{namespace}::{local_name.replace('.', '_')}_Parse"
+
+    def is_valid_function(self):
+        return self.parse_function()[: -len("_Parse")] + "_IsValid"
+
+    def names(self):
+        for value in self.descriptor.values:
+            yield value.name
+
+    def index_cases(self):
+        """(number, index) of each number, aliases use their first name"""
+        seen = set()
+        for index, value in enumerate(self.descriptor.values):
+            if value.number not in seen:
+                seen.add(value.number)
+                yield value.number, index
+
+
 class BaseField:
-    def __init__(self, field: FieldDescriptor):
+    def __init__(self, field: FieldDescriptor, options: ConversionOptions):
         self.field = field
+        self.options = options
+        self.encoding = arrow_converter.get_field_encoding(field, options)
         self.message_wrapper = (
-            MessageWrapper(self.field.message_type) if self.is_message() else None
+            MessageWrapper(self.field.message_type, options)
+            if self.is_message()
+            else None
         )
 
     def name(self):
@@ -132,6 +252,22 @@ class BaseField:
     def is_enum(self):
         return self.field.cpp_type == FieldDescriptor.CPPTYPE_ENUM
 
+    def is_dictionary(self):
+        return self.encoding.dictionary
+
+    def is_enum_dictionary(self):
+        return self.is_enum() and self.is_dictionary()
+
+    def is_large(self):
+        return self.encoding.large
+
+    def is_float32(self):
+        return self.encoding.float32
+
+    def enum_wrapper(self):
+        assert self.is_enum()
+        return EnumWrapper(self.field.enum_type)
+
     def is_boolean(self):
         return self.field.cpp_type == FieldDescriptor.CPPTYPE_BOOL
 
@@ -157,18 +293,35 @@ class BaseField:
         return CPP_TYPES[self.field.type]
 
     def offset_type(self):
-        # TODO: implement
-        return "uint64_t"
+        return "int64_t" if self.is_large() else "int32_t"
+
+    def arrow_type(self):
+        if self.is_dictionary():
+            value_type = (
+                "arrow::binary()"
+                if self.field.type == FieldDescriptor.TYPE_BYTES
+                else "arrow::utf8()"
+            )
+            return f"arrow::dictionary(arrow::int32(), {value_type})"
+        elif self.is_float32():
+            return "arrow::float32()"
+        elif self.is_large() and self.field.type in LARGE_ARROW_TYPES:
+            return LARGE_ARROW_TYPES[self.field.type]
+        else:
+            return ARROW_TYPES[self.field.type]
+
+    def list_type_function(self):
+        return "arrow::large_list" if self.is_large() else "arrow::list"
 
     def schema_statement(self):
         if self.is_repeated_message():
-            return f'arrow::field("{self.name()}", arrow::list(arrow::struct_({self.appender_type()}::FIELD_VECTOR)))'
+            return f'arrow::field("{self.name()}", {self.list_type_function()}(arrow::struct_({self.appender_type()}::FIELD_VECTOR)))'
         elif self.is_repeated():
-            return f'arrow::field("{self.name()}", arrow::list({ARROW_TYPES[self.field.type]}))'
+            return f'arrow::field("{self.name()}", {self.list_type_function()}({self.arrow_type()}))'
         elif self.is_message():
             return f'arrow::field("{self.name()}", arrow::struct_({self.appender_type()}::FIELD_VECTOR))'
         else:
-            return f'arrow::field("{self.name()}", {ARROW_TYPES[self.field.type]})'
+            return f'arrow::field("{self.name()}", {self.arrow_type()})'
 
     def oneof_name(self):
         assert self.is_oneof()
@@ -183,8 +336,8 @@ class BaseField:
 
 
 class ReaderField(BaseField):
-    def __init__(self, field: FieldDescriptor):
-        super().__init__(field)
+    def __init__(self, field: FieldDescriptor, options: ConversionOptions):
+        super().__init__(field, options)
 
     def index_name(self):
         return self.make_name("index")
@@ -204,14 +357,31 @@ class ReaderField(BaseField):
     def chunk_name(self):
         return self.make_name("chunk")
 
+    def column_name(self):
+        return self.make_name("column")
+
+    def chunk_offsets_name(self):
+        return self.make_name("chunk_offsets")
+
+    def numbers_name(self):
+        return self.make_name("numbers")
+
+    def numbers_statement(self):
+        """Enum numbers of the dictionary entries of the current array"""
+        assert self.is_enum_dictionary()
+        return f"{self.enum_wrapper().numbers_function()}({self.array_name()})"
+
+    def list_array_type(self):
+        return "arrow::LargeListArray" if self.is_large() else "arrow::ListArray"
+
     def list_array_caster(self):
-        return "std::static_pointer_cast<arrow::ListArray>"
+        return f"std::static_pointer_cast<{self.list_array_type()}>"
 
     def array_caster(self):
         return f"std::static_pointer_cast<{self.array_type()}>"
 
     def get_array_statement(self):
-        return f'table_->GetColumnByName("{self.name()}")->chunk({self.chunk_name()})'
+        return f"table_->column({self.column_name()})->chunk({self.chunk_name()})"
 
     def length_statement(self):
         if (
@@ -236,7 +406,22 @@ class ReaderField(BaseField):
             return ""
 
     def array_type(self):
-        return CPP_ARRAYS[self.field.type]
+        if self.is_dictionary():
+            return "arrow::DictionaryArray"
+        elif self.is_float32():
+            return "arrow::FloatArray"
+        elif self.is_large() and self.field.type in LARGE_CPP_ARRAYS:
+            return LARGE_CPP_ARRAYS[self.field.type]
+        else:
+            return CPP_ARRAYS[self.field.type]
+
+    def value_statement(self, index_name: str):
+        if self.is_enum_dictionary():
+            return f"({self.value_type()}){self.numbers_name()}[{self.array_name()}->GetValueIndex({index_name})]"
+        elif self.is_dictionary():
+            return f"static_cast<{CPP_ARRAYS[self.field.type]} const&>(*{self.array_name()}->dictionary()).GetString({self.array_name()}->GetValueIndex({index_name}))"
+        else:
+            return f"{self.optional_cast()}{self.array_name()}->{self.value_reader()}({index_name})"
 
     def is_null_statement(self, index_name="index"):
         return f"{self.main_array_name()}{'.' if self.is_message() else '->'}IsNull({index_name})"
@@ -245,7 +430,7 @@ class ReaderField(BaseField):
         if self.is_repeated_message():
             yield ClassMember(
                 self.list_array_name(),
-                shared_ptr("arrow::ListArray"),
+                shared_ptr(self.list_array_type()),
                 f'{self.list_array_caster()}(struct_array_->GetFieldByName("{self.name()}"))',
             )
             yield ClassMember(
@@ -257,7 +442,7 @@ class ReaderField(BaseField):
         elif self.is_repeated():
             yield ClassMember(
                 self.list_array_name(),
-                shared_ptr("arrow::ListArray"),
+                shared_ptr(self.list_array_type()),
                 f'{self.list_array_caster()}(struct_array_->GetFieldByName("{self.name()}"))',
             )
             yield ClassMember(
@@ -274,17 +459,36 @@ class ReaderField(BaseField):
         else:
             yield ClassMember(
                 self.array_name(),
-                shared_ptr(CPP_ARRAYS[self.field.type]),
+                shared_ptr(self.array_type()),
                 f'{self.array_caster()}(struct_array_->GetFieldByName("{self.name()}"))',
             )
+        if self.is_enum_dictionary():
+            yield self.numbers_member()
 
-    def members(self) -> Sequence[ClassMember]:
+    def numbers_member(self) -> ClassMember:
+        return ClassMember(
+            self.numbers_name(), "std::vector<int>", self.numbers_statement()
+        )
+
+    def members(self, with_column: bool = True) -> Sequence[ClassMember]:
+        # The column is looked up once, it is the same for every batch
+        if with_column:
+            yield ClassMember(
+                self.column_name(),
+                "int",
+                f'table_->schema()->GetFieldIndex("{self.name()}")',
+            )
         yield ClassMember(self.chunk_name(), "uint64_t", "0")
         yield ClassMember(self.index_name(), "uint64_t", "0")
+        yield ClassMember(
+            self.chunk_offsets_name(),
+            "std::vector<int64_t>",
+            f"chunkOffsets(*table_->column({self.column_name()}))",
+        )
         if self.is_repeated():
             yield ClassMember(
                 self.list_array_name(),
-                shared_ptr("arrow::ListArray"),
+                shared_ptr(self.list_array_type()),
                 f"{self.list_array_caster()}({self.get_array_statement()})",
             )
             if self.is_message():
@@ -308,18 +512,20 @@ class ReaderField(BaseField):
         else:
             yield ClassMember(
                 self.array_name(),
-                shared_ptr(CPP_ARRAYS[self.field.type]),
+                shared_ptr(self.array_type()),
                 f"{self.array_caster()}({self.get_array_statement()})",
             )
+        if self.is_enum_dictionary():
+            yield self.numbers_member()
 
     def struct_reader_type(self):
         assert self.is_message()
-        return MessageWrapper(self.field.message_type).struct_reader_name()
+        return self.message_wrapper.struct_reader_name()
 
 
 class AppenderField(BaseField):
-    def __init__(self, field: FieldDescriptor):
-        super().__init__(field)
+    def __init__(self, field: FieldDescriptor, options: ConversionOptions):
+        super().__init__(field, options)
 
     def appender_name(self):
         return self.make_name("appender")
@@ -347,9 +553,32 @@ class AppenderField(BaseField):
     def builder_type(self):
         if self.is_message():
             return self.appender_type()
+        elif self.is_dictionary():
+            return (
+                "arrow::BinaryDictionary32Builder"
+                if self.field.type == FieldDescriptor.TYPE_BYTES
+                else "arrow::StringDictionary32Builder"
+            )
+        elif self.is_float32():
+            return "arrow::FloatBuilder"
+        elif self.is_large() and self.field.type in LARGE_CPP_BUILDERS:
+            return LARGE_CPP_BUILDERS[self.field.type]
         else:
             return CPP_BUILDERS[self.field.type]
 
+    def list_builder_type(self):
+        return "arrow::LargeListBuilder" if self.is_large() else "arrow::ListBuilder"
+
+    def builder_arguments(self):
+        if self.is_enum_dictionary():
+            # The enum names are in the memo table up front, values append indices
+            return f"{self.enum_wrapper().dictionary_function()}(), pool"
+        else:
+            return "pool"
+
+    def index_name(self):
+        return self.make_name("index")
+
     def is_repeated(self):
         return self.field.label == FieldDescriptor.LABEL_REPEATED
 
@@ -365,14 +594,14 @@ class AppenderField(BaseField):
             ).to_shared_ptr()
             yield ClassMember(
                 self.list_builder_name(),
-                "arrow::ListBuilder",
-                f"pool, {self.struct_builder_name()}, arrow::list({self.message_wrapper.data_type_statement()})",
+                self.list_builder_type(),
+                f"pool, {self.struct_builder_name()}, {self.list_type_function()}({self.message_wrapper.data_type_statement()})",
             ).to_shared_ptr()
         elif self.is_repeated():
             yield ClassMember(
                 self.list_builder_name(),
-                "arrow::ListBuilder",
-                f"pool, std::make_shared<{self.builder_type()}>(pool)",
+                self.list_builder_type(),
+                f"pool, std::make_shared<{self.builder_type()}>({self.builder_arguments()})",
             ).to_shared_ptr()
             yield ClassMember(
                 self.builder_name(),
@@ -390,7 +619,7 @@ class AppenderField(BaseField):
             ).to_shared_ptr()
         else:
             yield ClassMember(
-                self.builder_name(), self.builder_type(), "pool"
+                self.builder_name(), self.builder_type(), self.builder_arguments()
             ).to_shared_ptr()
 
     def append_statements(self):
@@ -426,9 +655,14 @@ class AppenderField(BaseField):
             yield f"  {self.struct_builder_name()}->Append();"
             yield f"  {self.appender_name()}->append(value);"
             yield "}"
+        elif self.is_repeated() and self.is_enum_dictionary():
+            yield f"ARROW_RETURN_NOT_OK({self.list_builder_name()}->Append());"
+            yield f"for (int const value : message.{self.name()}())" + "{"
+            yield from self.append_index_statements("value")
+            yield "}"
         elif self.is_repeated():
             yield f"ARROW_RETURN_NOT_OK({self.list_builder_name()}->Append());"
-            if self.is_boolean():
+            if self.is_boolean() or self.is_float32():
                 yield f"ARROW_RETURN_NOT_OK({self.builder_name()}->AppendValues(message.{self.name()}().begin(), message.{self.name()}().end()));"
             elif self.is_string():
                 yield f"for (std::string const& value : message.{self.name()}()) " + "{"
@@ -439,9 +673,274 @@ class AppenderField(BaseField):
         elif self.is_message():
             yield f"ARROW_RETURN_NOT_OK({self.struct_builder_name()}->Append());"
             yield f"ARROW_RETURN_NOT_OK({self.appender_name()}->append(message.{self.name()}()));"
+        elif self.is_enum_dictionary():
+            yield from self.append_index_statements(f"message.{self.name()}()")
         else:
             yield f"ARROW_RETURN_NOT_OK({self.builder_name()}->Append(message.{self.name()}()));"
 
+    def for_each_message(self, statements: Iterator[str]) -> Iterator[str]:
+        yield f"for ({self.containing_class()} const* pointer : messages) " + "{"
+        yield f"  {self.containing_class()} const& message = *pointer;"
+        yield from statements
+        yield "}"
+
+    def bulk_append_statements(self) -> Iterator[str]:
+        """
+        Appends the field of all the `messages` at once, with the builders
+        reserved up front and nested messages appended in bulk too
+        """
+        if self.is_repeated():
+            yield from self.bulk_append_repeated_statements()
+        elif self.is_message() and not self.is_oneof():
+            yield f"std::vector<{self.value_type()} const*> {self.make_name('values')};"
+            yield f"{self.make_name('values')}.reserve(messages.size());"
+            yield from self.for_each_message(
+                [f"{self.make_name('values')}.push_back(&message.{self.name()}());"]
+            )
+            yield f"ARROW_RETURN_NOT_OK({self.struct_builder_name()}->AppendValues(messages.size(), nullptr));"
+            yield f"ARROW_RETURN_NOT_OK({self.appender_name()}->append({self.make_name('values')}));"
+        elif self.is_message() or self.is_dictionary():
+            yield f"ARROW_RETURN_NOT_OK({self.main_builder_name()}->Reserve(messages.size()));"
+            yield from self.for_each_message(self.append_statements())
+        else:
+            yield f"ARROW_RETURN_NOT_OK({self.builder_name()}->Reserve(messages.size()));"
+            if self.is_string():
+                yield f"int64_t {self.make_name('bytes')} = 0;"
+                yield from self.for_each_message(
+                    [f"{self.make_name('bytes')} += message.{self.name()}().size();"]
+                )
+                yield f"ARROW_RETURN_NOT_OK({self.builder_name()}->ReserveData({self.make_name('bytes')}));"
+            append = f"{self.builder_name()}->UnsafeAppend(message.{self.name()}());"
+            if self.is_oneof():
+                yield from self.for_each_message(
+                    [
+                        f"if (message.{self.has_statement()}) " + "{",
+                        append,
+                        "} else {",
+                        f"{self.builder_name()}->UnsafeAppendNull();",
+                        "}",
+                    ]
+                )
+            else:
+                yield from self.for_each_message([append])
+
+    def bulk_append_repeated_statements(self) -> Iterator[str]:
+        # The list offsets are known up front, so the values are appended after
+        values_builder = (
+            self.struct_builder_name() if self.is_message() else self.builder_name()
+        )
+        offsets = self.make_name("offsets")
+        count = self.make_name("count")
+        yield f"int64_t const {self.make_name('start')} = {values_builder}->length();"
+        yield f"int64_t {count} = 0;"
+        yield f"std::vector<{self.offset_type()}> {offsets};"
+        yield f"{offsets}.reserve(messages.size());"
+        yield from self.for_each_message(
+            [
+                f"{offsets}.push_back(static_cast<{self.offset_type()}>({self.make_name('start')} + {count}));",
+                f"{count} += message.{self.name()}_size();",
+            ]
+        )
+        yield f"if ({self.make_name('start')} + {count} > std::numeric_limits<{self.offset_type()}>::max()) " + "{"
+        yield f'  return arrow::Status::CapacityError("Too many values in {self.containing_class()}.{self.name()}");'
+        yield "}"
+        yield f"ARROW_RETURN_NOT_OK({self.list_builder_name()}->AppendValues({offsets}.data(), {offsets}.size()));"
+        if self.is_message():
+            values = self.make_name("values")
+            yield f"std::vector<{self.value_type()} const*> {values};"
+            yield f"{values}.reserve({count});"
+            yield from self.for_each_message(
+                [
+                    f"for ({self.value_type()} const& value : message.{self.name()}()) "
+                    + "{",
+                    f"  {values}.push_back(&value);",
+                    "}",
+                ]
+            )
+            yield f"ARROW_RETURN_NOT_OK({values_builder}->AppendValues({count}, nullptr));"
+            yield f"ARROW_RETURN_NOT_OK({self.appender_name()}->append({values}));"
+            return
+        yield f"ARROW_RETURN_NOT_OK({values_builder}->Reserve({count}));"
+        if self.is_enum_dictionary():
+            yield from self.for_each_message(
+                [f"for (int const value : message.{self.name()}()) " + "{"]
+                + list(self.append_index_statements("value"))
+                + ["}"]
+            )
+        elif self.is_string() and self.is_dictionary():
+            yield from self.for_each_message(
+                [
+                    f"for (std::string const& value : message.{self.name()}()) " + "{",
+                    f"  ARROW_RETURN_NOT_OK({values_builder}->Append(value));",
+                    "}",
+                ]
+            )
+        elif self.is_string():
+            yield f"int64_t {self.make_name('bytes')} = 0;"
+            yield from self.for_each_message(
+                [
+                    f"for (std::string const& value : message.{self.name()}()) " + "{",
+                    f"  {self.make_name('bytes')} += value.size();",
+                    "}",
+                ]
+            )
+            yield f"ARROW_RETURN_NOT_OK({values_builder}->ReserveData({self.make_name('bytes')}));"
+            yield from self.for_each_message(
+                [
+                    f"for (std::string const& value : message.{self.name()}()) " + "{",
+                    f"  {values_builder}->UnsafeAppend(value);",
+                    "}",
+                ]
+            )
+        elif self.is_boolean() or self.is_float32():
+            yield from self.for_each_message(
+                [
+                    f"ARROW_RETURN_NOT_OK({values_builder}->AppendValues(message.{self.name()}().begin(), message.{self.name()}().end()));"
+                ]
+            )
+        else:
+            yield from self.for_each_message(
+                [
+                    f"ARROW_RETURN_NOT_OK({values_builder}->AppendValues(message.{self.name()}().data(), message.{self.name()}().size()));"
+                ]
+            )
+
+    def reserve_statements(self) -> Iterator[str]:
+        if self.is_repeated():
+            yield f"ARROW_RETURN_NOT_OK({self.list_builder_name()}->Reserve(rows));"
+        if self.is_message():
+            yield f"ARROW_RETURN_NOT_OK({self.struct_builder_name()}->Reserve(rows));"
+            yield f"ARROW_RETURN_NOT_OK({self.appender_name()}->reserve(rows, stringBytes));"
+        else:
+            yield f"ARROW_RETURN_NOT_OK({self.builder_name()}->Reserve(rows));"
+            if self.is_string() and not self.is_dictionary():
+                yield f"ARROW_RETURN_NOT_OK({self.builder_name()}->ReserveData(stringBytes));"
+
+    def append_index_statements(self, value: str) -> Iterator[str]:
+        yield f"ARROW_ASSIGN_OR_RAISE(int32_t const {self.index_name()}, {self.enum_wrapper().index_function()}({value}));"
+        yield f"ARROW_RETURN_NOT_OK({self.builder_name()}->AppendIndices(&{self.index_name()}, 1));"
+
+    def last_name(self):
+        return self.make_name("last")
+
+    def oneof_case_name(self):
+        return f"{self.oneof_name()}_case_"
+
+    def wire_type(self):
+        return WIRE_TYPES[self.field.type]
+
+    def is_packable(self):
+        return self.is_repeated() and self.wire_type() != "WIRETYPE_LENGTH_DELIMITED"
+
+    def read_value_statements(
+        self, position: str, end: str, then: Iterator[str]
+    ) -> Iterator[str]:
+        """Reads a value of the field into `value`, then runs `then` if it is valid"""
+        if self.wire_type() == "WIRETYPE_VARINT":
+            yield "uint64_t raw;"
+            yield f"ok = readVarint({position}, {end}, raw);"
+            yield f"{self.cpp_type()} const value = {VARINT_CONVERSIONS[self.field.type].format('raw')};"
+        elif self.wire_type() == "WIRETYPE_LENGTH_DELIMITED":
+            yield "std::string_view value;"
+            yield f"ok = readBytes({position}, {end}, value);"
+            if self.field.type == FieldDescriptor.TYPE_STRING and is_proto3(
+                self.field.file
+            ):
+                yield "ok = ok && isUtf8(value);"
+        else:
+            yield f"{self.cpp_type()} value;"
+            yield f"ok = readFixed({position}, {end}, value);"
+        if self.is_enum() and self.field.enum_type.is_closed:
+            # Unknown values of closed enums go to the unknown fields
+            yield f"if (ok && {self.enum_wrapper().is_valid_function()}(value)) " + "{"
+        else:
+            yield "if (ok) {"
+        yield from then
+        yield "}"
+
+    def scan_declarations(self) -> Iterator[str]:
+        """The last value of singular fields, their default until they are read"""
+        if self.is_repeated():
+            return
+        elif self.is_message():
+            yield f"MessageBytes {self.last_name()};"
+        elif self.is_string():
+            yield f"std::string_view {self.last_name()} = {self.containing_class()}::default_instance().{self.name()}();"
+        else:
+            yield f"{self.cpp_type()} {self.last_name()} = {self.containing_class()}::default_instance().{self.name()}();"
+
+    def scan_start_statements(self) -> Iterator[str]:
+        """Repeated values are appended as they are read, to the list opened here"""
+        if self.is_repeated():
+            yield f"ARROW_RETURN_NOT_OK({self.list_builder_name()}->Append());"
+
+    def scan_value_statements(self) -> Iterator[str]:
+        if self.is_repeated_message():
+            yield f"ARROW_RETURN_NOT_OK({self.struct_builder_name()}->Append());"
+            yield f"ARROW_RETURN_NOT_OK({self.appender_name()}->append(value.data(), value.size()));"
+        elif self.is_repeated() and self.is_enum_dictionary():
+            yield from self.append_index_statements("value")
+        elif self.is_repeated():
+            yield f"ARROW_RETURN_NOT_OK({self.builder_name()}->Append(value));"
+        elif self.is_message() and self.is_oneof():
+            yield f"if ({self.oneof_case_name()} != {self.field.number}) " + "{"
+            yield f"  {self.last_name()}.clear();"
+            yield "}"
+            yield f"{self.last_name()}.add(value);"
+        elif self.is_message():
+            yield f"{self.last_name()}.add(value);"
+        else:
+            yield f"{self.last_name()} = value;"
+        if self.is_oneof():
+            yield f"{self.oneof_case_name()} = {self.field.number};"
+
+    def scan_case_statements(self) -> Iterator[str]:
+        """Reads the field, whatever its wire type, skipping it if it doesn't match"""
+        yield f"if ((tag & 7) == {self.wire_type()}) " + "{"
+        yield from self.read_value_statements(
+            "position", "end", self.scan_value_statements()
+        )
+        if self.is_packable():
+            yield "} else if ((tag & 7) == WIRETYPE_LENGTH_DELIMITED) {"
+            yield "std::string_view packed;"
+            yield "ok = readBytes(position, end, packed);"
+            yield "const char* packed_position = packed.data();"
+            yield "const char* const packed_end = packed_position + packed.size();"
+            if self.wire_type() != "WIRETYPE_VARINT":
+                yield f"ARROW_RETURN_NOT_OK({self.builder_name()}->Reserve(packed.size() / sizeof({self.cpp_type()})));"
+            yield "while (ok && packed_position < packed_end) {"
+            yield from self.read_value_statements(
+                "packed_position", "packed_end", self.scan_value_statements()
+            )
+            yield "}"
+        yield "} else {"
+        yield "  ok = skipField(position, end, tag);"
+        yield "}"
+
+    def scan_finish_statements(self) -> Iterator[str]:
+        """Appends the last value of singular fields"""
+        if self.is_repeated():
+            return
+        elif self.is_message():
+            exists = [
+                f"ARROW_RETURN_NOT_OK({self.struct_builder_name()}->Append());",
+                f"ARROW_RETURN_NOT_OK({self.appender_name()}->append({self.last_name()}.data(), {self.last_name()}.size()));",
+            ]
+        elif self.is_enum_dictionary():
+            exists = list(self.append_index_statements(self.last_name()))
+        else:
+            exists = [
+                f"ARROW_RETURN_NOT_OK({self.builder_name()}->Append({self.last_name()}));"
+            ]
+        if self.is_oneof():
+            yield f"if ({self.oneof_case_name()} == {self.field.number}) " + "{"
+            yield from exists
+            yield "} else {"
+            yield from self.missing_append_statements()
+            yield "}"
+        else:
+            yield from exists
+
     def finish_statements(self):
         yield f"std::shared_ptr<arrow::Array> {self.array_name()};"
         if self.is_repeated():
@@ -454,8 +953,11 @@ class AppenderField(BaseField):
 
 
 class MessageWrapper:
-    def __init__(self, descriptor: Descriptor):
+    def __init__(
+        self, descriptor: Descriptor, options: ConversionOptions = DEFAULT_OPTIONS
+    ):
         self.descriptor = descriptor
+        self.options = options
 
     def header(self):
         return self.descriptor.file.name[:-5] + "pb.h"
@@ -463,6 +965,9 @@ class MessageWrapper:
     def appender_name(self):
         return self.descriptor.name + "Appender"
 
+    def sharded_appender_name(self):
+        return self.descriptor.name + "ShardedAppender"
+
     def reader_name(self):
         # TODO: Rename to TableReader
         return self.descriptor.name + "Reader"
@@ -470,6 +975,12 @@ class MessageWrapper:
     def struct_reader_name(self):
         return self.descriptor.name + "StructReader"
 
+    def parquet_writer_name(self):
+        return self.descriptor.name + "ParquetWriter"
+
+    def parquet_reader_name(self):
+        return self.descriptor.name + "ParquetReader"
+
     def message_name(self):
         return self.descriptor.full_name.replace(".", "::")
 
@@ -478,6 +989,36 @@ class MessageWrapper:
             for append_statement in field.append_statements():
                 yield append_statement
 
+    def bulk_append_statements(self):
+        for field in self.appender_fields():
+            yield "{"
+            yield from field.bulk_append_statements()
+            yield "}"
+
+    def reserve_statements(self):
+        for field in self.appender_fields():
+            yield from field.reserve_statements()
+
+    def scan_declarations(self) -> Iterator[str]:
+        oneofs = []
+        for field in self.appender_fields():
+            yield from field.scan_declarations()
+            if field.is_oneof() and field.oneof_name() not in oneofs:
+                oneofs.append(field.oneof_name())
+                # The number of the last field of the oneof read, 0 for none
+                yield f"int {field.oneof_case_name()} = 0;"
+
+    def scan_start_statements(self) -> Iterator[str]:
+        for field in self.appender_fields():
+            yield from field.scan_start_statements()
+
+    def scan_finish_statements(self) -> Iterator[str]:
+        for field in self.appender_fields():
+            if not field.is_repeated():
+                yield "{"
+                yield from field.scan_finish_statements()
+                yield "}"
+
     def finish_statements(self):
         for appender_field in self.appender_fields():
             for finish_statement in appender_field.finish_statements():
@@ -488,7 +1029,7 @@ class MessageWrapper:
             yield field.schema_statement()
 
     def arrays(self):
-        for field in self.descriptor.fields:
+        for field in self.fields():
             yield f"{field.name}_array"
 
     def reader_members(self) -> Sequence[ClassMember]:
@@ -501,13 +1042,25 @@ class MessageWrapper:
             for array_member in reader_field.struct_reader_members():
                 yield array_member
 
-    def reader_fields(self) -> Sequence[ReaderField]:
+    def reader_load_statements(self) -> Iterator[str]:
+        """Points the reader members at the first chunk of a new table"""
+        for reader_field in self.reader_fields():
+            for member in reader_field.members(with_column=False):
+                yield f"{member.name} = {member.initializer};"
+
+    def fields(self) -> Sequence[FieldDescriptor]:
+        """The fields in arrow, skipped fields are left out"""
         for field in self.descriptor.fields:
-            yield ReaderField(field)
+            if not arrow_converter.get_field_encoding(field, self.options).skip:
+                yield field
+
+    def reader_fields(self) -> Sequence[ReaderField]:
+        for field in self.fields():
+            yield ReaderField(field, self.options)
 
     def appender_fields(self) -> Sequence[AppenderField]:
-        for field in self.descriptor.fields:
-            yield AppenderField(field)
+        for field in self.fields():
+            yield AppenderField(field, self.options)
 
     def appender_members(self) -> Sequence[ClassMember]:
         for appender_field in self.appender_fields():
@@ -515,7 +1068,7 @@ class MessageWrapper:
                 yield member
 
     def field_names(self):
-        for field in self.descriptor.fields:
+        for field in self.fields():
             yield field.name
 
     def data_type_statement(self):
@@ -523,8 +1076,11 @@ class MessageWrapper:
 
 
 class FileWrapper:
-    def __init__(self, descriptor: FileDescriptor):
+    def __init__(
+        self, descriptor: FileDescriptor, options: ConversionOptions = DEFAULT_OPTIONS
+    ):
         self.descriptor = descriptor
+        self.options = options
 
     def message_header(self):
         return self.base_name() + ".pb.h"
@@ -535,6 +1091,12 @@ class FileWrapper:
     def appender_source(self):
         return self.base_name() + ".arrow.cc"
 
+    def parquet_header(self):
+        return self.base_name() + ".arrow.parquet.h"
+
+    def parquet_source(self):
+        return self.base_name() + ".arrow.parquet.cc"
+
     def base_name(self) -> str:
         return self.descriptor.name[:-6]
 
@@ -546,7 +1108,18 @@ class FileWrapper:
 
     def message_wrappers(self):
         for message in self.descriptor.message_types_by_name.values():
-            yield MessageWrapper(message)
+            yield MessageWrapper(message, self.options)
+
+    def enum_wrappers(self):
+        """The enums of the dictionary encoded fields of the messages"""
+        enums = {}
+        for message_wrapper in self.message_wrappers():
+            for field in message_wrapper.appender_fields():
+                if field.is_enum_dictionary():
+                    enums.setdefault(
+                        field.field.enum_type.full_name, field.enum_wrapper()
+                    )
+        return list(enums.values())
 
     def include_guard_name(self):
         return (
@@ -554,3 +1127,6 @@ class FileWrapper:
             + "_"
             + self.base_name().upper()
         )
+
+    def parquet_include_guard_name(self):
+        return self.include_guard_name() + "_PARQUET"
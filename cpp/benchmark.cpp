@@ -0,0 +1,215 @@
+// Allocations and time per batch of the generated appenders, depending on how
+// their capacity is managed between batches and on their input (messages or
+// serialized messages), and of the generated readers, depending on where the
+// messages are allocated.
+//
+// Usage: benchmark_exe [batches] [rows per batch]
+
+#include <chrono>
+#include <cstdlib>
+#include <fstream>
+#include <functional>
+#include <iomanip>
+#include <iostream>
+#include <new>
+#include <stdexcept>
+#include <string>
+#include <vector>
+
+#include <google/protobuf/arena.h>
+#include <google/protobuf/util/json_util.h>
+
+#include <simple.arrow.h>
+#include <simple.pb.h>
+
+namespace {
+// Heap allocations, for the readers, counted in the global operator new
+int64_t heapAllocations = 0;
+} // namespace
+
+void *operator new(size_t size) {
+  ++heapAllocations;
+  void *pointer = std::malloc(size == 0 ? 1 : size);
+  if (pointer == nullptr) {
+    throw std::bad_alloc();
+  }
+  return pointer;
+}
+
+void operator delete(void *pointer) noexcept { std::free(pointer); }
+
+void operator delete(void *pointer, size_t) noexcept { std::free(pointer); }
+
+namespace {
+
+/** Counts the allocations and reallocations, which is what reserving saves */
+class CountingMemoryPool : public arrow::MemoryPool {
+public:
+  explicit CountingMemoryPool(arrow::MemoryPool *pool) : pool_(pool) {}
+
+  arrow::Status Allocate(int64_t size, int64_t alignment, uint8_t **out) override {
+    ++allocations_;
+    return pool_->Allocate(size, alignment, out);
+  }
+
+  arrow::Status Reallocate(int64_t old_size, int64_t new_size, int64_t alignment, uint8_t **ptr) override {
+    ++allocations_;
+    return pool_->Reallocate(old_size, new_size, alignment, ptr);
+  }
+
+  void Free(uint8_t *buffer, int64_t size, int64_t alignment) override { pool_->Free(buffer, size, alignment); }
+
+  int64_t bytes_allocated() const override { return pool_->bytes_allocated(); }
+  int64_t total_bytes_allocated() const override { return pool_->total_bytes_allocated(); }
+  int64_t num_allocations() const override { return allocations_; }
+  std::string backend_name() const override { return pool_->backend_name(); }
+
+private:
+  arrow::MemoryPool *pool_;
+  int64_t allocations_ = 0;
+};
+
+template <class T> std::vector<T> loadMessages(std::string const &fileName, size_t const rows) {
+  std::vector<T> loaded;
+  std::ifstream infile(fileName);
+  std::string line;
+  while (std::getline(infile, line)) {
+    T message;
+    if (!line.empty() && google::protobuf::util::JsonStringToMessage(line, &message).ok()) {
+      loaded.push_back(message);
+    }
+  }
+  if (loaded.empty()) {
+    throw std::runtime_error("No messages in " + fileName);
+  }
+  std::vector<T> results;
+  while (results.size() < rows) {
+    results.push_back(loaded[results.size() % loaded.size()]);
+  }
+  return results;
+}
+
+void check(arrow::Status const &status) {
+  if (!status.ok()) {
+    throw std::runtime_error(status.ToString());
+  }
+}
+
+void appendAll(messages::DataRowAppender &appender, std::vector<messages::DataRow> const &batch) {
+  for (messages::DataRow const &message : batch) {
+    check(appender.append(message));
+  }
+}
+
+void printRow(std::string const &name, double const allocations, double const elapsed) {
+  std::cout << std::left << std::setw(24) << name << std::right << std::setw(16) << allocations << std::setw(16)
+            << elapsed << std::endl;
+}
+
+void run(std::string const &name, int const batches, std::vector<messages::DataRow> const &batch,
+         std::function<void(messages::DataRowAppender &, std::shared_ptr<arrow::Table> &)> const &buildBatch) {
+  CountingMemoryPool pool(arrow::default_memory_pool());
+  messages::DataRowAppender appender(&pool);
+  std::shared_ptr<arrow::Table> table;
+  // The first batch warms up the appender
+  buildBatch(appender, table);
+  int64_t const allocations = pool.num_allocations();
+  auto const start = std::chrono::steady_clock::now();
+  for (int i = 0; i < batches; ++i) {
+    buildBatch(appender, table);
+  }
+  std::chrono::duration<double, std::micro> const elapsed = std::chrono::steady_clock::now() - start;
+  printRow(name, static_cast<double>(pool.num_allocations() - allocations) / batches, elapsed.count() / batches);
+}
+
+template <class T, class A, class R> void runReaders(int const batches, size_t const rows, std::string const &fileName) {
+  std::vector<T> const batch = loadMessages<T>(fileName, rows);
+  A appender;
+  std::shared_ptr<arrow::Table> table;
+  check(appender.append(batch.data(), batch.data() + batch.size()));
+  check(appender.build(&table));
+
+  std::cout << std::endl << T::descriptor()->name() << ", " << rows << " rows per batch" << std::endl;
+  std::cout << std::left << std::setw(24) << "mode" << std::right << std::setw(16) << "allocations"
+            << std::setw(16) << "us per batch" << std::endl;
+  auto const runReader = [&](std::string const &name, std::function<void(R &)> const &readBatch) {
+    int64_t const allocations = heapAllocations;
+    auto const start = std::chrono::steady_clock::now();
+    for (int i = 0; i < batches; ++i) {
+      R reader(table);
+      readBatch(reader);
+    }
+    std::chrono::duration<double, std::micro> const elapsed = std::chrono::steady_clock::now() - start;
+    printRow(name, static_cast<double>(heapAllocations - allocations) / batches, elapsed.count() / batches);
+  };
+  runReader("heap", [&](R &reader) {
+    std::vector<T> messages;
+    check(reader.readBatch(messages, rows));
+  });
+  // The arena blocks grow, so a batch only takes a few allocations
+  runReader("arena", [&](R &reader) {
+    google::protobuf::Arena arena;
+    std::vector<T *> messages;
+    check(reader.readBatch(messages, rows, &arena));
+  });
+}
+
+} // namespace
+
+int main(int argc, char **argv) {
+  int const batches = argc > 1 ? std::stoi(argv[1]) : 100;
+  size_t const rows = argc > 2 ? std::stoul(argv[2]) : 10000;
+  std::cout << std::fixed << std::setprecision(1);
+  std::vector<messages::DataRow> const batch = loadMessages<messages::DataRow>("data/DataRow.jsonl", rows);
+
+  std::cout << "DataRow, " << rows << " rows per batch" << std::endl;
+  std::cout << std::left << std::setw(24) << "mode" << std::right << std::setw(16) << "allocations" << std::setw(16)
+            << "us per batch" << std::endl;
+  run("build", batches, batch, [&](messages::DataRowAppender &appender, std::shared_ptr<arrow::Table> &table) {
+    appendAll(appender, batch);
+    check(appender.build(&table));
+  });
+  run("reserve+build", batches, batch, [&](messages::DataRowAppender &appender, std::shared_ptr<arrow::Table> &table) {
+    check(appender.reserve(batch.size(), 16 * batch.size()));
+    appendAll(appender, batch);
+    check(appender.build(&table));
+  });
+  run("rebuild", batches, batch, [&](messages::DataRowAppender &appender, std::shared_ptr<arrow::Table> &table) {
+    appendAll(appender, batch);
+    check(appender.rebuild(&table));
+  });
+  run("bulk append+rebuild", batches, batch,
+      [&](messages::DataRowAppender &appender, std::shared_ptr<arrow::Table> &table) {
+        check(appender.append(batch.data(), batch.data() + batch.size()));
+        check(appender.rebuild(&table));
+      });
+  std::vector<std::string> serialized;
+  for (messages::DataRow const &message : batch) {
+    serialized.push_back(message.SerializeAsString());
+  }
+  // Serialized messages, parsed then appended or scanned straight into the builders
+  run("parse+append+rebuild", batches, batch,
+      [&](messages::DataRowAppender &appender, std::shared_ptr<arrow::Table> &table) {
+        for (std::string const &bytes : serialized) {
+          messages::DataRow message;
+          if (!message.ParseFromString(bytes)) {
+            throw std::runtime_error("Could not parse DataRow");
+          }
+          check(appender.append(message));
+        }
+        check(appender.rebuild(&table));
+      });
+  run("wire append+rebuild", batches, batch,
+      [&](messages::DataRowAppender &appender, std::shared_ptr<arrow::Table> &table) {
+        for (std::string const &bytes : serialized) {
+          check(appender.append(bytes.data(), bytes.size()));
+        }
+        check(appender.rebuild(&table));
+      });
+
+  runReaders<messages::DataRow, messages::DataRowAppender, messages::DataRowReader>(batches, rows,
+                                                                                   "data/DataRow.jsonl");
+  runReaders<messages::RepeatedNestedMessage, messages::RepeatedNestedMessageAppender,
+             messages::RepeatedNestedMessageReader>(batches, rows, "data/RepeatedNestedMessage.jsonl");
+  return 0;
+}
@@ -1,11 +1,15 @@
 #define BOOST_TEST_MODULE ArrowGenTest
 
+#include <cstring>
 #include <fstream>
 #include <iostream>
+#include <map>
 #include <stdexcept>
+#include <thread>
 
 #include <boost/algorithm/string.hpp>
 #include <boost/test/unit_test.hpp>
+#include <google/protobuf/util/delimited_message_util.h>
 #include <google/protobuf/util/json_util.h>
 
 #include <arrow/io/file.h>
@@ -13,6 +17,7 @@
 #include <parquet/api/writer.h>
 #include <parquet/arrow/writer.h>
 #include <simple.arrow.h>
+#include <simple.arrow.parquet.h>
 #include <simple.pb.h>
 
 namespace {
@@ -54,6 +59,18 @@ template <class T, class R> arrow::Status compare(std::shared_ptr<arrow::Table>
   return arrow::Status::OK();
 }
 
+/** Splits every column of the table at different rows, so the chunks are misaligned */
+std::shared_ptr<arrow::Table> misalign(std::shared_ptr<arrow::Table> const &table) {
+  std::vector<std::shared_ptr<arrow::ChunkedArray>> columns;
+  for (int i = 0; i < table->num_columns(); ++i) {
+    std::shared_ptr<arrow::Array> const array = arrow::Concatenate(table->column(i)->chunks()).ValueOrDie();
+    int64_t const split = (i * 3 + 1) % (array->length() + 1);
+    columns.push_back(std::make_shared<arrow::ChunkedArray>(
+        arrow::ArrayVector{array->Slice(0, split), array->Slice(split, 0), array->Slice(split)}, array->type()));
+  }
+  return arrow::Table::Make(table->schema(), columns);
+}
+
 template <class T> std::vector<T> loadJson(std::string const &fileName) {
   std::vector<T> messages;
   std::ifstream infile(fileName);
@@ -97,12 +114,94 @@ template <class T, class A, class R> arrow::Status testDataType(std::vector<T> c
   }
   arrow::Status status2 = ::compare<T, R>(table2, data2);
   ARROW_RETURN_NOT_OK(status2);
-  // Test with binary protocol
-  for (T const &message : data) {
-    std::string value;
-    message.SerializeToString(&value);
-    ARROW_RETURN_NOT_OK(appender.append(value.c_str(), value.size()));
+  // Test reading in batches, which span several chunks of table2
+  R batchReader(table2);
+  std::vector<T> batchData;
+  while (!batchReader.end()) {
+    ARROW_RETURN_NOT_OK(batchReader.readBatch(batchData, 7));
   }
+  BOOST_REQUIRE_EQUAL(batchData.size(), data2.size());
+  for (size_t i = 0; i < data2.size(); ++i) {
+    compareProto(data2[i], batchData[i]);
+  }
+  // Test reading from a stream of record batches
+  std::shared_ptr<arrow::TableBatchReader> tableBatchReader = std::make_shared<arrow::TableBatchReader>(table2);
+  tableBatchReader->set_chunksize(3);
+  R streamReader(std::static_pointer_cast<arrow::RecordBatchReader>(tableBatchReader));
+  for (T const &message : data2) {
+    T actual;
+    ARROW_RETURN_NOT_OK(streamReader.readNext(actual));
+    compareProto(message, actual);
+  }
+  BOOST_REQUIRE(streamReader.end());
+  // Test random access, in misaligned chunks
+  R randomReader(misalign(table2));
+  for (int64_t row = data2.size() - 1; row >= 0; --row) {
+    T actual;
+    ARROW_RETURN_NOT_OK(randomReader.read(row, actual));
+    compareProto(data2[row], actual);
+  }
+  std::vector<T> range;
+  ARROW_RETURN_NOT_OK(randomReader.readRange(2, data2.size() - 1, range));
+  BOOST_REQUIRE_EQUAL(range.size(), data2.size() - 3);
+  for (size_t i = 0; i < range.size(); ++i) {
+    compareProto(data2[i + 2], range[i]);
+  }
+  BOOST_REQUIRE(randomReader.readRange(0, data2.size() + 1, range).IsIndexError());
+  // Test reading on an arena, one message at a time and in batches
+  {
+    google::protobuf::Arena arena;
+    R arenaReader(misalign(table2));
+    std::vector<T *> arenaData;
+    ARROW_RETURN_NOT_OK(arenaReader.readBatch(arenaData, 5, &arena));
+    while (!arenaReader.end()) {
+      ARROW_ASSIGN_OR_RAISE(T * message, arenaReader.readNext(&arena));
+      arenaData.push_back(message);
+    }
+    BOOST_REQUIRE(arenaReader.readNext(&arena).status().IsIndexError());
+    BOOST_REQUIRE_EQUAL(arenaData.size(), data2.size());
+    for (size_t i = 0; i < data2.size(); ++i) {
+      BOOST_REQUIRE_EQUAL(arenaData[i]->GetArena(), &arena);
+      compareProto(data2[i], *arenaData[i]);
+    }
+    std::vector<T *> arenaRange;
+    ARROW_RETURN_NOT_OK(arenaReader.readRange(1, data2.size(), arenaRange, &arena));
+    BOOST_REQUIRE_EQUAL(arenaRange.size(), data2.size() - 1);
+    compareProto(data2.back(), *arenaRange.back());
+  }
+  ARROW_RETURN_NOT_OK(randomReader.seek(data2.size()));
+  BOOST_REQUIRE(randomReader.end());
+  ARROW_RETURN_NOT_OK(randomReader.seek(0));
+  BOOST_REQUIRE(!randomReader.end());
+  // Test with bulk append, twice to check the offsets carry over
+  A bulkAppender;
+  ARROW_RETURN_NOT_OK(bulkAppender.append(data.data(), data.data() + data.size()));
+  ARROW_RETURN_NOT_OK(bulkAppender.append(data.data(), data.data() + data.size()));
+  std::shared_ptr<arrow::Table> bulkTable;
+  ARROW_RETURN_NOT_OK(bulkAppender.build(&bulkTable));
+  ARROW_RETURN_NOT_OK(bulkTable->ValidateFull());
+  BOOST_REQUIRE(bulkTable->Equals(*table2, arrow::EqualOptions::Defaults().nans_equal(true)));
+  // Test with binary protocol. Concatenated messages are merged, and unknown fields skipped, like ParseFromArray.
+  A wireAppender;
+  A parsedAppender;
+  std::string const unknownField = "\xf8\xff\x03\x2a"; // 8191: 42
+  for (size_t i = 0; i < data2.size(); ++i) {
+    std::string value = data2[i].SerializeAsString();
+    if (i >= data.size()) {
+      value += unknownField + data2[(i + 1) % data2.size()].SerializeAsString();
+    }
+    ARROW_RETURN_NOT_OK(wireAppender.append(value.c_str(), value.size()));
+    T parsed;
+    BOOST_REQUIRE(parsed.ParseFromArray(value.c_str(), value.size()));
+    ARROW_RETURN_NOT_OK(parsedAppender.append(parsed));
+  }
+  std::shared_ptr<arrow::Table> wireTable;
+  std::shared_ptr<arrow::Table> parsedTable;
+  ARROW_RETURN_NOT_OK(wireAppender.build(&wireTable));
+  ARROW_RETURN_NOT_OK(parsedAppender.build(&parsedTable));
+  ARROW_RETURN_NOT_OK(wireTable->ValidateFull());
+  BOOST_REQUIRE(wireTable->Equals(*parsedTable, arrow::EqualOptions::Defaults().nans_equal(true)));
+  BOOST_REQUIRE(wireTable->Slice(0, data.size())->Equals(*table, arrow::EqualOptions::Defaults().nans_equal(true)));
   return arrow::Status::OK();
 }
 } // namespace
@@ -167,3 +266,333 @@ BOOST_AUTO_TEST_CASE(test_build_works) {
 }
 
 BOOST_AUTO_TEST_SUITE_END()
+
+BOOST_AUTO_TEST_SUITE(CapacityTestSuite)
+
+BOOST_AUTO_TEST_CASE(test_reserve_rebuild_reset) {
+  std::vector<messages::DataRow> messages = loadJson<messages::DataRow>("data/DataRow.jsonl");
+  messages::DataRowAppender expectedAppender;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), expectedAppender.append(messages.data(), messages.data() + messages.size()));
+  std::shared_ptr<arrow::Table> expected;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), expectedAppender.build(&expected));
+
+  messages::DataRowAppender appender;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.reserve(messages.size(), 1024));
+  std::shared_ptr<arrow::ArrayBuilder> const idBuilder = appender.getBuilders()[0];
+  BOOST_REQUIRE_GE(idBuilder->capacity(), messages.size());
+  for (int batch = 0; batch < 3; ++batch) {
+    for (messages::DataRow const &message : messages) {
+      BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.append(message));
+    }
+    std::shared_ptr<arrow::Table> table;
+    BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.rebuild(&table));
+    BOOST_REQUIRE_EQUAL(arrow::Status::OK(), table->ValidateFull());
+    BOOST_REQUIRE(table->Equals(*expected, arrow::EqualOptions::Defaults().nans_equal(true)));
+    BOOST_REQUIRE_EQUAL(idBuilder->length(), 0);
+    BOOST_REQUIRE_GE(idBuilder->capacity(), messages.size());
+  }
+
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.append(messages.front()));
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.reset());
+  BOOST_REQUIRE_EQUAL(idBuilder->length(), 0);
+  BOOST_REQUIRE_GE(idBuilder->capacity(), messages.size());
+  std::shared_ptr<arrow::Table> empty;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.build(&empty));
+  BOOST_REQUIRE_EQUAL(empty->num_rows(), 0);
+}
+
+BOOST_AUTO_TEST_SUITE_END()
+
+BOOST_AUTO_TEST_SUITE(StreamReaderTestSuite)
+
+BOOST_AUTO_TEST_CASE(test_emptyBatches) {
+  std::vector<messages::DataRow> messages = loadJson<messages::DataRow>("data/DataRow.jsonl");
+  messages::DataRowAppender appender;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.append(messages.data(), messages.data() + messages.size()));
+  std::shared_ptr<arrow::RecordBatch> batch;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.build(&batch));
+  std::shared_ptr<arrow::RecordBatch> const empty = batch->Slice(0, 0);
+
+  messages::DataRowReader emptyReader(
+      arrow::RecordBatchReader::Make({}, messages::DataRowAppender::SCHEMA).ValueOrDie());
+  BOOST_REQUIRE(emptyReader.end());
+
+  messages::DataRowReader reader(arrow::RecordBatchReader::Make({empty, batch, empty, empty, batch, empty}).ValueOrDie());
+  std::vector<messages::DataRow> actual;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), reader.readBatch(actual, 1000));
+  BOOST_REQUIRE(reader.end());
+  BOOST_REQUIRE_EQUAL(actual.size(), 2 * messages.size());
+  for (size_t i = 0; i < actual.size(); ++i) {
+    compareProto(messages[i % messages.size()], actual[i]);
+  }
+  BOOST_REQUIRE(reader.seek(0).IsNotImplemented());
+}
+
+BOOST_AUTO_TEST_SUITE_END()
+
+BOOST_AUTO_TEST_SUITE(SinkTestSuite)
+
+BOOST_AUTO_TEST_CASE(test_sink) {
+  std::vector<messages::DataRow> messages = loadJson<messages::DataRow>("data/DataRow.jsonl");
+  messages::DataRowAppender expectedAppender;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), expectedAppender.append(messages.data(), messages.data() + messages.size()));
+  std::shared_ptr<arrow::Table> expected;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), expectedAppender.build(&expected));
+
+  for (bool const bulk : {false, true}) {
+    std::vector<std::shared_ptr<arrow::RecordBatch>> batches;
+    messages::DataRowAppender appender;
+    BOOST_REQUIRE_EQUAL(
+        arrow::Status::Invalid("No sink set for DataRowAppender"), appender.flush());
+    appender.setSink(
+        [&batches](std::shared_ptr<arrow::RecordBatch> const &batch) {
+          batches.push_back(batch);
+          return arrow::Status::OK();
+        },
+        3);
+    if (bulk) {
+      BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.append(messages.data(), messages.data() + messages.size()));
+    } else {
+      for (messages::DataRow const &message : messages) {
+        BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.append(message));
+      }
+    }
+    BOOST_REQUIRE_EQUAL(batches.size(), messages.size() / 3);
+    BOOST_REQUIRE_EQUAL(appender.length(), messages.size() % 3);
+    BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.flush());
+    BOOST_REQUIRE_EQUAL(appender.length(), 0);
+    BOOST_REQUIRE_EQUAL(appender.approximateBytes(), 0);
+    for (std::shared_ptr<arrow::RecordBatch> const &batch : batches) {
+      BOOST_REQUIRE_LE(batch->num_rows(), 3);
+      BOOST_REQUIRE_EQUAL(arrow::Status::OK(), batch->ValidateFull());
+    }
+    std::shared_ptr<arrow::Table> table = arrow::Table::FromRecordBatches(batches).ValueOrDie();
+    BOOST_REQUIRE(table->Equals(*expected, arrow::EqualOptions::Defaults().nans_equal(true)));
+  }
+}
+
+BOOST_AUTO_TEST_CASE(test_approximateBytes) {
+  std::vector<messages::DataRow> messages = loadJson<messages::DataRow>("data/DataRow.jsonl");
+  messages::DataRowAppender appender;
+  BOOST_REQUIRE_EQUAL(appender.approximateBytes(), 0);
+  int64_t previous = 0;
+  for (messages::DataRow const &message : messages) {
+    BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.append(message));
+    BOOST_REQUIRE_GT(appender.approximateBytes(), previous);
+    previous = appender.approximateBytes();
+  }
+  int64_t batches = 0;
+  appender.setSink(
+      [&batches](std::shared_ptr<arrow::RecordBatch> const &) {
+        ++batches;
+        return arrow::Status::OK();
+      },
+      0,
+      1);
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.append(messages.front()));
+  BOOST_REQUIRE_EQUAL(batches, 1);
+  BOOST_REQUIRE_EQUAL(appender.length(), 0);
+}
+
+BOOST_AUTO_TEST_CASE(test_maxBytes) {
+  std::vector<messages::DataRow> messages = loadJson<messages::DataRow>("data/DataRow.jsonl");
+  messages::DataRowAppender appender;
+  for (int i = 0; i < 3; ++i) {
+    BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.append(messages[i]));
+  }
+  int64_t const maxBytes = appender.approximateBytes();
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.reset());
+  int64_t rows = 0;
+  appender.setSink(
+      [&rows](std::shared_ptr<arrow::RecordBatch> const &batch) {
+        rows += batch->num_rows();
+        return arrow::Status::OK();
+      },
+      0,
+      maxBytes);
+  for (int i = 0; i < 10; ++i) {
+    for (messages::DataRow const &message : messages) {
+      BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.append(message));
+      // The size is not measured after every message, but checked before it gets far
+      BOOST_REQUIRE_LT(appender.approximateBytes(), 2 * maxBytes);
+    }
+  }
+  BOOST_REQUIRE_GT(rows, 0);
+  BOOST_REQUIRE_EQUAL(rows + appender.length(), 10 * messages.size());
+}
+
+BOOST_AUTO_TEST_SUITE_END()
+
+BOOST_AUTO_TEST_SUITE(WireFormatTestSuite)
+
+BOOST_AUTO_TEST_CASE(test_wireFormat) {
+  auto const fixed64 = [](double const value) {
+    std::string bytes(sizeof(value), '\0');
+    std::memcpy(&bytes[0], &value, sizeof(value));
+    return bytes;
+  };
+  std::string const bytes = std::string("\x08\x01\x08\x02")    // id twice, the last one wins
+                            + "\x19" + fixed64(1.5)            // cost_components, not packed
+                            + "\x1a\x10" + fixed64(2.5) + fixed64(3.5) // cost_components, packed
+                            + "\xa3\x06\x08\x05\xa4\x06"       // unknown group
+                            + "\x9a\x02\x03\x0a\x01\x61"       // request.query
+                            + "\x9a\x02\x02\x10\x03"           // request.page_number, merged
+                            + "\x19" + fixed64(4.5);           // cost_components, after the others
+  messages::DataRow parsed;
+  BOOST_REQUIRE(parsed.ParseFromArray(bytes.data(), bytes.size()));
+  BOOST_REQUIRE_EQUAL(parsed.cost_components_size(), 4);
+  BOOST_REQUIRE_EQUAL(parsed.request().page_number(), 3);
+
+  messages::DataRowAppender wireAppender;
+  messages::DataRowAppender parsedAppender;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), wireAppender.append(bytes.data(), bytes.size()));
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), parsedAppender.append(parsed));
+  std::shared_ptr<arrow::Table> wireTable;
+  std::shared_ptr<arrow::Table> parsedTable;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), wireAppender.build(&wireTable));
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), parsedAppender.build(&parsedTable));
+  BOOST_REQUIRE(wireTable->Equals(*parsedTable));
+
+  for (std::string const invalid : {
+           std::string("\x08\x80"),         // truncated varint
+           std::string("\x8a\x02\x01\xff"), // string_values not UTF-8
+           std::string("\x00\x01", 2),      // field number 0
+           std::string("\x0c"),             // end of a group never started
+           std::string("\x9a\x02\x02\x08"), // request truncated
+       }) {
+    messages::DataRowAppender appender;
+    BOOST_REQUIRE(!parsed.ParseFromArray(invalid.data(), invalid.size()));
+    BOOST_REQUIRE(appender.append(invalid.data(), invalid.size()).IsSerializationError());
+  }
+}
+
+BOOST_AUTO_TEST_SUITE_END()
+
+BOOST_AUTO_TEST_SUITE(ShardedTestSuite)
+
+BOOST_AUTO_TEST_CASE(test_shardedAppender) {
+  std::vector<messages::DataRow> const messages = loadJson<messages::DataRow>("data/DataRow.jsonl");
+  int const threads = 4;
+  messages::DataRowShardedAppender appender(threads);
+  BOOST_REQUIRE_EQUAL(appender.numShards(), threads);
+  // Each thread appends all the messages, one by one, serialized and in bulk
+  std::vector<std::thread> workers;
+  std::vector<arrow::Status> statuses(threads);
+  for (int thread = 0; thread < threads; ++thread) {
+    workers.emplace_back([&, thread]() {
+      for (messages::DataRow const &message : messages) {
+        std::string const bytes = message.SerializeAsString();
+        arrow::Status status = appender.append(message);
+        if (status.ok()) {
+          status = appender.append(bytes.data(), bytes.size());
+        }
+        if (!status.ok()) {
+          statuses[thread] = status;
+          return;
+        }
+      }
+      statuses[thread] = appender.append(messages.data(), messages.data() + messages.size());
+    });
+  }
+  for (std::thread &worker : workers) {
+    worker.join();
+  }
+  for (arrow::Status const &status : statuses) {
+    BOOST_REQUIRE_EQUAL(arrow::Status::OK(), status);
+  }
+  BOOST_REQUIRE_EQUAL(appender.length(), 3 * threads * messages.size());
+
+  std::shared_ptr<arrow::Table> table;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.build(&table));
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), table->ValidateFull());
+  BOOST_REQUIRE_EQUAL(table->num_rows(), 3 * threads * messages.size());
+  BOOST_REQUIRE_EQUAL(table->column(0)->num_chunks(), threads);
+  BOOST_REQUIRE_EQUAL(appender.length(), 0);
+  // The shards are in no particular order, but every message is there 3 * threads times
+  std::map<std::string, int> counts;
+  for (messages::DataRow const &message : messages) {
+    counts[message.SerializeAsString()] += 3 * threads;
+  }
+  messages::DataRowReader reader(table);
+  while (!reader.end()) {
+    messages::DataRow message;
+    BOOST_REQUIRE_EQUAL(arrow::Status::OK(), reader.readNext(message));
+    --counts[message.SerializeAsString()];
+  }
+  for (std::pair<std::string const, int> const &count : counts) {
+    BOOST_REQUIRE_EQUAL(count.second, 0);
+  }
+  // The appender carries on after build, without threads too
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.append(messages.front()));
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.build(&table, false));
+  BOOST_REQUIRE_EQUAL(table->num_rows(), 1);
+  BOOST_REQUIRE_EQUAL(table->column(0)->num_chunks(), threads);
+  // From the only thread of the pool, waiting on the pool would never return
+  int const capacity = arrow::GetCpuThreadPoolCapacity();
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), arrow::SetCpuThreadPoolCapacity(1));
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.append(messages.front()));
+  arrow::Future<> fromPool =
+      arrow::internal::GetCpuThreadPool()->Submit([&]() { return appender.build(&table); }).ValueOrDie();
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), fromPool.status());
+  BOOST_REQUIRE_EQUAL(table->num_rows(), 1);
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), arrow::SetCpuThreadPoolCapacity(capacity));
+}
+
+BOOST_AUTO_TEST_SUITE_END()
+
+BOOST_AUTO_TEST_SUITE(DelimitedTestSuite)
+
+BOOST_AUTO_TEST_CASE(test_appendDelimited) {
+  std::vector<messages::DataRow> messages = loadJson<messages::DataRow>("data/DataRow.jsonl");
+  std::string const fileName = "DataRow.delimited";
+  {
+    std::ofstream output(fileName, std::ios::binary);
+    for (messages::DataRow const &message : messages) {
+      BOOST_REQUIRE(google::protobuf::util::SerializeDelimitedToOstream(message, &output));
+    }
+  }
+  messages::DataRowAppender appender;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.appendDelimitedFile(fileName));
+  std::shared_ptr<arrow::Table> table;
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), appender.build(&table));
+  BOOST_REQUIRE_EQUAL(arrow::Status::OK(), (::compare<messages::DataRow, messages::DataRowReader>(table, messages)));
+
+  std::string const truncated = "\x05\x08";
+  BOOST_REQUIRE(appender.appendDelimited(truncated.data(), truncated.size()).IsSerializationError());
+}
+
+BOOST_AUTO_TEST_SUITE_END()
+
+BOOST_AUTO_TEST_SUITE(ParquetTestSuite)
+
+BOOST_AUTO_TEST_CASE(test_ParquetWriterAndReader) {
+  std::vector<messages::DataRow> messages = loadJson<messages::DataRow>("data/DataRow.jsonl");
+  std::string const fileName = "DataRowStream.pq";
+  {
+    std::shared_ptr<arrow::io::FileOutputStream> sink =
+        arrow::io::FileOutputStream::Open(fileName).ValueOrDie();
+    std::unique_ptr<messages::DataRowParquetWriter> writer =
+        messages::DataRowParquetWriter::Open(sink, 3, 0, parquet::Compression::UNCOMPRESSED, false).ValueOrDie();
+    for (messages::DataRow const &message : messages) {
+      BOOST_REQUIRE_EQUAL(arrow::Status::OK(), writer->append(message));
+    }
+    BOOST_REQUIRE_EQUAL(arrow::Status::OK(), writer->close());
+  }
+  for (bool const useThreads : {false, true}) {
+    for (bool const readAhead : {false, true}) {
+      std::unique_ptr<messages::DataRowParquetReader> reader =
+          messages::DataRowParquetReader::Open(
+              arrow::io::ReadableFile::Open(fileName).ValueOrDie(), useThreads, readAhead)
+              .ValueOrDie();
+      BOOST_REQUIRE_EQUAL(reader->numRowGroups(), (messages.size() + 2) / 3);
+      for (messages::DataRow const &message : messages) {
+        messages::DataRow actual;
+        BOOST_REQUIRE_EQUAL(arrow::Status::OK(), reader->readNext(actual));
+        compareProto(message, actual);
+      }
+      BOOST_REQUIRE(reader->end());
+    }
+  }
+}
+
+BOOST_AUTO_TEST_SUITE_END()
@@ -17,7 +17,7 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/0x26res/arrowgen",
     packages=setuptools.find_packages(),
-    package_data={"arrowgen": ["arrowgen/templates/*"]},
+    package_data={"arrowgen": ["arrowgen/templates/*", "options.proto"]},
     entry_points={"console_scripts": ["arrowgen = arrowgen.__main__:main"]},
     setup_requires=["protobuf", "pyarrow", "jinja2"],
     install_requires=install_reqs,
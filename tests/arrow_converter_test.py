@@ -2,12 +2,18 @@ import typing
 import unittest
 
 import pyarrow
+import pyarrow.compute
 from google.protobuf import json_format
+from google.protobuf.field_mask_pb2 import FieldMask
 from google.protobuf.message import Message
 
 from arrowgen import arrow_converter
 from tests.data_generator import generate_messages
-from tests.test_utils import get_all_descriptors
+from tests.test_utils import (
+    get_all_descriptors,
+    get_descriptor,
+    get_with_options_descriptor,
+)
 
 
 class SchemaConverterTest(unittest.TestCase):
@@ -19,6 +25,34 @@ class SchemaConverterTest(unittest.TestCase):
                 )
 
 
+class ConversionPlanTest(unittest.TestCase):
+    def test_plan_schema(self):
+        for descriptor in get_all_descriptors():
+            with self.subTest(descriptor.name):
+                self.assertEqual(
+                    arrow_converter.get_conversion_plan(descriptor).schema,
+                    arrow_converter.get_arrow_schema(descriptor),
+                )
+
+    def test_cache_hits_and_misses(self):
+        cache = arrow_converter.ConversionPlanCache(maxsize=2)
+        nested_message = get_descriptor("NestedMessage")
+        plan = cache.get(nested_message)
+        # NestedMessage, DataRow and SearchRequest (DataRow uses it twice)
+        self.assertEqual(cache.info(), (1, 3, 2, 2))
+        self.assertIs(plan, cache.get(nested_message))
+        self.assertEqual(cache.info().hits, 2)
+
+    def test_cache_eviction(self):
+        cache = arrow_converter.ConversionPlanCache(maxsize=1)
+        cache.get(get_descriptor("SearchRequest"))
+        cache.get(get_descriptor("SearchResult"))
+        cache.get(get_descriptor("SearchRequest"))
+        self.assertEqual(cache.info(), (0, 3, 1, 1))
+        cache.clear()
+        self.assertEqual(cache.info(), (0, 0, 1, 0))
+
+
 class MessageConverterTest(unittest.TestCase):
     def test_all_messages(self):
         for message_descriptor in get_all_descriptors():
@@ -39,6 +73,52 @@ class MessageConverterTest(unittest.TestCase):
                     messages, messages_back, message_descriptor.name
                 )
 
+    def test_chunked_and_sliced(self):
+        for message_descriptor in get_all_descriptors():
+            with self.subTest(message_descriptor.name):
+                messages = generate_messages(message_descriptor, 20)
+                table = arrow_converter.messages_to_table(messages, message_descriptor)
+                chunked_table = pyarrow.concat_tables([table, table]).slice(5, 30)
+                self.assertEqual(chunked_table[0].num_chunks, 2)
+                messages_back = arrow_converter.table_to_messages(
+                    chunked_table, message_descriptor
+                )
+                self.assertMessagesEqual(
+                    (messages + messages)[5:35], messages_back, message_descriptor.name
+                )
+
+    def test_values_and_offsets_of_slices(self):
+        array = pyarrow.array([[1, 2], None, [3], [], [4, 5, 6]])
+        values, offsets = arrow_converter.get_values_and_offsets(array.slice(2, 3))
+        self.assertEqual(values.to_pylist(), [3, 4, 5, 6])
+        self.assertEqual(offsets, [0, 1, 1, 4])
+        values, offsets = arrow_converter.get_values_and_offsets(array.slice(1, 0))
+        self.assertEqual(values.to_pylist(), [])
+        self.assertEqual(offsets, [0])
+
+    def test_repeated_scalars(self):
+        message_descriptor = get_descriptor("TestMessage")
+        # With a null parent message, as in nested struct arrays
+        messages = [None] + generate_messages(message_descriptor, 20)
+        for field in message_descriptor.fields:
+            if field.label == field.LABEL_REPEATED:
+                with self.subTest(field.name):
+                    array = arrow_converter.get_field_array(messages, field)
+                    array.validate(full=True)
+                    expected = pyarrow.array(
+                        [
+                            list(getattr(message, field.name))
+                            if message is not None
+                            else None
+                            for message in messages
+                        ],
+                        arrow_converter.get_arrow_type(field),
+                    )
+                    self.assertEqual(
+                        repr(array.to_pylist()), repr(expected.to_pylist())
+                    )
+                    self.assertEqual(array.type, expected.type)
+
     def assertMessagesEqual(
         self, left: typing.List[Message], right: typing.List[Message], message
     ):
@@ -52,3 +132,576 @@ class MessageConverterTest(unittest.TestCase):
             right, preserving_proto_field_name=True
         )
         self.assertEqual(left_payload, right_payload, message)
+
+
+class ProjectionTest(unittest.TestCase):
+    def test_projected_schema(self):
+        nested_message = get_descriptor("NestedMessage")
+        schema = arrow_converter.get_arrow_schema(
+            nested_message, ["data_row.request.query", "data_row.id"]
+        )
+        self.assertEqual(
+            schema,
+            pyarrow.schema(
+                [
+                    pyarrow.field(
+                        "data_row",
+                        pyarrow.struct(
+                            [
+                                pyarrow.field("id", pyarrow.int64()),
+                                pyarrow.field(
+                                    "request",
+                                    pyarrow.struct(
+                                        [pyarrow.field("query", pyarrow.utf8())]
+                                    ),
+                                ),
+                            ]
+                        ),
+                    )
+                ]
+            ),
+        )
+        self.assertEqual(
+            arrow_converter.get_arrow_schema(nested_message, ["data_row"]),
+            pyarrow.schema(
+                [arrow_converter.get_arrow_schema(nested_message).field("data_row")]
+            ),
+        )
+
+    def test_projection(self):
+        nested_message = get_descriptor("NestedMessage")
+        messages = generate_messages(nested_message, 20)
+        full_table = arrow_converter.messages_to_table(messages, nested_message)
+        for paths in [
+            ["return_code"],
+            ["data_row.request.query", "data_row.cost_components"],
+            ["data_row.request", "data_row.request.page_number"],
+        ]:
+            with self.subTest(paths):
+                field_mask = FieldMask(paths=paths)
+                expected = []
+                for message in messages:
+                    projected = nested_message._concrete_class()
+                    field_mask.MergeMessage(message, projected)
+                    expected.append(projected.SerializeToString())
+                table = arrow_converter.messages_to_table(
+                    messages, nested_message, field_mask
+                )
+                self.assertEqual(
+                    table.schema,
+                    arrow_converter.get_arrow_schema(nested_message, paths),
+                )
+                for source in [table, full_table]:
+                    self.assertEqual(
+                        [
+                            message.SerializeToString()
+                            for message in arrow_converter.table_to_messages(
+                                source, nested_message, paths
+                            )
+                        ],
+                        expected,
+                    )
+
+    def test_repeated_messages(self):
+        descriptor = get_descriptor("RepeatedNestedMessage")
+        messages = generate_messages(descriptor, 10)
+        struct_array = arrow_converter.messages_to_struct_array(messages, descriptor)
+        for message, projected in zip(
+            messages,
+            arrow_converter.struct_array_to_messages(
+                struct_array, descriptor, "data_rows.id"
+            ),
+        ):
+            self.assertEqual(
+                [data_row.id for data_row in projected.data_rows],
+                [data_row.id for data_row in message.data_rows],
+            )
+            self.assertFalse(
+                any(data_row.cost for data_row in projected.data_rows), projected
+            )
+
+    def test_invalid_paths(self):
+        nested_message = get_descriptor("NestedMessage")
+        for path in ["foo", "data_row.foo", "return_code.foo", "data_row."]:
+            with self.subTest(path):
+                with self.assertRaises(ValueError):
+                    arrow_converter.get_arrow_schema(nested_message, [path])
+
+    def test_cached_by_projection(self):
+        search_request = get_descriptor("SearchRequest")
+        self.assertIs(
+            arrow_converter.get_conversion_plan(
+                search_request, ["query", "page_number"]
+            ),
+            arrow_converter.get_conversion_plan(
+                search_request, FieldMask(paths=["page_number", "query"])
+            ),
+        )
+        self.assertEqual(
+            arrow_converter.get_conversion_plan(search_request, []).schema,
+            pyarrow.schema([]),
+        )
+
+
+class PredicateTest(unittest.TestCase):
+    def setUp(self):
+        self.message_descriptor = get_descriptor("NestedMessage")
+        self.messages = generate_messages(self.message_descriptor, 30)
+        self.table = arrow_converter.messages_to_table(
+            self.messages, self.message_descriptor
+        )
+
+    def assertMessagesMatch(self, predicate, keep):
+        self.assertEqual(
+            [
+                message.SerializeToString()
+                for message in arrow_converter.table_to_messages(
+                    self.table, self.message_descriptor, predicate=predicate
+                )
+            ],
+            [message.SerializeToString() for message in self.messages if keep(message)],
+        )
+
+    def test_expression(self):
+        self.assertMessagesMatch(
+            pyarrow.compute.field("return_code") == 1,
+            lambda message: message.return_code == 1,
+        )
+
+    def test_nested_expression(self):
+        self.assertMessagesMatch(
+            pyarrow.compute.field("data_row", "request", "page_number") > 0,
+            lambda message: message.data_row.request.page_number > 0,
+        )
+
+    def test_mask(self):
+        mask = [i % 3 == 0 for i in range(len(self.messages))]
+        kept = set(map(id, self.messages[::3]))
+        self.assertMessagesMatch(mask, lambda message: id(message) in kept)
+        mask_with_nulls = pyarrow.array([True, None] * 15)
+        self.assertEqual(
+            len(
+                arrow_converter.table_to_messages(
+                    self.table, self.message_descriptor, predicate=mask_with_nulls
+                )
+            ),
+            15,
+        )
+
+    def test_predicate_on_unselected_field(self):
+        messages = arrow_converter.table_to_messages(
+            self.table,
+            self.message_descriptor,
+            fields=["data_row.id"],
+            predicate=pyarrow.compute.field("return_code") == 1,
+        )
+        self.assertEqual(
+            [message.data_row.id for message in messages],
+            [
+                message.data_row.id
+                for message in self.messages
+                if message.return_code == 1
+            ],
+        )
+        self.assertFalse(any(message.return_code for message in messages))
+
+
+class TimestampTest(unittest.TestCase):
+    def setUp(self):
+        self.message_descriptor = get_descriptor("WithTimestamp")
+        self.messages = generate_messages(self.message_descriptor, 20)
+        before_epoch = self.message_descriptor._concrete_class()
+        before_epoch.timestamp.seconds = -10
+        before_epoch.timestamp.nanos = 123_456_789
+        before_epoch.timestamps.add(seconds=-1, nanos=999_999_999)
+        self.messages.append(before_epoch)
+
+    def test_units(self):
+        for unit, nanos_per_unit in [
+            ("s", 1_000_000_000),
+            ("ms", 1_000_000),
+            ("us", 1_000),
+            ("ns", 1),
+        ]:
+            with self.subTest(unit):
+                options = arrow_converter.ConversionOptions(unit, "Europe/London")
+                table = arrow_converter.messages_to_table(
+                    self.messages, self.message_descriptor, options=options
+                )
+                self.assertEqual(
+                    table.schema,
+                    arrow_converter.get_arrow_schema(
+                        self.message_descriptor, options=options
+                    ),
+                )
+                self.assertEqual(
+                    table.schema.field("timestamp").type,
+                    pyarrow.timestamp(unit, "Europe/London"),
+                )
+                expected = []
+                for message in self.messages:
+                    truncated = message.__class__()
+                    truncated.CopyFrom(message)
+                    for timestamp in [truncated.timestamp, *truncated.timestamps]:
+                        timestamp.nanos -= timestamp.nanos % nanos_per_unit
+                    expected.append(truncated.SerializeToString())
+                self.assertEqual(
+                    [
+                        message.SerializeToString()
+                        for message in arrow_converter.table_to_messages(
+                            table, self.message_descriptor
+                        )
+                    ],
+                    expected,
+                )
+
+    def test_matches_pyarrow(self):
+        table = arrow_converter.messages_to_table(
+            self.messages, self.message_descriptor
+        )
+        self.assertEqual(
+            table["timestamp"].to_pylist(),
+            pyarrow.array(
+                [message.timestamp.ToNanoseconds() for message in self.messages],
+                pyarrow.timestamp("ns"),
+            ).to_pylist(),
+        )
+
+    def test_nulls(self):
+        table = pyarrow.table(
+            {
+                "timestamp": pyarrow.array([None, 1_500], pyarrow.timestamp("ms")),
+                "timestamps": pyarrow.array(
+                    [[1, None], None], pyarrow.list_(pyarrow.timestamp("s"))
+                ),
+            }
+        )
+        first, second = arrow_converter.table_to_messages(
+            table, self.message_descriptor
+        )
+        self.assertFalse(first.HasField("timestamp"))
+        self.assertEqual([t.seconds for t in first.timestamps], [1, 0])
+        self.assertEqual((second.timestamp.seconds, second.timestamp.nanos), (1, 5e8))
+        self.assertEqual(len(second.timestamps), 0)
+
+
+class DictionaryEnumTest(unittest.TestCase):
+    options = arrow_converter.ConversionOptions(dictionary_enums=True)
+
+    def test_all_messages(self):
+        for message_descriptor in get_all_descriptors():
+            with self.subTest(message_descriptor.name):
+                messages = generate_messages(message_descriptor, 20)
+                table = arrow_converter.messages_to_table(
+                    messages, message_descriptor, options=self.options
+                )
+                table.validate(full=True)
+                self.assertEqual(
+                    table.schema,
+                    arrow_converter.get_arrow_schema(
+                        message_descriptor, options=self.options
+                    ),
+                )
+                self.assertEqual(
+                    [
+                        message.SerializeToString()
+                        for message in arrow_converter.table_to_messages(
+                            table, message_descriptor
+                        )
+                    ],
+                    [message.SerializeToString() for message in messages],
+                )
+
+    def test_names(self):
+        message_descriptor = get_descriptor("TestMessage")
+        messages = [
+            message_descriptor._concrete_class(enum_value=1, enum_values=[1, 0, 1]),
+            message_descriptor._concrete_class(),
+        ]
+        table = arrow_converter.messages_to_table(
+            messages, message_descriptor, options=self.options
+        )
+        self.assertEqual(
+            table.schema.field("enum_value").type,
+            pyarrow.dictionary(pyarrow.int32(), pyarrow.utf8()),
+        )
+        self.assertEqual(table["enum_value"].to_pylist(), ["WORLD", "HELLO"])
+        self.assertEqual(
+            table["enum_values"].to_pylist(), [["WORLD", "HELLO", "WORLD"], []]
+        )
+        self.assertEqual(
+            table["enum_value"].chunk(0).dictionary.to_pylist(), ["HELLO", "WORLD"]
+        )
+        self.assertEqual(str(table.to_pandas()["enum_value"].dtype), "category")
+
+    def test_any_dictionary(self):
+        message_descriptor = get_descriptor("SearchResult")
+        table = pyarrow.table(
+            {
+                "return_code": pyarrow.array(
+                    ["ERROR", None, "OK", "ERROR"]
+                ).dictionary_encode(),
+                "message": ["a", "b", "c", "d"],
+            }
+        )
+        self.assertEqual(
+            [
+                message.return_code
+                for message in arrow_converter.table_to_messages(
+                    table, message_descriptor
+                )
+            ],
+            [1, 0, 0, 1],
+        )
+        with self.assertRaisesRegex(ValueError, "'MAYBE'"):
+            arrow_converter.table_to_messages(
+                pyarrow.table(
+                    {
+                        "return_code": pyarrow.array(["MAYBE"]).dictionary_encode(),
+                        "message": ["a"],
+                    }
+                ),
+                message_descriptor,
+            )
+
+    def test_unknown_value(self):
+        message_descriptor = get_descriptor("SearchResult")
+        with self.assertRaisesRegex(ValueError, "5 is not a value of"):
+            arrow_converter.messages_to_table(
+                [message_descriptor._concrete_class(return_code=5)],
+                message_descriptor,
+                options=self.options,
+            )
+
+
+class LargeTypesTest(unittest.TestCase):
+    options = arrow_converter.ConversionOptions(large_types=True)
+
+    def test_all_messages(self):
+        for message_descriptor in get_all_descriptors():
+            with self.subTest(message_descriptor.name):
+                messages = generate_messages(message_descriptor, 20)
+                table = arrow_converter.messages_to_table(
+                    messages, message_descriptor, options=self.options
+                )
+                table.validate(full=True)
+                self.assertEqual(
+                    table.schema,
+                    arrow_converter.get_arrow_schema(
+                        message_descriptor, options=self.options
+                    ),
+                )
+                # No 32 bit offsets left, at any level of nesting
+                self.assertNotRegex(str(table.schema), r"\b(list|string|binary)\b")
+                self.assertEqual(
+                    [
+                        message.SerializeToString()
+                        for message in arrow_converter.table_to_messages(
+                            table, message_descriptor
+                        )
+                    ],
+                    [message.SerializeToString() for message in messages],
+                )
+
+    def test_types(self):
+        schema = arrow_converter.get_arrow_schema(
+            get_descriptor("DataRow"), options=self.options
+        )
+        self.assertEqual(
+            schema.field("string_values").type,
+            pyarrow.large_list(pyarrow.large_utf8()),
+        )
+        self.assertEqual(
+            schema.field("cost_components").type,
+            pyarrow.large_list(pyarrow.float64()),
+        )
+        self.assertEqual(
+            schema.field("request").type.field("query").type, pyarrow.large_utf8()
+        )
+        # Field options win over the conversion options
+        self.assertEqual(
+            arrow_converter.get_arrow_schema(
+                get_with_options_descriptor("WithOptions"), options=self.options
+            )
+            .field("comment")
+            .type,
+            pyarrow.utf8(),
+        )
+
+
+def without_skipped(message: Message) -> Message:
+    """What comes back from arrow, the skipped field is left out"""
+    result = type(message)()
+    result.CopyFrom(message)
+    if result.DESCRIPTOR.name == "WithOptions":
+        result.ClearField("secret")
+    return result
+
+
+class FieldOptionsTest(unittest.TestCase):
+    def test_schema(self):
+        schema = arrow_converter.get_arrow_schema(
+            get_with_options_descriptor("WithOptions")
+        )
+        point = pyarrow.struct([("x", pyarrow.float32()), ("y", pyarrow.float64())])
+        self.assertEqual(
+            schema,
+            pyarrow.schema(
+                [
+                    ("name", pyarrow.dictionary(pyarrow.int32(), pyarrow.utf8())),
+                    ("payload", pyarrow.large_binary()),
+                    ("comment", pyarrow.utf8()),
+                    ("score", pyarrow.float32()),
+                    ("scores", pyarrow.large_list(pyarrow.float32())),
+                    (
+                        "tags",
+                        pyarrow.large_list(
+                            pyarrow.dictionary(pyarrow.int32(), pyarrow.utf8())
+                        ),
+                    ),
+                    ("color", pyarrow.dictionary(pyarrow.int32(), pyarrow.utf8())),
+                    ("colors", pyarrow.large_list(pyarrow.int32())),
+                    ("points", pyarrow.large_list(point)),
+                    ("id", pyarrow.int64()),
+                    ("key", pyarrow.dictionary(pyarrow.int32(), pyarrow.binary())),
+                ]
+            ),
+        )
+
+    def test_timestamp_unit(self):
+        message_descriptor = get_with_options_descriptor("WithTimestampUnit")
+        schema = arrow_converter.get_arrow_schema(message_descriptor)
+        self.assertEqual(schema.field("micros").type, pyarrow.timestamp("us"))
+        self.assertEqual(schema.field("millis").type, pyarrow.timestamp("ms"))
+        self.assertEqual(
+            schema.field("seconds").type, pyarrow.list_(pyarrow.timestamp("s"))
+        )
+        # The field options win over the conversion options
+        self.assertEqual(
+            arrow_converter.get_arrow_schema(
+                message_descriptor,
+                options=arrow_converter.ConversionOptions("ns", "UTC"),
+            ).field("millis"),
+            pyarrow.field("millis", pyarrow.timestamp("ms", "UTC")),
+        )
+        message = message_descriptor._concrete_class()
+        message.millis.FromMilliseconds(1_500)
+        message.millis.nanos += 999
+        (actual,) = arrow_converter.table_to_messages(
+            arrow_converter.messages_to_table([message], message_descriptor),
+            message_descriptor,
+        )
+        self.assertEqual(actual.millis.ToMilliseconds(), 1_500)
+        self.assertEqual(actual.millis.nanos, 500_000_000)
+
+    def test_round_trip(self):
+        for name in ["Point", "WithOptions", "WithTimestampUnit"]:
+            with self.subTest(name):
+                message_descriptor = get_with_options_descriptor(name)
+                messages = generate_messages(message_descriptor, 20)
+                table = arrow_converter.messages_to_table(messages, message_descriptor)
+                table.validate(full=True)
+                self.assertEqual(
+                    table.schema, arrow_converter.get_arrow_schema(message_descriptor)
+                )
+                actual = arrow_converter.table_to_messages(table, message_descriptor)
+                if name == "WithTimestampUnit":
+                    # Truncated to the unit of the field
+                    self.assertEqual(
+                        [message.millis.nanos % 1_000_000 for message in actual],
+                        [0] * len(actual),
+                    )
+                else:
+                    # Generated doubles are exact as float32
+                    self.assertEqual(
+                        [message.SerializeToString() for message in actual],
+                        [
+                            without_skipped(message).SerializeToString()
+                            for message in messages
+                        ],
+                    )
+
+    def test_skip(self):
+        message_descriptor = get_with_options_descriptor("WithOptions")
+        table = arrow_converter.messages_to_table(
+            [message_descriptor._concrete_class(secret="password", id=1)],
+            message_descriptor,
+        )
+        self.assertNotIn("secret", table.column_names)
+        for options in [
+            arrow_converter.DEFAULT_OPTIONS,
+            arrow_converter.ConversionOptions("ms", large_types=True),
+        ]:
+            with self.assertRaisesRegex(ValueError, "secret"):
+                arrow_converter.get_conversion_plan(
+                    message_descriptor, ["secret"], options
+                )
+            schema = arrow_converter.get_arrow_schema(
+                message_descriptor, options=options
+            )
+            self.assertEqual(
+                arrow_converter.get_arrow_schema(
+                    message_descriptor, ["payload", "id"], options
+                ),
+                pyarrow.schema([schema.field("payload"), schema.field("id")]),
+            )
+
+    def test_fields_after_skipped(self):
+        message_descriptor = get_with_options_descriptor("WithOptions")
+        fields = message_descriptor.fields_by_name
+        messages = [
+            message_descriptor._concrete_class(
+                secret="password", id=i, key=b"k%d" % i, points=[{"y": i}]
+            )
+            for i in range(3)
+        ]
+        self.assertEqual(
+            arrow_converter.get_field_array(messages, fields["id"]).to_pylist(),
+            [0, 1, 2],
+        )
+        self.assertEqual(
+            arrow_converter.get_field_array(messages, fields["key"]).to_pylist(),
+            [b"k0", b"k1", b"k2"],
+        )
+
+        actual = [message_descriptor._concrete_class() for _ in messages]
+        arrow_converter.assign_values(actual, [3, 4, 5], fields["id"])
+        self.assertEqual([message.id for message in actual], [3, 4, 5])
+        arrow_converter.extract_field(
+            arrow_converter.get_field_array(messages, fields["points"]),
+            fields["points"],
+            actual,
+        )
+        self.assertEqual(
+            [[point.y for point in message.points] for message in actual],
+            [[0], [1], [2]],
+        )
+
+        with self.assertRaisesRegex(ValueError, "secret"):
+            arrow_converter.get_field_array(messages, fields["secret"])
+        with self.assertRaisesRegex(ValueError, "secret"):
+            arrow_converter.assign_values(actual, ["a", "b", "c"], fields["secret"])
+        with self.assertRaisesRegex(ValueError, "secret"):
+            arrow_converter.extract_field(
+                pyarrow.array(["a", "b", "c"]), fields["secret"], actual
+            )
+
+    def test_dictionary_strings(self):
+        message_descriptor = get_with_options_descriptor("WithOptions")
+        messages = [
+            message_descriptor._concrete_class(name=name, tags=[name, "b"])
+            for name in ["a", "b", "a"]
+        ]
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        self.assertEqual(table["name"].chunk(0).dictionary.to_pylist(), ["a", "b"])
+        self.assertEqual(table["name"].to_pylist(), ["a", "b", "a"])
+        self.assertEqual(
+            table["tags"].to_pylist(), [["a", "b"], ["b", "b"], ["a", "b"]]
+        )
+        # Plain strings read back as well
+        self.assertEqual(
+            arrow_converter.table_to_messages(
+                pyarrow.table({"name": ["a", "b", "a"]}), message_descriptor, ["name"]
+            ),
+            [message_descriptor._concrete_class(name=m.name) for m in messages],
+        )
@@ -0,0 +1,350 @@
+"""
+Benchmarks for the python converters, using the messages of simple.proto
+"""
+
+import argparse
+import concurrent.futures
+import os
+import time
+import typing
+
+from google.protobuf.descriptor import Descriptor
+from google.protobuf.message import Message
+from tabulate import tabulate
+
+from arrowgen import arrow_converter, row_view, wire_format
+from tests.data_generator import generate_message
+from tests.test_utils import get_all_descriptors, get_descriptor
+from tests.wire_format_test import write_delimited
+
+
+def _generate_messages(
+    message_descriptor: Descriptor, count: int, size: int
+) -> typing.List[Message]:
+    return [generate_message(message_descriptor, size) for _ in range(count)]
+
+
+def _time(function: typing.Callable[[], typing.Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_bytes_to_table(
+    count: int, size: int, repeat: int
+) -> typing.List[typing.List]:
+    results = []
+    for message_descriptor in get_all_descriptors():
+        messages = _generate_messages(message_descriptor, count, size)
+        payloads = [message.SerializeToString() for message in messages]
+
+        def parse_then_convert():
+            parsed = []
+            for payload in payloads:
+                message = message_descriptor._concrete_class()
+                message.ParseFromString(payload)
+                parsed.append(message)
+            return arrow_converter.messages_to_table(parsed, message_descriptor)
+
+        baseline = _time(parse_then_convert, repeat)
+        parsed = _time(
+            lambda: wire_format.bytes_to_table(payloads, message_descriptor), repeat
+        )
+        low_memory = _time(
+            lambda: wire_format.bytes_to_table(
+                payloads, message_descriptor, low_memory=True
+            ),
+            repeat,
+        )
+        results.append(
+            [
+                message_descriptor.name,
+                count,
+                f"{count / baseline:,.0f}",
+                f"{count / parsed:,.0f}",
+                f"{count / low_memory:,.0f}",
+                f"{baseline / low_memory:.2f}x",
+            ]
+        )
+    return results
+
+
+def benchmark_delimited_to_table(
+    count: int, size: int, repeat: int
+) -> typing.List[typing.List]:
+    results = []
+    for message_descriptor in get_all_descriptors():
+        messages = _generate_messages(message_descriptor, count, size)
+        data = write_delimited(messages)
+
+        def parse_then_convert():
+            starts, ends = wire_format.delimited_offsets(data)
+            parsed = []
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                message = message_descriptor._concrete_class()
+                message.ParseFromString(data[start:end])
+                parsed.append(message)
+            return arrow_converter.messages_to_table(parsed, message_descriptor)
+
+        baseline = _time(parse_then_convert, repeat)
+        delimited = _time(
+            lambda: wire_format.delimited_to_table(data, message_descriptor), repeat
+        )
+        results.append(
+            [
+                message_descriptor.name,
+                count,
+                f"{count / baseline:,.0f}",
+                f"{count / delimited:,.0f}",
+                f"{baseline / delimited:.2f}x",
+            ]
+        )
+    return results
+
+
+def benchmark_table_to_bytes(
+    count: int, size: int, repeat: int
+) -> typing.List[typing.List]:
+    results = []
+    for message_descriptor in get_all_descriptors():
+        messages = _generate_messages(message_descriptor, count, size)
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        baseline = _time(
+            lambda: [
+                message.SerializeToString()
+                for message in arrow_converter.table_to_messages(
+                    table, message_descriptor
+                )
+            ],
+            repeat,
+        )
+        wire = _time(
+            lambda: wire_format.table_to_bytes(table, message_descriptor), repeat
+        )
+        results.append(
+            [
+                message_descriptor.name,
+                count,
+                f"{count / baseline:,.0f}",
+                f"{count / wire:,.0f}",
+                f"{baseline / wire:.2f}x",
+            ]
+        )
+    return results
+
+
+def benchmark_plan_cache(
+    count: int, size: int, repeat: int
+) -> typing.List[typing.List]:
+    """Many small batches, compiling the plans every time vs using the cache"""
+    batch_size = 10
+    results = []
+    for message_descriptor in get_all_descriptors():
+        messages = _generate_messages(message_descriptor, batch_size, size)
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        batches = count // batch_size
+
+        def convert(cold: bool):
+            for _ in range(batches):
+                if cold:
+                    arrow_converter.clear_plan_cache()
+                arrow_converter.messages_to_table(messages, message_descriptor)
+                if cold:
+                    arrow_converter.clear_plan_cache()
+                arrow_converter.table_to_messages(table, message_descriptor)
+
+        cold = _time(lambda: convert(True), repeat)
+        warm = _time(lambda: convert(False), repeat)
+        results.append(
+            [
+                message_descriptor.name,
+                batch_size,
+                f"{batches / cold:,.0f}",
+                f"{batches / warm:,.0f}",
+                f"{cold / warm:.2f}x",
+            ]
+        )
+    return results
+
+
+def benchmark_table_to_messages(
+    count: int, size: int, repeat: int
+) -> typing.List[typing.List]:
+    results = []
+    for message_descriptor in get_all_descriptors():
+        messages = _generate_messages(message_descriptor, count, size)
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        elapsed = _time(
+            lambda: arrow_converter.table_to_messages(table, message_descriptor),
+            repeat,
+        )
+        results.append([message_descriptor.name, count, f"{count / elapsed:,.0f}"])
+    return results
+
+
+def benchmark_row_view(count: int, size: int, repeat: int) -> typing.List[typing.List]:
+    """Reads the first field of every row and of its first nested message"""
+    results = []
+    for message_descriptor in get_all_descriptors():
+        messages = _generate_messages(message_descriptor, count, size)
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        first = message_descriptor.fields[0].name
+        nested = [
+            field.name
+            for field in message_descriptor.fields
+            if field.message_type is not None
+            and field.label != field.LABEL_REPEATED
+            and not arrow_converter.is_timestamp(field)
+        ]
+
+        def read(rows):
+            for row in rows:
+                getattr(row, first)
+                for name in nested[:1]:
+                    sub_message = getattr(row, name)
+                    if sub_message is not None:
+                        getattr(sub_message, sub_message.DESCRIPTOR.fields[0].name)
+
+        messages_elapsed = _time(
+            lambda: read(arrow_converter.table_to_messages(table, message_descriptor)),
+            repeat,
+        )
+        views_elapsed = _time(
+            lambda: read(row_view.iter_row_views(table, message_descriptor)), repeat
+        )
+        results.append(
+            [
+                message_descriptor.name,
+                count,
+                f"{count / messages_elapsed:,.0f}",
+                f"{count / views_elapsed:,.0f}",
+                f"{messages_elapsed / views_elapsed:.2f}x",
+            ]
+        )
+    return results
+
+
+def benchmark_parallel(count: int, size: int, repeat: int) -> typing.List[typing.List]:
+    """Both directions with 1 (in process) to cpu_count workers, pools reused"""
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= os.cpu_count():
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != os.cpu_count():
+        worker_counts.append(os.cpu_count())
+    results = []
+    for name in ["TestMessage", "NestedMessage"]:
+        message_descriptor = get_descriptor(name)
+        messages = _generate_messages(message_descriptor, count, size)
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        baseline = None
+        for workers in worker_counts:
+            executor = (
+                concurrent.futures.ProcessPoolExecutor(workers) if workers > 1 else None
+            )
+            try:
+                elapsed = _time(
+                    lambda: arrow_converter.table_to_messages(
+                        arrow_converter.messages_to_table(
+                            messages, message_descriptor, workers=executor
+                        ),
+                        message_descriptor,
+                        workers=executor,
+                    ),
+                    repeat,
+                )
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+            baseline = baseline or elapsed
+            results.append(
+                [
+                    name,
+                    count,
+                    workers,
+                    f"{count / elapsed:,.0f}",
+                    f"{baseline / elapsed:.2f}x",
+                ]
+            )
+    return results
+
+
+BENCHMARKS = {
+    "bytes_to_table": (
+        benchmark_bytes_to_table,
+        [
+            "message",
+            "rows",
+            "parse+messages_to_table/s",
+            "bytes_to_table/s",
+            "low_memory/s",
+            "low_memory speedup",
+        ],
+    ),
+    "delimited_to_table": (
+        benchmark_delimited_to_table,
+        [
+            "message",
+            "rows",
+            "parse loop+messages_to_table/s",
+            "delimited_to_table/s",
+            "speedup",
+        ],
+    ),
+    "table_to_bytes": (
+        benchmark_table_to_bytes,
+        [
+            "message",
+            "rows",
+            "table_to_messages+serialize/s",
+            "table_to_bytes/s",
+            "speedup",
+        ],
+    ),
+    "table_to_messages": (
+        benchmark_table_to_messages,
+        ["message", "rows", "table_to_messages rows/s"],
+    ),
+    "row_view": (
+        benchmark_row_view,
+        ["message", "rows", "messages rows/s", "views rows/s", "speedup"],
+    ),
+    "parallel": (
+        benchmark_parallel,
+        ["message", "rows", "workers", "round trips/s", "speedup"],
+    ),
+    "plan_cache": (
+        benchmark_plan_cache,
+        [
+            "message",
+            "batch size",
+            "cold round trips/s",
+            "cached round trips/s",
+            "speedup",
+        ],
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the python converters")
+    parser.add_argument(
+        "benchmarks", nargs="*", help=f"Any of {', '.join(BENCHMARKS)} (default all)"
+    )
+    parser.add_argument("--count", type=int, default=1_000, help="Messages per run")
+    parser.add_argument(
+        "--size", type=int, default=10, help="Maximum size of repeated fields"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark")
+    args = parser.parse_args()
+    for name in args.benchmarks or BENCHMARKS:
+        function, headers = BENCHMARKS[name]
+        print(name)
+        print(tabulate(function(args.count, args.size, args.repeat), headers=headers))
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,14 @@ import unittest
 
 from google.protobuf.json_format import MessageToJson
 
+from arrowgen.arrow_converter import ConversionOptions
 from arrowgen.generator import generate_for_descriptor
 from tests.data_generator import generate_message, generate_for_file_descriptor
-from tests.test_utils import get_all_descriptors, _get_simple_proto_module
+from tests.test_utils import (
+    get_all_descriptors,
+    _get_simple_proto_module,
+    _get_with_options_proto_module,
+)
 
 
 def _prepare_data(module):
@@ -27,6 +32,32 @@ class TestDataGen(unittest.TestCase):
         simple = _get_simple_proto_module()
         generate_for_file_descriptor(simple.DESCRIPTOR, "./messages", 10)
         files = generate_for_descriptor(simple.DESCRIPTOR)
+        self.assertEqual(
+            sorted(files),
+            [
+                "simple.arrow.cc",
+                "simple.arrow.h",
+                "simple.arrow.parquet.cc",
+                "simple.arrow.parquet.h",
+            ],
+        )
+        # Only the parquet files need parquet
+        self.assertNotIn("parquet", files["simple.arrow.h"])
+
+    def test_generate_options(self):
+        simple = _get_simple_proto_module()
+        for options in [
+            ConversionOptions(dictionary_enums=True),
+            ConversionOptions(large_types=True),
+        ]:
+            with self.subTest(options):
+                files = generate_for_descriptor(simple.DESCRIPTOR, options)
+                self.assertEqual(len(files), 4)
+
+    def test_generate_field_options(self):
+        module = _get_with_options_proto_module()
+        files = generate_for_descriptor(module.DESCRIPTOR)
+        self.assertEqual(len(files), 4)
 
     def test_get_all_descriptors(self):
         self.assertGreater(len(get_all_descriptors()), 6)
@@ -0,0 +1,100 @@
+import concurrent.futures
+import unittest
+
+import pyarrow
+import pyarrow.compute
+
+from arrowgen import arrow_converter, parallel
+from tests.data_generator import generate_messages
+from tests.test_utils import get_all_descriptors, get_descriptor
+
+
+def serialize(messages):
+    return [message.SerializeToString() for message in messages]
+
+
+class ParallelConversionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = concurrent.futures.ProcessPoolExecutor(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def test_all_messages(self):
+        for message_descriptor in get_all_descriptors():
+            with self.subTest(message_descriptor.name):
+                messages = generate_messages(message_descriptor, 50)
+                expected = arrow_converter.messages_to_table(
+                    messages, message_descriptor
+                )
+                table = arrow_converter.messages_to_table(
+                    messages, message_descriptor, workers=self.executor
+                )
+                self.assertEqual(table.schema, expected.schema)
+                # repr so nan compare equal
+                self.assertEqual(repr(table.to_pylist()), repr(expected.to_pylist()))
+                self.assertEqual(
+                    serialize(
+                        arrow_converter.table_to_messages(
+                            table, message_descriptor, workers=self.executor
+                        )
+                    ),
+                    serialize(messages),
+                )
+
+    def test_fields_and_predicate(self):
+        message_descriptor = get_descriptor("NestedMessage")
+        messages = generate_messages(message_descriptor, 40)
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        fields = ["data_row.id", "data_row.request.query"]
+        predicate = pyarrow.compute.field("return_code") == 1
+        self.assertEqual(
+            serialize(
+                arrow_converter.table_to_messages(
+                    table, message_descriptor, fields, predicate, self.executor
+                )
+            ),
+            serialize(
+                arrow_converter.table_to_messages(
+                    table, message_descriptor, fields, predicate
+                )
+            ),
+        )
+        self.assertEqual(
+            arrow_converter.messages_to_table(
+                messages, message_descriptor, fields, self.executor
+            ),
+            arrow_converter.messages_to_table(messages, message_descriptor, fields),
+        )
+
+    def test_process_count(self):
+        message_descriptor = get_descriptor("DataRow")
+        messages = generate_messages(message_descriptor, 10)
+        table = arrow_converter.messages_to_table(
+            messages, message_descriptor, workers=2
+        )
+        # CHUNKS_PER_WORKER chunks for each of the 2 processes, of 2 messages
+        self.assertEqual(len(table[0].chunks), 5)
+        self.assertEqual(
+            serialize(
+                arrow_converter.table_to_messages(table, message_descriptor, workers=2)
+            ),
+            serialize(messages),
+        )
+        empty = arrow_converter.messages_to_table([], message_descriptor, workers=2)
+        self.assertEqual(empty.schema, table.schema)
+        self.assertEqual(empty.num_rows, 0)
+
+    def test_file_descriptor_set(self):
+        message_descriptor = get_descriptor("WithTimestamp")
+        loaded = parallel._load_descriptor(
+            parallel.get_file_descriptor_set(message_descriptor),
+            message_descriptor.full_name,
+        )
+        self.assertIsNot(loaded, message_descriptor)
+        self.assertEqual(
+            arrow_converter.get_arrow_schema(loaded),
+            arrow_converter.get_arrow_schema(message_descriptor),
+        )
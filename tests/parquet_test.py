@@ -0,0 +1,141 @@
+import os
+import tempfile
+import typing
+import unittest
+
+import pyarrow
+import pyarrow.parquet
+from google.protobuf.message import Message
+
+from arrowgen import arrow_converter
+from arrowgen.parquet import ParquetMessageReader, ParquetMessageWriter
+from tests.data_generator import generate_messages
+from tests.test_utils import (
+    get_all_descriptors,
+    get_descriptor,
+    get_with_options_descriptor,
+)
+
+
+def serialize(messages: typing.Iterable[Message]) -> typing.List[bytes]:
+    # Compare the payloads, nan are not equal to themselves
+    return [message.SerializeToString() for message in messages]
+
+
+class ParquetTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "messages.parquet")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_all_messages(self):
+        for message_descriptor in get_all_descriptors():
+            with self.subTest(message_descriptor.name):
+                messages = generate_messages(message_descriptor, 25)
+                with ParquetMessageWriter(
+                    self.path, message_descriptor, max_rows=10
+                ) as writer:
+                    writer.extend(messages)
+                metadata = pyarrow.parquet.read_metadata(self.path)
+                self.assertEqual(
+                    [
+                        metadata.row_group(i).num_rows
+                        for i in range(metadata.num_row_groups)
+                    ],
+                    [10, 10, 5],
+                )
+                self.assertEqual(
+                    serialize(ParquetMessageReader(self.path, message_descriptor)),
+                    serialize(messages),
+                )
+
+    def test_threads(self):
+        message_descriptor = get_descriptor("NestedMessage")
+        messages = generate_messages(message_descriptor, 50)
+        with ParquetMessageWriter(self.path, message_descriptor, max_rows=7) as writer:
+            writer.extend(messages)
+        for threads in [1, 2, 16]:
+            with self.subTest(threads):
+                reader = ParquetMessageReader(
+                    self.path, message_descriptor, threads=threads
+                )
+                self.assertEqual(reader.num_row_groups, 8)
+                self.assertEqual(serialize(reader), serialize(messages))
+        with self.assertRaises(ValueError):
+            ParquetMessageReader(self.path, message_descriptor, threads=-1)
+
+    def test_max_bytes(self):
+        message_descriptor = get_descriptor("DataRow")
+        messages = generate_messages(message_descriptor, 20)
+        with ParquetMessageWriter(
+            self.path,
+            message_descriptor,
+            max_rows=None,
+            max_bytes=1,
+        ) as writer:
+            writer.extend(messages)
+        # A row group per message, but for the empty ones
+        self.assertEqual(
+            pyarrow.parquet.read_metadata(self.path).num_row_groups,
+            sum(message.ByteSize() > 0 for message in messages),
+        )
+
+    def test_writer_options(self):
+        message_descriptor = get_descriptor("DataRow")
+        with ParquetMessageWriter(
+            self.path,
+            message_descriptor,
+            compression="zstd",
+            use_dictionary=False,
+            options=arrow_converter.ConversionOptions(large_types=True),
+        ) as writer:
+            writer.extend(generate_messages(message_descriptor, 10))
+        column = pyarrow.parquet.read_metadata(self.path).row_group(0).column(0)
+        self.assertEqual(column.compression, "ZSTD")
+        self.assertNotIn("RLE_DICTIONARY", column.encodings)
+        self.assertEqual(
+            pyarrow.parquet.read_schema(self.path).field("string_values").type,
+            pyarrow.large_list(pyarrow.large_utf8()),
+        )
+
+    def test_field_options(self):
+        message_descriptor = get_with_options_descriptor("Point")
+        messages = generate_messages(message_descriptor, 10)
+        with ParquetMessageWriter(self.path, message_descriptor) as writer:
+            writer.extend(messages)
+        self.assertEqual(
+            pyarrow.parquet.read_schema(self.path),
+            arrow_converter.get_arrow_schema(message_descriptor),
+        )
+        self.assertEqual(
+            serialize(ParquetMessageReader(self.path, message_descriptor)),
+            serialize(messages),
+        )
+
+    def test_fields(self):
+        message_descriptor = get_descriptor("NestedMessage")
+        messages = generate_messages(message_descriptor, 10)
+        with ParquetMessageWriter(self.path, message_descriptor) as writer:
+            writer.extend(messages)
+        reader = ParquetMessageReader(
+            self.path, message_descriptor, fields=["return_code"]
+        )
+        self.assertEqual(reader.read_row_group(0).column_names, ["return_code"])
+        self.assertEqual(
+            [message.return_code for message in reader.read_messages(0)],
+            [message.return_code for message in messages],
+        )
+
+    def test_empty(self):
+        message_descriptor = get_descriptor("SearchRequest")
+        with ParquetMessageWriter(self.path, message_descriptor):
+            pass
+        reader = ParquetMessageReader(self.path, message_descriptor, threads=2)
+        self.assertEqual(reader.num_row_groups, 0)
+        self.assertEqual(list(reader), [])
+        self.assertEqual(
+            pyarrow.parquet.read_schema(self.path),
+            arrow_converter.get_arrow_schema(message_descriptor),
+        )
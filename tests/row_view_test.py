@@ -0,0 +1,149 @@
+import unittest
+
+import pyarrow
+
+from arrowgen import arrow_converter, row_view
+from tests.data_generator import generate_messages
+from tests.test_utils import (
+    get_all_descriptors,
+    get_descriptor,
+    get_with_options_descriptor,
+)
+
+
+class RowViewTest(unittest.TestCase):
+    def test_to_message(self):
+        for message_descriptor in get_all_descriptors():
+            with self.subTest(message_descriptor.name):
+                messages = generate_messages(message_descriptor, 10)
+                table = arrow_converter.messages_to_table(messages, message_descriptor)
+                views = list(
+                    row_view.iter_row_views(table, message_descriptor, batch_size=3)
+                )
+                self.assertEqual(
+                    [view.to_message().SerializeToString() for view in views],
+                    [message.SerializeToString() for message in messages],
+                )
+
+    def test_attributes(self):
+        message_descriptor = get_descriptor("DataRow")
+        messages = generate_messages(message_descriptor, 10)
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        views = row_view.BatchView(table.to_batches()[0], message_descriptor)
+        self.assertEqual(len(views), 10)
+        for message, view in zip(messages, views):
+            self.assertEqual(view.id, message.id)
+            self.assertEqual(list(view.bool_values), list(message.bool_values))
+            self.assertEqual(view.string_values, list(message.string_values))
+            self.assertEqual(view.request.query, message.request.query)
+            self.assertEqual(
+                [request.page_number for request in view.requests],
+                [request.page_number for request in message.requests],
+            )
+            if message.requests:
+                self.assertEqual(view.requests[-1].to_message(), message.requests[-1])
+        self.assertEqual(views[-1].id, messages[-1].id)
+        with self.assertRaises(IndexError):
+            views[10]
+
+    def test_nulls(self):
+        message_descriptor = get_descriptor("OneofMessage")
+        messages = [
+            message_descriptor._concrete_class(foo=1),
+            message_descriptor._concrete_class(),
+        ]
+        messages[1].search_request.query = "hello"
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        first, second = row_view.BatchView(table.to_batches()[0], message_descriptor)
+        self.assertEqual((first.foo, first.bar, first.search_request), (1, None, None))
+        self.assertEqual((second.foo, second.search_request.query), (None, "hello"))
+
+    def test_projected_table(self):
+        message_descriptor = get_descriptor("DataRow")
+        messages = generate_messages(message_descriptor, 10)
+        table = arrow_converter.messages_to_table(
+            messages, message_descriptor, ["id", "requests.query"]
+        )
+        for message, view in zip(
+            messages, row_view.iter_row_views(table, message_descriptor)
+        ):
+            self.assertEqual(view.id, message.id)
+            self.assertEqual(
+                [request.query for request in view.requests],
+                [request.query for request in message.requests],
+            )
+
+    def test_projected_to_message(self):
+        message_descriptor = get_descriptor("DataRow")
+        messages = generate_messages(message_descriptor, 10)
+        fields = ["id", "request.query", "requests.page_number"]
+        table = arrow_converter.messages_to_table(messages, message_descriptor, fields)
+        expected = arrow_converter.table_to_messages(table, message_descriptor, fields)
+        views = list(row_view.iter_row_views(table, message_descriptor, batch_size=3))
+        self.assertEqual(
+            [view.to_message() for view in views],
+            expected,
+        )
+        for view, message in zip(views, expected):
+            self.assertEqual(
+                [request.to_message() for request in view.requests],
+                list(message.requests),
+            )
+
+    def test_repeated_message_to_message(self):
+        message_descriptor = get_descriptor("DataRow")
+        messages = generate_messages(message_descriptor, 20)
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        for message, view in zip(
+            messages, row_view.iter_row_views(table, message_descriptor, batch_size=3)
+        ):
+            self.assertEqual(
+                [request.to_message() for request in view.requests],
+                list(message.requests),
+            )
+
+    def test_view_class(self):
+        message_descriptor = get_descriptor("SearchRequest")
+        view_class = row_view.get_row_view_class(message_descriptor)
+        self.assertIs(view_class, row_view.get_row_view_class(message_descriptor))
+        self.assertEqual(view_class.__name__, "SearchRequestView")
+        table = pyarrow.table(
+            {"query": ["foo"], "page_number": [1], "result_per_page": [2]},
+            schema=arrow_converter.get_arrow_schema(message_descriptor),
+        )
+        view = row_view.BatchView(table.to_batches()[0], message_descriptor)[0]
+        self.assertEqual(
+            repr(view),
+            "SearchRequestView(query='foo', page_number=1, result_per_page=2)",
+        )
+        with self.assertRaises(AttributeError):
+            view.not_a_field = 1
+
+    def test_dictionary_enums(self):
+        message_descriptor = get_descriptor("TestMessage")
+        messages = generate_messages(message_descriptor, 10)
+        table = arrow_converter.messages_to_table(
+            messages,
+            message_descriptor,
+            options=arrow_converter.ConversionOptions(dictionary_enums=True),
+        )
+        for message, view in zip(
+            messages, row_view.iter_row_views(table, message_descriptor)
+        ):
+            self.assertEqual(view.enum_value, message.enum_value)
+            self.assertEqual(view.enum_values, list(message.enum_values))
+
+    def test_field_options(self):
+        message_descriptor = get_with_options_descriptor("WithOptions")
+        messages = generate_messages(message_descriptor, 10)
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        for message, view in zip(
+            messages, row_view.iter_row_views(table, message_descriptor)
+        ):
+            self.assertEqual(view.name, message.name)
+            self.assertEqual(view.key, message.key)
+            self.assertEqual(view.color, message.color)
+            self.assertEqual(view.tags, list(message.tags))
+            self.assertEqual(len(view.points), len(message.points))
+        self.assertFalse(hasattr(view, "secret"))
+        self.assertNotIn("secret", repr(view))
@@ -0,0 +1,175 @@
+import os
+import pathlib
+import tempfile
+import typing
+import unittest
+
+import pyarrow
+import pyarrow.compute
+from google.protobuf.message import Message
+
+from arrowgen import arrow_converter, streaming
+from tests.data_generator import generate_messages
+from tests.test_utils import get_all_descriptors, get_descriptor
+
+
+def serialize(messages: typing.List[Message]) -> typing.List[bytes]:
+    # Compare the payloads, nan are not equal to themselves
+    return [message.SerializeToString() for message in messages]
+
+
+class IterRecordBatchesTest(unittest.TestCase):
+    def test_all_messages(self):
+        for message_descriptor in get_all_descriptors():
+            with self.subTest(message_descriptor.name):
+                messages = generate_messages(message_descriptor, 25)
+                batches = list(
+                    streaming.iter_record_batches(
+                        iter(messages), message_descriptor, max_rows=10
+                    )
+                )
+                self.assertEqual([len(batch) for batch in batches], [10, 10, 5])
+                table = pyarrow.Table.from_batches(batches)
+                self.assertEqual(
+                    serialize(
+                        arrow_converter.table_to_messages(table, message_descriptor)
+                    ),
+                    serialize(messages),
+                )
+
+    def test_max_bytes(self):
+        message_descriptor = get_descriptor("SearchResult")
+        messages = [
+            message_descriptor._concrete_class(message="x" * 8) for _ in range(10)
+        ]
+        self.assertEqual(messages[0].ByteSize(), 10)
+        batches = list(
+            streaming.iter_record_batches(
+                (m for m in messages), message_descriptor, max_rows=None, max_bytes=25
+            )
+        )
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 3, 1])
+
+    def test_empty(self):
+        message_descriptor = get_descriptor("SearchResult")
+        self.assertEqual(
+            list(streaming.iter_record_batches([], message_descriptor)), []
+        )
+
+    def test_bad_threshold(self):
+        with self.assertRaises(ValueError):
+            streaming.MessageAppender(get_descriptor("SearchResult"), max_rows=0)
+
+
+class MessageAppenderTest(unittest.TestCase):
+    def test_append_flush_build(self):
+        message_descriptor = get_descriptor("DataRow")
+        messages = generate_messages(message_descriptor, 10)
+        appender = streaming.MessageAppender(message_descriptor, max_rows=4)
+        appender.extend(messages[:4])
+        self.assertTrue(appender.is_full())
+        batch = appender.flush()
+        self.assertEqual(len(batch), 4)
+        self.assertEqual(len(appender), 0)
+        self.assertIsNone(appender.flush())
+
+        appender.extend(messages[4:])
+        table = appender.build()
+        self.assertEqual(
+            table.schema, arrow_converter.get_arrow_schema(message_descriptor)
+        )
+        self.assertEqual(
+            serialize(arrow_converter.table_to_messages(table, message_descriptor)),
+            serialize(messages[4:]),
+        )
+        self.assertEqual(len(appender.build()), 0)
+
+
+class IterMessagesTest(unittest.TestCase):
+    def setUp(self):
+        self.message_descriptor = get_descriptor("DataRow")
+        self.messages = generate_messages(self.message_descriptor, 25)
+        self.table = pyarrow.concat_tables(
+            [
+                arrow_converter.messages_to_table(
+                    self.messages[:12], self.message_descriptor
+                ),
+                arrow_converter.messages_to_table(
+                    self.messages[12:], self.message_descriptor
+                ),
+            ]
+        )
+
+    def assertMessagesRead(self, source, batch_size: int = 5):
+        self.assertEqual(
+            serialize(
+                streaming.iter_messages(source, self.message_descriptor, batch_size)
+            ),
+            serialize(self.messages),
+        )
+
+    def test_table(self):
+        self.assertMessagesRead(self.table)
+        self.assertMessagesRead(self.table, batch_size=100)
+
+    def test_record_batch_reader(self):
+        self.assertMessagesRead(
+            pyarrow.RecordBatchReader.from_batches(
+                self.table.schema, self.table.to_batches()
+            )
+        )
+
+    def test_ipc_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "data.arrow"
+            with pyarrow.ipc.new_file(str(path), self.table.schema) as writer:
+                writer.write_table(self.table)
+            self.assertMessagesRead(path)
+
+    def test_ipc_stream(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "data.arrows")
+            with pyarrow.ipc.new_stream(path, self.table.schema) as writer:
+                writer.write_table(self.table)
+            self.assertMessagesRead(path)
+
+    def test_large_batch_in_small_slices(self):
+        messages = generate_messages(self.message_descriptor, 200)
+        table = arrow_converter.messages_to_table(messages, self.message_descriptor)
+        self.assertEqual(table.column("cost").num_chunks, 1)
+        self.assertEqual(
+            serialize(streaming.iter_messages(table, self.message_descriptor, 3)),
+            serialize(messages),
+        )
+
+    def test_batch_slices(self):
+        sizes = [
+            len(batch) for batch in streaming.iter_batches(self.table, batch_size=5)
+        ]
+        self.assertEqual(sizes, [5, 5, 2, 5, 5, 3])
+
+    def test_fields(self):
+        self.assertEqual(
+            [
+                (message.id, message.request.query, message.cost)
+                for message in streaming.iter_messages(
+                    self.table, self.message_descriptor, fields=["id", "request.query"]
+                )
+            ],
+            [(message.id, message.request.query, 0.0) for message in self.messages],
+        )
+
+    def test_predicate(self):
+        predicate = pyarrow.compute.field("request", "page_number") > 0
+        self.assertEqual(
+            serialize(
+                streaming.iter_messages(
+                    self.table, self.message_descriptor, 5, predicate=predicate
+                )
+            ),
+            serialize(
+                message for message in self.messages if message.request.page_number > 0
+            ),
+        )
+        with self.assertRaises(TypeError):
+            next(streaming.iter_batches(self.table, 5, [True] * len(self.messages)))
@@ -13,9 +13,20 @@ def _get_simple_proto_module():
     return get_proto_module(file)
 
 
+@functools.lru_cache
+def _get_with_options_proto_module():
+    file = pkg_resources.resource_filename(__name__, "with_options.proto")
+    return get_proto_module(file)
+
+
 def get_all_descriptors() -> typing.List[Descriptor]:
     return list(_get_simple_proto_module().DESCRIPTOR.message_types_by_name.values())
 
 
 def get_descriptor(name: str) -> Descriptor:
     return _get_simple_proto_module().DESCRIPTOR.message_types_by_name[name]
+
+
+def get_with_options_descriptor(name: str) -> Descriptor:
+    """Messages of with_options.proto, which use the arrowgen field options"""
+    return _get_with_options_proto_module().DESCRIPTOR.message_types_by_name[name]
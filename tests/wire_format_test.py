@@ -0,0 +1,354 @@
+import os
+import struct
+import tempfile
+import typing
+import unittest
+
+import numpy
+import pyarrow
+from google.protobuf.message import Message
+
+from arrowgen import arrow_converter, wire_format
+from tests.data_generator import generate_message, generate_messages
+from tests.arrow_converter_test import without_skipped
+from tests.test_utils import (
+    get_all_descriptors,
+    get_descriptor,
+    get_with_options_descriptor,
+)
+
+
+class BytesToTableTest(unittest.TestCase):
+    def assertTablesEqual(self, expected: pyarrow.Table, actual: pyarrow.Table):
+        self.assertEqual(expected.schema, actual.schema)
+        actual.validate(full=True)
+        # repr so nan compare equal
+        self.assertEqual(repr(expected.to_pylist()), repr(actual.to_pylist()))
+
+    def bytes_to_table(self, payloads, message_descriptor) -> pyarrow.Table:
+        """Parsing and the low memory decoder must agree"""
+        table = wire_format.bytes_to_table(payloads, message_descriptor)
+        self.assertTablesEqual(
+            table,
+            wire_format.bytes_to_table(payloads, message_descriptor, low_memory=True),
+        )
+        return table
+
+    def test_all_messages(self):
+        for message_descriptor in get_all_descriptors():
+            with self.subTest(message_descriptor.name):
+                messages = generate_messages(message_descriptor, 20)
+                payloads = [message.SerializeToString() for message in messages]
+                expected = arrow_converter.messages_to_table(
+                    messages, message_descriptor
+                )
+                self.assertTablesEqual(
+                    expected, self.bytes_to_table(payloads, message_descriptor)
+                )
+                self.assertTablesEqual(
+                    expected,
+                    self.bytes_to_table(
+                        pyarrow.array(payloads, pyarrow.binary()), message_descriptor
+                    ),
+                )
+
+    def test_field_options(self):
+        for name in ["Point", "WithOptions", "WithTimestampUnit"]:
+            with self.subTest(name):
+                message_descriptor = get_with_options_descriptor(name)
+                messages = generate_messages(message_descriptor, 20)
+                self.assertTablesEqual(
+                    arrow_converter.messages_to_table(messages, message_descriptor),
+                    self.bytes_to_table(
+                        [message.SerializeToString() for message in messages],
+                        message_descriptor,
+                    ),
+                )
+
+    def test_large_binary_array(self):
+        message_descriptor = get_descriptor("DataRow")
+        messages = generate_messages(message_descriptor, 20)
+        self.assertTablesEqual(
+            arrow_converter.messages_to_table(messages, message_descriptor),
+            self.bytes_to_table(
+                pyarrow.array(
+                    [message.SerializeToString() for message in messages],
+                    pyarrow.large_binary(),
+                ),
+                message_descriptor,
+            ),
+        )
+
+    def test_sliced_binary_array(self):
+        message_descriptor = get_descriptor("DataRow")
+        messages = generate_messages(message_descriptor, 20)
+        payloads = pyarrow.array(
+            [message.SerializeToString() for message in messages], pyarrow.binary()
+        )
+        self.assertTablesEqual(
+            arrow_converter.messages_to_table(messages[5:15], message_descriptor),
+            self.bytes_to_table(payloads[5:15], message_descriptor),
+        )
+
+    def test_null_payload(self):
+        message_descriptor = get_descriptor("SearchResult")
+        table = self.bytes_to_table([b"", None], message_descriptor)
+        self.assertEqual(
+            table.to_pylist(),
+            [
+                {"return_code": 0, "message": ""},
+                {"return_code": None, "message": None},
+            ],
+        )
+
+    def test_unknown_fields_are_skipped(self):
+        search_request = get_descriptor("SearchRequest")._concrete_class(
+            query="foo", page_number=-3
+        )
+        # Parsed as a SearchResult, query is field 1 with the wrong wire type
+        # and page_number is unknown
+        table = self.bytes_to_table(
+            [search_request.SerializeToString()], get_descriptor("SearchResult")
+        )
+        self.assertEqual(table.to_pylist(), [{"return_code": 0, "message": ""}])
+
+    def test_last_oneof_wins(self):
+        message_descriptor = get_descriptor("OneofMessage")
+        payload = (
+            message_descriptor._concrete_class(foo=1).SerializeToString()
+            + message_descriptor._concrete_class(bar=2).SerializeToString()
+        )
+        table = self.bytes_to_table([payload], message_descriptor)
+        self.assertEqual(
+            table.to_pylist(), [{"foo": None, "bar": 2, "search_request": None}]
+        )
+
+    def test_unpacked_repeated(self):
+        message_descriptor = get_descriptor("DataRow")
+        # Field 3 (cost_components) as two fixed64, then packed
+        payload = (
+            struct.pack("<Bd", 0x19, 1.5)
+            + struct.pack("<Bd", 0x19, 2.5)
+            + struct.pack("<BBd", 0x1A, 8, 3.5)
+        )
+        message = message_descriptor._concrete_class()
+        message.ParseFromString(payload)
+        self.assertEqual(list(message.cost_components), [1.5, 2.5, 3.5])
+        table = self.bytes_to_table([payload], message_descriptor)
+        self.assertEqual(table["cost_components"].to_pylist(), [[1.5, 2.5, 3.5]])
+
+
+def write_delimited(messages: typing.List[Message]) -> bytes:
+    payloads = [message.SerializeToString() for message in messages]
+    prefixes = wire_format.encode_varints(
+        numpy.array([len(payload) for payload in payloads], numpy.int64)
+    )
+    data = prefixes.data.tobytes()
+    offsets = wire_format._exclusive_cumsum(prefixes.lengths)
+    return b"".join(
+        data[start:end] + payload
+        for start, end, payload in zip(offsets, offsets[1:], payloads)
+    )
+
+
+class DelimitedTest(unittest.TestCase):
+    def test_all_messages(self):
+        for message_descriptor in get_all_descriptors():
+            with self.subTest(message_descriptor.name):
+                messages = generate_messages(message_descriptor, 50)
+                expected = arrow_converter.messages_to_table(
+                    messages, message_descriptor
+                )
+                for low_memory in (False, True):
+                    actual = wire_format.delimited_to_table(
+                        write_delimited(messages),
+                        message_descriptor,
+                        batch_size=7,
+                        low_memory=low_memory,
+                    )
+                    actual.validate(full=True)
+                    self.assertEqual(
+                        [batch.num_rows for batch in actual.to_batches()],
+                        [7] * 7 + [1],
+                    )
+                    self.assertEqual(
+                        repr(expected.to_pylist()), repr(actual.to_pylist())
+                    )
+
+    def test_file(self):
+        message_descriptor = get_descriptor("DataRow")
+        messages = generate_messages(message_descriptor, 20)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "messages.bin")
+            with open(path, "wb") as file:
+                file.write(write_delimited(messages))
+            batches = list(
+                wire_format.iter_delimited_batches(path, message_descriptor, 8)
+            )
+        self.assertEqual([batch.num_rows for batch in batches], [8, 8, 4])
+        self.assertEqual(
+            [
+                message.SerializeToString()
+                for message in arrow_converter.table_to_messages(
+                    pyarrow.Table.from_batches(batches), message_descriptor
+                )
+            ],
+            [message.SerializeToString() for message in messages],
+        )
+
+    def test_long_messages(self):
+        message_descriptor = get_descriptor("DataRow")
+        messages = [generate_message(message_descriptor, 200) for _ in range(5)]
+        data = write_delimited(messages)
+        starts, ends = wire_format.delimited_offsets(data)
+        self.assertEqual(
+            [data[start:end] for start, end in zip(starts, ends)],
+            [message.SerializeToString() for message in messages],
+        )
+
+    def test_empty(self):
+        message_descriptor = get_descriptor("DataRow")
+        table = wire_format.delimited_to_table(b"", message_descriptor)
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(
+            table.schema, arrow_converter.get_arrow_schema(message_descriptor)
+        )
+
+    def test_truncated(self):
+        message_descriptor = get_descriptor("DataRow")
+        data = write_delimited(generate_messages(message_descriptor, 3))
+        with self.assertRaises(ValueError):
+            wire_format.delimited_offsets(data[:-1])
+        with self.assertRaises(ValueError):
+            list(wire_format.iter_delimited_batches(data, message_descriptor, 0))
+
+
+class TableToBytesTest(unittest.TestCase):
+    def assertBytesMatch(self, table: pyarrow.Table, message_descriptor):
+        expected = [
+            message.SerializeToString()
+            for message in arrow_converter.table_to_messages(table, message_descriptor)
+        ]
+        payloads = wire_format.table_to_bytes(table, message_descriptor)
+        payloads.validate(full=True)
+        self.assertEqual(payloads.to_pylist(), expected)
+
+    def test_all_messages(self):
+        for message_descriptor in get_all_descriptors():
+            with self.subTest(message_descriptor.name):
+                messages = generate_messages(message_descriptor, 20)
+                table = arrow_converter.messages_to_table(messages, message_descriptor)
+                self.assertBytesMatch(table, message_descriptor)
+                self.assertEqual(
+                    wire_format.table_to_bytes(table, message_descriptor).to_pylist(),
+                    [message.SerializeToString() for message in messages],
+                )
+
+    def test_sliced_and_chunked(self):
+        message_descriptor = get_descriptor("RepeatedNestedMessage")
+        messages = generate_messages(message_descriptor, 20)
+        table = arrow_converter.messages_to_table(messages, message_descriptor)
+        self.assertBytesMatch(table.slice(3, 10), message_descriptor)
+        self.assertBytesMatch(
+            pyarrow.concat_tables([table.slice(5), table.slice(0, 5)]),
+            message_descriptor,
+        )
+        self.assertBytesMatch(table.slice(0, 0), message_descriptor)
+
+    def test_extreme_values(self):
+        message_descriptor = get_descriptor("TestMessage")
+        message = message_descriptor._concrete_class(
+            double_value=-0.0,
+            float_value=float("nan"),
+            int32_value=-(2 ** 31),
+            int64_value=-(2 ** 63),
+            uint32_value=2 ** 32 - 1,
+            uint64_value=2 ** 64 - 1,
+            sint32_value=-(2 ** 31),
+            sint64_value=2 ** 63 - 1,
+            sfixed32_value=-1,
+            enum_value=1,
+            int32_values=[-1, 0, 2 ** 31 - 1],
+            sint64_values=[-1, 1, -(2 ** 63)],
+            bool_values=[False, True],
+            string_values=["", "é"],
+        )
+        table = arrow_converter.messages_to_table([message], message_descriptor)
+        self.assertEqual(
+            wire_format.table_to_bytes(table, message_descriptor).to_pylist(),
+            [message.SerializeToString()],
+        )
+
+    def test_oneof(self):
+        message_descriptor = get_descriptor("OneofMessage")
+        # A default value is written when set, and the last field set wins
+        table = pyarrow.table(
+            {
+                "foo": pyarrow.array([0, 1, None], pyarrow.int32()),
+                "bar": pyarrow.array([None, 2, None], pyarrow.int64()),
+            }
+        )
+        self.assertEqual(
+            wire_format.table_to_bytes(table, message_descriptor).to_pylist(),
+            [
+                message_descriptor._concrete_class(foo=0).SerializeToString(),
+                message_descriptor._concrete_class(bar=2).SerializeToString(),
+                b"",
+            ],
+        )
+
+    def test_timestamp_units(self):
+        message_descriptor = get_descriptor("WithTimestamp")
+        messages = generate_messages(message_descriptor, 20)
+        for unit in ["s", "ms", "us"]:
+            with self.subTest(unit):
+                table = arrow_converter.messages_to_table(
+                    messages,
+                    message_descriptor,
+                    options=arrow_converter.ConversionOptions(unit),
+                )
+                self.assertBytesMatch(table, message_descriptor)
+
+    def test_field_options(self):
+        for name in ["Point", "WithOptions"]:
+            with self.subTest(name):
+                message_descriptor = get_with_options_descriptor(name)
+                messages = generate_messages(message_descriptor, 20)
+                table = arrow_converter.messages_to_table(messages, message_descriptor)
+                self.assertEqual(
+                    wire_format.table_to_bytes(table, message_descriptor).to_pylist(),
+                    [
+                        without_skipped(message).SerializeToString()
+                        for message in messages
+                    ],
+                )
+
+    def test_large_types(self):
+        for name in ["DataRow", "NestedMessage"]:
+            with self.subTest(name):
+                message_descriptor = get_descriptor(name)
+                messages = generate_messages(message_descriptor, 20)
+                table = arrow_converter.messages_to_table(
+                    messages,
+                    message_descriptor,
+                    options=arrow_converter.ConversionOptions(large_types=True),
+                )
+                self.assertEqual(
+                    wire_format.table_to_bytes(table, message_descriptor).to_pylist(),
+                    [message.SerializeToString() for message in messages],
+                )
+
+    def test_dictionary_enums(self):
+        for name in ["TestMessage", "NestedMessage"]:
+            with self.subTest(name):
+                message_descriptor = get_descriptor(name)
+                messages = generate_messages(message_descriptor, 20)
+                table = arrow_converter.messages_to_table(
+                    messages,
+                    message_descriptor,
+                    options=arrow_converter.ConversionOptions(dictionary_enums=True),
+                )
+                self.assertEqual(
+                    wire_format.table_to_bytes(table, message_descriptor).to_pylist(),
+                    [message.SerializeToString() for message in messages],
+                )